@@ -0,0 +1,273 @@
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, FrozenSet, Iterable, NamedTuple, Optional, Tuple
+
+from reference_registry import file_signature, normalize_epc
+
+# ----------- Policy Configuration ------------
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+DAY_NAMES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+DEFAULT_ROLE = 'default'
+
+# Denial reasons, as shown in the access log
+NO_RULE = 'No access rule for badge'
+EXPIRED = 'Badge expired'
+OUTSIDE_HOURS = 'Outside permitted hours'
+ZONE_NOT_PERMITTED = 'Zone not permitted'
+PASSBACK_INSIDE = 'Anti-passback: already inside'
+PASSBACK_NO_ENTRY = 'Anti-passback: no entry recorded'
+
+
+class PolicyError(Exception):
+    """The policy file cannot be compiled; the rules in force are kept"""
+
+
+# ----------- Compiled Rules ------------
+class BadgeRule(NamedTuple):
+    """Everything a decision needs about one badge, resolved at compile time"""
+    role: str
+    zones: Optional[FrozenSet[str]]   # zones the badge may enter; None = any
+    schedule: Optional[bytes]         # 1 per permitted minute of the week (Monday 00:00 first); None = always
+    expires: Optional[float]          # epoch seconds; None = never
+    anti_passback: bool
+
+
+ALLOW_ALL = BadgeRule(DEFAULT_ROLE, None, None, None, False)
+
+
+class CompiledPolicy(NamedTuple):
+    badges: Dict[str, BadgeRule]      # per-badge rules, role and overrides merged
+    default: Optional[BadgeRule]      # for registered badges not listed; None denies them
+    roles: Dict[str, BadgeRule]
+
+
+OPEN_POLICY = CompiledPolicy({}, ALLOW_ALL, {})
+
+
+def _parse_days(spec: str) -> Tuple[int, ...]:
+    """'mon-fri', 'sat,sun', 'daily' -> day numbers (Monday = 0)"""
+    spec = spec.strip().lower()
+    if spec in ('daily', '*'):
+        return tuple(range(7))
+    days = []
+    for part in spec.split(','):
+        first, _, last = part.strip().partition('-')
+        try:
+            start = DAY_NAMES.index(first[:3])
+            end = DAY_NAMES.index(last[:3]) if last else start
+        except ValueError:
+            raise PolicyError(f"unknown day in {spec!r}")
+        days.extend((start + i) % 7 for i in range((end - start) % 7 + 1))
+    return tuple(days)
+
+
+def _parse_minute(spec: str) -> int:
+    hours, _, minutes = spec.strip().partition(':')
+    try:
+        minute = int(hours) * 60 + int(minutes or 0)
+    except ValueError:
+        raise PolicyError(f"bad time {spec!r}")
+    if not 0 <= minute <= MINUTES_PER_DAY:
+        raise PolicyError(f"bad time {spec!r}")
+    return minute
+
+
+def compile_schedule(windows: Iterable[str]) -> bytes:
+    """Weekly windows such as 'mon-fri 07:00-19:30' -> minute-of-week table.
+
+    A window ending at or before its start runs past midnight into the
+    next day (e.g. 'fri 22:00-06:00').
+    """
+    table = bytearray(MINUTES_PER_WEEK)
+    for window in windows:
+        days, _, hours = window.strip().rpartition(' ')
+        start_text, sep, end_text = hours.partition('-')
+        if not days or not sep:
+            raise PolicyError(f"schedule window {window!r} is not 'days HH:MM-HH:MM'")
+        start, end = _parse_minute(start_text), _parse_minute(end_text)
+        length = end - start if end > start else end - start + MINUTES_PER_DAY
+        for day in _parse_days(days):
+            first = day * MINUTES_PER_DAY + start
+            for minute in range(first, first + length):
+                table[minute % MINUTES_PER_WEEK] = 1
+    return bytes(table)
+
+
+def _parse_expiry(value) -> Optional[float]:
+    """Epoch seconds, an ISO datetime, or a date (valid through that whole day)"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        if len(value) == 10:
+            day_after = date.fromisoformat(value) + timedelta(days=1)
+            return datetime(day_after.year, day_after.month, day_after.day).timestamp()
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        raise PolicyError(f"bad expiry {value!r}")
+
+
+def compile_policy(data: dict) -> CompiledPolicy:
+    """Resolve roles and per-badge overrides into one BadgeRule per badge.
+
+    Identical schedules and zone sets are compiled once and shared, so a
+    policy with many badges costs one table per distinct schedule.
+    """
+    if not isinstance(data, dict):
+        raise PolicyError("policy must be a JSON object")
+    schedules: Dict[Tuple[str, ...], bytes] = {}
+    zone_sets: Dict[FrozenSet[str], FrozenSet[str]] = {}
+    anti_passback = bool(data.get('anti_passback', False))
+
+    def resolve(entry: dict, base: BadgeRule, role: str) -> BadgeRule:
+        zones, schedule = base.zones, base.schedule
+        if entry.get('zones') is not None:
+            zones = frozenset(entry['zones'])
+            zones = zone_sets.setdefault(zones, zones)
+        if entry.get('schedule') is not None:
+            key = tuple(entry['schedule'])
+            if key not in schedules:
+                schedules[key] = compile_schedule(key)
+            schedule = schedules[key]
+        expires = _parse_expiry(entry['expires']) if 'expires' in entry else base.expires
+        return BadgeRule(role, zones, schedule, expires,
+                         bool(entry.get('anti_passback', base.anti_passback)))
+
+    base = BadgeRule(DEFAULT_ROLE, None, None, None, anti_passback)
+    roles = {name: resolve(entry or {}, base, name) for name, entry in data.get('roles', {}).items()}
+    roles.setdefault(DEFAULT_ROLE, base)
+
+    def role_rule(name: str) -> BadgeRule:
+        if name not in roles:
+            raise PolicyError(f"unknown role {name!r}")
+        return roles[name]
+
+    badges = {}
+    for epc, entry in data.get('badges', {}).items():
+        entry = entry if isinstance(entry, dict) else {'role': entry}
+        role = entry.get('role', DEFAULT_ROLE)
+        badges[normalize_epc(epc)] = resolve(entry, role_rule(role), role)
+
+    default_role = data.get('default_role')
+    default = role_rule(default_role) if default_role is not None else None
+    return CompiledPolicy(badges, default, roles)
+
+
+# ----------- Access Policy ------------
+class AccessPolicy:
+    """Per-badge time-window, zone, expiry and anti-passback rules.
+
+    The JSON file at ``path`` is compiled into a CompiledPolicy of
+    per-badge rules whenever it changes on disk; the new policy replaces
+    the old one in a single assignment, so a decision sees either the old
+    or the new rules, never a mix. A file that fails to compile leaves the
+    rules in force and is reported in ``last_error``. Without a file every
+    registered badge is allowed, as before.
+
+    check() is a dict lookup plus a few comparisons, independent of how
+    many badges, roles or schedule windows the policy has. Exits are only
+    ever refused by anti-passback: nobody is held inside by an expired
+    badge or a closed time window.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.version = 0
+        self.last_error: Optional[str] = None
+        self._compiled = OPEN_POLICY
+        self._signature: Optional[Tuple[float, int]] = None
+        self._lock = threading.Lock()
+        self._clock: Tuple[int, int] = (-1, 0)  # (epoch minute, minute of week) of the last check
+
+    # ----- loading -----
+    def refresh(self) -> bool:
+        """Recompile the file if it changed. Returns True if the rules changed"""
+        if self.path is None:
+            return False
+        signature = file_signature(self.path)
+        if signature == self._signature:
+            return False
+        with self._lock:
+            if signature == self._signature:
+                return False
+            self._signature = signature
+            if signature is None:
+                self._swap(OPEN_POLICY)
+                return True
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    compiled = compile_policy(json.load(f))
+            except (OSError, ValueError, TypeError, KeyError, AttributeError, PolicyError) as e:
+                self.last_error = f"{self.path}: {e}"
+                print(f"Access policy not applied, keeping version {self.version}: {self.last_error}")
+                return False
+            self._swap(compiled)
+            return True
+
+    def load(self, data: dict):
+        """Compile and apply rules given as a dict (same layout as the file)"""
+        compiled = compile_policy(data)
+        with self._lock:
+            self._swap(compiled)
+
+    def _swap(self, compiled: CompiledPolicy):
+        self._compiled = compiled
+        self.last_error = None
+        self.version += 1
+
+    @property
+    def rules(self) -> CompiledPolicy:
+        return self._compiled
+
+    def summary(self) -> dict:
+        compiled = self._compiled
+        return {
+            'version': self.version,
+            'badges': len(compiled.badges),
+            'roles': len(compiled.roles),
+            'default_role': compiled.default.role if compiled.default is not None else None,
+            'last_error': self.last_error,
+        }
+
+    # ----- decisions -----
+    def _minute_of_week(self, ts: float) -> int:
+        minute = int(ts // 60)
+        cached_minute, minute_of_week = self._clock
+        if minute != cached_minute:
+            local = time.localtime(ts)
+            minute_of_week = local.tm_wday * MINUTES_PER_DAY + local.tm_hour * 60 + local.tm_min
+            self._clock = (minute, minute_of_week)
+        return minute_of_week
+
+    def check(self, epc: str, action: str, ts: float, present: bool,
+              from_zone: Optional[str] = None, to_zone: Optional[str] = None) -> Optional[str]:
+        """Reason a registered badge is refused this ``action``, or None if allowed.
+
+        ``present`` is whether the badge is recorded inside; ``from_zone`` and
+        ``to_zone`` describe the move when the reader covers a mapped door.
+        """
+        compiled = self._compiled  # one read: a concurrent swap cannot mix policies
+        rule = compiled.badges.get(epc)
+        if rule is None:
+            # Badges are keyed by normalize_epc, as in the registry
+            rule = compiled.badges.get(normalize_epc(epc), compiled.default)
+        if rule is None:
+            return NO_RULE
+        if action == 'EXIT':
+            return PASSBACK_NO_ENTRY if rule.anti_passback and not present else None
+        if rule.expires is not None and ts >= rule.expires:
+            return EXPIRED
+        if rule.schedule is not None and not rule.schedule[self._minute_of_week(ts)]:
+            return OUTSIDE_HOURS
+        if rule.zones is not None and to_zone is not None and to_zone not in rule.zones:
+            return ZONE_NOT_PERMITTED
+        if rule.anti_passback:
+            if action == 'ENTRY' and present:
+                return PASSBACK_INSIDE
+            if action == 'MOVE' and from_zone == to_zone:
+                return PASSBACK_INSIDE
+        return None
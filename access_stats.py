@@ -0,0 +1,154 @@
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+# ----------- Statistics Configuration ------------
+TOP_K_CAPACITY = 100  # names tracked by the heavy-hitter summary
+
+# (label, bucket width in seconds, number of buckets)
+WINDOWS = (
+    ('minute', 1, 60),
+    ('hour', 60, 60),
+    ('day', 3600, 24),
+)
+
+
+# ----------- Rolling Window Counter ------------
+class RollingCounter:
+    """Count of events in the last ``bucket_seconds * num_buckets`` seconds.
+
+    Expired buckets are subtracted from a running total as time advances,
+    so add() and total() are O(1) amortized. Resolution is one bucket.
+    """
+
+    def __init__(self, bucket_seconds: float, num_buckets: int):
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = num_buckets
+        self._buckets = [0] * num_buckets
+        self._current = None  # absolute index of the newest bucket
+        self._total = 0
+
+    def _advance(self, now: float):
+        index = int(now // self.bucket_seconds)
+        if self._current is None:
+            self._current = index
+            return
+        if index <= self._current:
+            return
+        steps = min(index - self._current, self.num_buckets)
+        for i in range(1, steps + 1):
+            slot = (self._current + i) % self.num_buckets
+            self._total -= self._buckets[slot]
+            self._buckets[slot] = 0
+        self._current = index
+
+    def add(self, now: float, amount: int = 1):
+        self._advance(now)
+        self._buckets[self._current % self.num_buckets] += amount
+        self._total += amount
+
+    def total(self, now: float) -> int:
+        self._advance(now)
+        return self._total
+
+
+# ----------- Streaming Top-K ------------
+class SpaceSaving:
+    """Space-Saving heavy hitters with O(1) updates.
+
+    Keeps at most ``capacity`` keys. Counts are exact until the summary is
+    full; after that a new key replaces one with the minimum count and
+    inherits that count as its error bound.
+    """
+
+    def __init__(self, capacity: int = TOP_K_CAPACITY):
+        self.capacity = capacity
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._buckets: Dict[int, Set[str]] = {}
+        self._min = 0
+
+    def _move(self, key: str, old: int, new: int):
+        if old:
+            bucket = self._buckets[old]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[old]
+                if self._min == old:
+                    self._min = new
+        self._buckets.setdefault(new, set()).add(key)
+        self._counts[key] = new
+
+    def add(self, key: str):
+        count = self._counts.get(key)
+        if count is not None:
+            self._move(key, count, count + 1)
+            return
+        if len(self._counts) < self.capacity:
+            self._errors[key] = 0
+            self._move(key, 0, 1)
+            self._min = 1
+            return
+        # Evict one key holding the minimum count
+        floor = self._min
+        victim = self._buckets[floor].pop()
+        if not self._buckets[floor]:
+            del self._buckets[floor]
+        del self._counts[victim]
+        del self._errors[victim]
+        self._errors[key] = floor
+        self._move(key, 0, floor + 1)
+        self._min = floor if floor in self._buckets else floor + 1
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        """Up to k (key, count) pairs, highest count first"""
+        return sorted(self._counts.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+
+
+# ----------- Access Statistics ------------
+class AccessStats:
+    """Running totals, windowed counts and top users, updated once per decision"""
+
+    def __init__(self, top_k_capacity: int = TOP_K_CAPACITY):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.granted = 0
+        self.denied = 0
+        self.top_users = SpaceSaving(top_k_capacity)
+        self._windows = {
+            label: {status: RollingCounter(width, count) for status in ('total', 'GRANTED', 'DENIED')}
+            for label, width, count in WINDOWS
+        }
+
+    def record(self, result: dict, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        status = result.get('status')
+        with self._lock:
+            self.total += 1
+            if status == 'GRANTED':
+                self.granted += 1
+                self.top_users.add(result.get('name'))
+            elif status == 'DENIED':
+                self.denied += 1
+            for counters in self._windows.values():
+                counters['total'].add(now)
+                if status in counters:
+                    counters[status].add(now)
+
+    def snapshot(self, top_n: int = 5, now: Optional[float] = None) -> dict:
+        now = time.time() if now is None else now
+        with self._lock:
+            return {
+                'total': self.total,
+                'granted': self.granted,
+                'denied': self.denied,
+                'top_users': self.top_users.top(top_n),
+                'windows': {
+                    label: {
+                        'total': counters['total'].total(now),
+                        'granted': counters['GRANTED'].total(now),
+                        'denied': counters['DENIED'].total(now),
+                    }
+                    for label, counters in self._windows.items()
+                },
+            }
@@ -0,0 +1,422 @@
+import asyncio
+import bisect
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from event_store import EventStore, ROLLUP_CURSOR_KEY
+from runtime import RUNTIME, Runtime, Worker
+
+# ----------- Analytics Configuration ------------
+RESOLUTIONS = {'minute': 60, 'hour': 3600, 'day': 86400}  # nominal bucket widths (seconds)
+ROLLUP_CHUNK = 20_000            # events folded into the rollups per transaction
+ROLLUP_INTERVAL = 5.0            # seconds between incremental updates once caught up
+MINUTE_RETENTION_DAYS = 14       # minute rollups are pruned after this; hours and days are kept
+PRUNE_INTERVAL = 3600            # seconds between minute-rollup prunes
+# Upper edges of the dwell-time histogram bins (seconds); the last bin is open-ended
+DWELL_BIN_EDGES = (5 * 60, 15 * 60, 30 * 60, 3600, 2 * 3600, 4 * 3600, 8 * 3600, 12 * 3600, 24 * 3600)
+DWELL_BIN_LABELS = ('<5m', '5-15m', '15-30m', '30m-1h', '1-2h', '2-4h', '4-8h', '8-12h', '12-24h', '24h+')
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    resolution  INTEGER NOT NULL,            -- 60, 3600 or 86400
+    bucket      INTEGER NOT NULL,            -- local start of the bucket, epoch seconds
+    granted     INTEGER NOT NULL DEFAULT 0,
+    denied      INTEGER NOT NULL DEFAULT 0,
+    entries     INTEGER NOT NULL DEFAULT 0,
+    exits       INTEGER NOT NULL DEFAULT 0,
+    peak        INTEGER NOT NULL DEFAULT 0,  -- most people inside at once
+    level       INTEGER NOT NULL DEFAULT 0,  -- people inside after the bucket's last event
+    dwell_count INTEGER NOT NULL DEFAULT 0,
+    dwell_total REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (resolution, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_dwell (
+    day   INTEGER NOT NULL,
+    bin   INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (day, bin)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_attendance (
+    day     INTEGER NOT NULL,
+    epc     TEXT NOT NULL,
+    name    TEXT,
+    visits  INTEGER NOT NULL DEFAULT 0,
+    seconds REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, epc)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_present (
+    epc      TEXT PRIMARY KEY,
+    entry_ts REAL NOT NULL
+);
+"""
+
+_FIELDS = ('granted', 'denied', 'entries', 'exits', 'peak', 'level', 'dwell_count', 'dwell_total')
+GRANTED, DENIED, ENTRIES, EXITS, PEAK, LEVEL, DWELL_COUNT, DWELL_TOTAL = range(len(_FIELDS))
+
+_UPSERT_ROLLUP = f"""
+INSERT INTO rollups (resolution, bucket, {', '.join(_FIELDS)}) VALUES (?, ?, {', '.join('?' * len(_FIELDS))})
+ON CONFLICT (resolution, bucket) DO UPDATE SET
+    granted = granted + excluded.granted,
+    denied = denied + excluded.denied,
+    entries = entries + excluded.entries,
+    exits = exits + excluded.exits,
+    peak = MAX(peak, excluded.peak),
+    level = excluded.level,
+    dwell_count = dwell_count + excluded.dwell_count,
+    dwell_total = dwell_total + excluded.dwell_total
+"""
+_UPSERT_DWELL = """
+INSERT INTO rollup_dwell (day, bin, count) VALUES (?, ?, ?)
+ON CONFLICT (day, bin) DO UPDATE SET count = count + excluded.count
+"""
+_UPSERT_ATTENDANCE = """
+INSERT INTO rollup_attendance (day, epc, name, visits, seconds) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (day, epc) DO UPDATE SET
+    name = COALESCE(excluded.name, name),
+    visits = visits + excluded.visits,
+    seconds = seconds + excluded.seconds
+"""
+
+
+def _resolution(name: str) -> int:
+    try:
+        return RESOLUTIONS[name]
+    except KeyError:
+        raise ValueError(f"resolution must be one of {', '.join(RESOLUTIONS)}, not {name!r}")
+
+
+# ----------- Local Calendar ------------
+class LocalCalendar:
+    """Bucket starts in local time: days begin at local midnight, DST included.
+
+    The day of the last timestamp is cached, so events in time order cost
+    a comparison each instead of a timezone conversion.
+    """
+
+    def __init__(self):
+        self._day: Tuple[float, float] = (0.0, -1.0)  # [start, end) of the cached day
+
+    def day(self, ts: float) -> int:
+        start, end = self._day
+        if not start <= ts < end:
+            today = datetime.fromtimestamp(ts).date()
+            start = time.mktime(today.timetuple())
+            end = time.mktime((today + timedelta(days=1)).timetuple())
+            self._day = (start, end)
+        return int(start)
+
+    def buckets(self, ts: float) -> Tuple[int, int, int]:
+        """(minute, hour, day) bucket starts for ``ts``"""
+        day = self.day(ts)
+        return int(ts // 60) * 60, day + int((ts - day) // 3600) * 3600, day
+
+    def start(self, ts: float, resolution: int) -> int:
+        if resolution == 60:
+            return int(ts // 60) * 60
+        day = self.day(ts)
+        return day if resolution == 86400 else day + int((ts - day) // 3600) * 3600
+
+    def starts(self, start: float, end: float, resolution: int) -> List[int]:
+        """Every bucket start from the one holding ``start`` up to ``end``"""
+        buckets, bucket = [], self.start(start, resolution)
+        while bucket < end:
+            buckets.append(bucket)
+            # Half a bucket past the nominal width lands in the next one even on 23/25-hour days
+            bucket = self.start(bucket + resolution * 1.5, resolution)
+        return buckets
+
+
+def _local_index(buckets) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex([datetime.fromtimestamp(b) for b in buckets], name='start')
+
+
+# ----------- Analytics ------------
+class Analytics:
+    """Dwell times, occupancy and attendance over months of event history.
+
+    Persisted events are folded into rollup tables kept next to them in
+    the store's database: per-bucket counts at minute, hour and day
+    resolution (entries, exits, decisions, peak and closing occupancy,
+    dwell totals), a per-day dwell histogram and per-person daily
+    attendance. update() folds only the events past a cursor in the meta
+    table, in chunks, and commits each chunk together with the cursor, so
+    the rollups never count an event twice or miss one; after a restart
+    they resume where they stopped. Queries read the rollups only, so a
+    year costs a few thousand rows however many events it held.
+
+    Who is inside is tracked from the entry/exit events themselves, so
+    the occupancy rollups agree with the dashboard. A stay is counted
+    towards the day of its exit.
+    """
+
+    def __init__(self, store: EventStore, chunk: int = ROLLUP_CHUNK,
+                 interval: float = ROLLUP_INTERVAL, runtime: Runtime = RUNTIME):
+        self.store = store
+        self.chunk = chunk
+        self.interval = interval
+        self.runtime = runtime
+        self.events_folded = 0
+        self.last_error: Optional[str] = None
+        self.calendar = LocalCalendar()
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._conn = self._connect()
+        self._conn.executescript(_SCHEMA)
+        self._last_prune = 0.0
+        self._worker: Optional[Worker] = None
+        self._load_state()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = self.store.connect()
+        conn.row_factory = None
+        return conn
+
+    def _load_state(self):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (ROLLUP_CURSOR_KEY,)).fetchone()
+        self.cursor = int(row[0]) if row is not None else 0
+        self._present: Dict[str, float] = dict(self._conn.execute("SELECT epc, entry_ts FROM rollup_present"))
+
+    # ----- incremental rollup -----
+    def update(self, max_chunks: Optional[int] = None) -> int:
+        """Fold committed events past the cursor into the rollups; returns events folded"""
+        folded, chunks = 0, 0
+        with self._lock:
+            while max_chunks is None or chunks < max_chunks:
+                rows = self._conn.execute(
+                    "SELECT id, ts, kind, status, action, epc, name, duration FROM events "
+                    "WHERE id > ? ORDER BY id LIMIT ?", (self.cursor, self.chunk)).fetchall()
+                if not rows:
+                    break
+                try:
+                    self._apply(rows)
+                except sqlite3.Error:
+                    # The transaction rolled back: drop the in-memory changes with it
+                    self._load_state()
+                    raise
+                folded += len(rows)
+                chunks += 1
+                if len(rows) < self.chunk:
+                    break
+        return folded
+
+    def _apply(self, rows: List[tuple]):
+        buckets: Dict[Tuple[int, int], list] = {}
+        dwell: Dict[Tuple[int, int], int] = {}
+        attendance: Dict[Tuple[int, str], list] = {}   # (day, epc) -> [name, visits, seconds]
+        changed: Set[str] = set()
+        present = self._present
+        calendar = self.calendar
+        resolutions = tuple(RESOLUTIONS.values())
+
+        for _, ts, kind, status, action, epc, name, duration in rows:
+            level = len(present)
+            starts = calendar.buckets(ts)
+            day = starts[-1]
+            touched = []
+            for key in zip(resolutions, starts):
+                counts = buckets.get(key)
+                if counts is None:
+                    # People already inside count towards the bucket's peak
+                    counts = buckets[key] = [0, 0, 0, 0, level, level, 0, 0.0]
+                touched.append(counts)
+
+            if kind == 'access':
+                field = GRANTED if status == 'GRANTED' else DENIED if status == 'DENIED' else None
+                if field is not None:
+                    for counts in touched:
+                        counts[field] += 1
+            elif kind == 'occupancy' and epc is not None:
+                if action == 'ENTRY':
+                    if epc in present:
+                        continue  # a repeated entry is not a new visit
+                    present[epc] = ts
+                    changed.add(epc)
+                    field, seconds = ENTRIES, None
+                elif action == 'EXIT':
+                    entry_ts = present.pop(epc, None)
+                    changed.add(epc)
+                    field = EXITS
+                    seconds = duration if duration is not None else (ts - entry_ts if entry_ts is not None else None)
+                else:
+                    continue
+                level = len(present)
+                for counts in touched:
+                    counts[field] += 1
+                    counts[PEAK] = max(counts[PEAK], level)
+                    counts[LEVEL] = level
+                person = attendance.get((day, epc))
+                if person is None:
+                    person = attendance[(day, epc)] = [None, 0, 0.0]
+                person[0] = name or person[0]
+                if field == ENTRIES:
+                    person[1] += 1
+                elif seconds is not None:
+                    seconds = max(seconds, 0.0)
+                    person[2] += seconds
+                    for counts in touched:
+                        counts[DWELL_COUNT] += 1
+                        counts[DWELL_TOTAL] += seconds
+                    bin_key = (day, bisect.bisect_right(DWELL_BIN_EDGES, seconds))
+                    dwell[bin_key] = dwell.get(bin_key, 0) + 1
+
+        last_id = rows[-1][0]
+        conn = self._conn
+        with conn:
+            conn.executemany(_UPSERT_ROLLUP, [(*key, *counts) for key, counts in buckets.items()])
+            conn.executemany(_UPSERT_DWELL, [(*key, count) for key, count in dwell.items()])
+            conn.executemany(_UPSERT_ATTENDANCE, [(*key, *person) for key, person in attendance.items()])
+            conn.executemany("DELETE FROM rollup_present WHERE epc = ?",
+                             [(epc,) for epc in changed if epc not in present])
+            conn.executemany("INSERT OR REPLACE INTO rollup_present (epc, entry_ts) VALUES (?, ?)",
+                             [(epc, present[epc]) for epc in changed if epc in present])
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                         (ROLLUP_CURSOR_KEY, str(last_id)))
+            now = time.time()
+            if now - self._last_prune >= PRUNE_INTERVAL:
+                self._last_prune = now
+                conn.execute("DELETE FROM rollups WHERE resolution = ? AND bucket < ?",
+                             (RESOLUTIONS['minute'], now - MINUTE_RETENTION_DAYS * 86400))
+        self.cursor = last_id
+        self.events_folded += len(rows)
+
+    async def _loop(self):
+        while True:
+            try:
+                folded = await asyncio.to_thread(self.update, 1)
+                self.last_error = None
+            except sqlite3.Error as e:
+                self.last_error = str(e)
+                print(f"Analytics rollup error: {e}")
+                folded = 0
+            # Keep going without a pause while catching up on a backlog
+            await asyncio.sleep(0 if folded >= self.chunk else self.interval)
+
+    # ----- lifecycle -----
+    def start(self):
+        if self.running:
+            return
+        self._worker = self.runtime.spawn("analytics-rollup", self._loop)
+
+    def stop(self):
+        if self._worker is not None:
+            self._worker.stop()
+            self._worker = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and self._worker.running
+
+    def stats(self) -> dict:
+        return {
+            'cursor': self.cursor,
+            'backlog': max(self.store.max_id() - self.cursor, 0),
+            'events_folded': self.events_folded,
+            'present': len(self._present),
+            'last_error': self.last_error,
+        }
+
+    # ----- queries -----
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def traffic(self, start: float, end: float, resolution: str = 'hour') -> pd.DataFrame:
+        """Rollup rows for the buckets in [start, end) that saw any event, indexed by local start"""
+        width = _resolution(resolution)
+        rows = self._reader().execute(
+            f"SELECT bucket, {', '.join(_FIELDS)} FROM rollups "
+            "WHERE resolution = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+            (width, self.calendar.start(start, width), end)).fetchall()
+        df = pd.DataFrame.from_records(rows, columns=('bucket',) + _FIELDS)
+        df.index = _local_index(df.pop('bucket'))
+        return df
+
+    def occupancy(self, start: float, end: float, resolution: str = 'hour') -> pd.DataFrame:
+        """Peak and closing occupancy for every bucket in [start, end), quiet ones included.
+
+        A bucket without events holds whoever was inside at the end of the
+        one before it.
+        """
+        width = _resolution(resolution)
+        end = min(end, time.time())
+        buckets = self.calendar.starts(start, end, width)
+        row = self._reader().execute(
+            "SELECT level FROM rollups WHERE resolution = ? AND bucket < ? ORDER BY bucket DESC LIMIT 1",
+            (width, buckets[0] if buckets else start)).fetchone()
+        before = row[0] if row is not None else 0
+
+        df = self.traffic(start, end, resolution)[['peak', 'level']]
+        df = df.reindex(_local_index(buckets))
+        level = df['level'].ffill().fillna(before)
+        df['peak'] = df['peak'].fillna(level.shift(1, fill_value=before))
+        df['level'] = level
+        return df.astype(int)
+
+    def heatmap(self, start: float, end: float, metric: str = 'entries') -> pd.DataFrame:
+        """Weekday x hour-of-day table: the total of a count over [start, end), or the mean peak"""
+        if metric == 'peak':
+            values = self.occupancy(start, end, 'hour')['peak']
+        elif metric in _FIELDS:
+            values = self.traffic(start, end, 'hour')[metric]
+        else:
+            raise ValueError(f"unknown metric {metric!r}")
+        table = pd.DataFrame({'weekday': values.index.weekday, 'hour': values.index.hour,
+                              'value': values.to_numpy()})
+        table = table.pivot_table(index='weekday', columns='hour', values='value',
+                                  aggfunc='mean' if metric == 'peak' else 'sum', fill_value=0)
+        table = table.reindex(index=range(7), columns=range(24), fill_value=0)
+        table.index = WEEKDAYS
+        return table
+
+    def dwell_distribution(self, start: float, end: float) -> pd.DataFrame:
+        """Completed stays per dwell-time bin, for exits on the days in [start, end)"""
+        rows = self._reader().execute(
+            "SELECT bin, SUM(count) FROM rollup_dwell WHERE day >= ? AND day < ? GROUP BY bin",
+            (self.calendar.day(start), end)).fetchall()
+        counts = [0] * len(DWELL_BIN_LABELS)
+        for index, count in rows:
+            counts[index] = count
+        total = sum(counts)
+        return pd.DataFrame({'stays': counts, 'share': [c / total if total else 0.0 for c in counts]},
+                            index=pd.Index(DWELL_BIN_LABELS, name='dwell'))
+
+    def dwell_summary(self, start: float, end: float) -> dict:
+        """Stay count, exact mean, and median / p90 as the upper edge of their bin (None if open-ended)"""
+        count, total = self._reader().execute(
+            "SELECT COALESCE(SUM(dwell_count), 0), COALESCE(SUM(dwell_total), 0) FROM rollups "
+            "WHERE resolution = ? AND bucket >= ? AND bucket < ?",
+            (RESOLUTIONS['day'], self.calendar.day(start), end)).fetchone()
+        stays = self.dwell_distribution(start, end)['stays'].cumsum().to_numpy()
+
+        def quantile(q: float) -> Optional[float]:
+            if not count:
+                return None
+            index = int((stays >= q * stays[-1]).argmax())
+            return float(DWELL_BIN_EDGES[index]) if index < len(DWELL_BIN_EDGES) else None
+
+        return {
+            'stays': count,
+            'mean_seconds': total / count if count else None,
+            'p50_seconds': quantile(0.5),
+            'p90_seconds': quantile(0.9),
+        }
+
+    def attendance(self, start: float, end: float) -> pd.DataFrame:
+        """Per person over the days in [start, end): days seen, visits, hours inside, last day seen"""
+        rows = self._reader().execute(
+            "SELECT epc, name, MAX(day), COUNT(*), SUM(visits), SUM(seconds) FROM rollup_attendance "
+            "WHERE day >= ? AND day < ? GROUP BY epc",
+            (self.calendar.day(start), end)).fetchall()
+        df = pd.DataFrame.from_records(rows, columns=('epc', 'name', 'last_day', 'days', 'visits', 'seconds'))
+        df['hours'] = df.pop('seconds') / 3600
+        df['last_day'] = _local_index(df['last_day']).date
+        return df.sort_values(['days', 'hours'], ascending=False, ignore_index=True)
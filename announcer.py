@@ -0,0 +1,204 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, List, NamedTuple, Optional
+
+from instrumentation import REGISTRY as INSTRUMENTS
+from runtime import RUNTIME, Runtime
+
+# ----------- Announcer Configuration ------------
+URGENT = 0
+NORMAL = 1
+LOW = 2
+
+DEFAULT_MAX_PENDING = 50         # queued announcements before the oldest least urgent is dropped
+DEFAULT_COALESCE_WINDOW = 0.5    # seconds to gather grants into one sentence
+DEFAULT_MAX_AGE = 10.0           # announcements older than this are skipped
+LATENCY_SAMPLE_SIZE = 500
+
+
+def join_names(names: List[str]) -> str:
+    """'A', 'A, and B', 'A, B, and C' - the phrasing used by every announcement"""
+    if len(names) == 1:
+        return names[0]
+    return ", ".join(names[:-1]) + f", and {names[-1]}"
+
+
+class Announcement(NamedTuple):
+    priority: int
+    seq: int
+    created_at: float  # time.monotonic()
+    text: str
+    grant_name: Optional[str] = None  # set for access grants, which may be coalesced
+
+
+# ----------- TTS Backends ------------
+class Pyttsx3Backend:
+    """Speaks through one pyttsx3 engine, created lazily on the speech thread"""
+
+    def __init__(self):
+        self._engine = None
+        self._failed = False
+
+    def speak(self, text: str):
+        if self._failed:
+            return
+        try:
+            if self._engine is None:
+                import pyttsx3
+                self._engine = pyttsx3.init()
+            self._engine.say(text)
+            self._engine.runAndWait()
+        except Exception as e:
+            print(f"TTS Error: {e}")
+            if self._engine is None:
+                self._failed = True
+
+
+class StubBackend:
+    """Records announcements instead of speaking them (headless runs and benchmarks)"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.spoken: List[str] = []
+
+    def speak(self, text: str):
+        if self.delay:
+            time.sleep(self.delay)
+        self.spoken.append(text)
+
+
+# ----------- Announcer ------------
+class Announcer:
+    """Single long-lived TTS worker fed by a bounded priority queue.
+
+    Grants queued within ``coalesce_window`` of each other are spoken as
+    one sentence, announcements older than ``max_age`` are dropped, and
+    when the queue is full the oldest of the least urgent announcements
+    gives way. The worker is a coroutine on the runtime loop; the blocking
+    backend call runs on one dedicated speech thread, since TTS engines
+    expect to be driven from a single thread.
+    """
+
+    def __init__(self, backend=None, max_pending: int = DEFAULT_MAX_PENDING,
+                 coalesce_window: float = DEFAULT_COALESCE_WINDOW,
+                 max_age: float = DEFAULT_MAX_AGE, runtime: Runtime = RUNTIME):
+        self.backend = backend if backend is not None else Pyttsx3Backend()
+        self.max_pending = max_pending
+        self.coalesce_window = coalesce_window
+        self.max_age = max_age
+        self.runtime = runtime
+
+        self._heap: List[Announcement] = []
+        self._cond = threading.Condition()
+        self._wake = asyncio.Event()         # set on the loop when something is queued
+        self._seq = itertools.count()
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLE_SIZE)
+        self.counters = {'queued': 0, 'spoken': 0, 'coalesced': 0,
+                         'dropped_stale': 0, 'dropped_full': 0}
+
+        self._speech = ThreadPoolExecutor(1, thread_name_prefix="announcer-speech")
+        self._worker = runtime.spawn("announcer", self._run)
+
+    # ----- producers -----
+    def say(self, text: str, priority: int = NORMAL):
+        self._enqueue(Announcement(priority, next(self._seq), time.monotonic(), text))
+
+    def announce_grant(self, name: str):
+        """Queue an entry greeting; nearby grants are merged into one sentence"""
+        self._enqueue(Announcement(NORMAL, next(self._seq), time.monotonic(),
+                                   f"Access granted to {name}. Welcome to the Lab", name))
+
+    def _enqueue(self, item: Announcement):
+        with INSTRUMENTS.time('tts_enqueue'), self._cond:
+            self.counters['queued'] += 1
+            if len(self._heap) >= self.max_pending:
+                self.counters['dropped_full'] += 1
+                lowest = max(a.priority for a in self._heap)
+                if item.priority > lowest:
+                    return
+                # The oldest of the least urgent gives way; newer news wins ties
+                self._heap.remove(min(a for a in self._heap if a.priority == lowest))
+                heapq.heapify(self._heap)
+            heapq.heappush(self._heap, item)
+        self.runtime.call_soon(self._wake.set)
+
+    # ----- lifecycle -----
+    def stop(self, timeout: float = 2.0):
+        """Stop the worker; an announcement being spoken is allowed to finish"""
+        self._worker.stop(timeout)
+        self._speech.shutdown(wait=False, cancel_futures=True)
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Wait until nothing is queued (for tests and shutdown)"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._heap and time.monotonic() < deadline:
+                self._cond.wait(0.05)
+            return not self._heap
+
+    # ----- worker -----
+    async def _next_text(self):
+        """Pop the next announcement to speak, waiting until there is one"""
+        while True:
+            with self._cond:
+                item = heapq.heappop(self._heap) if self._heap else None
+                if item is None:
+                    self._wake.clear()
+            if item is None:
+                await self._wake.wait()
+                continue
+            if time.monotonic() - item.created_at > self.max_age:
+                with self._cond:
+                    self.counters['dropped_stale'] += 1
+                    self._cond.notify_all()
+                continue
+            if item.grant_name is None:
+                with self._cond:
+                    self._cond.notify_all()
+                return item.text, item.created_at
+
+            # Let more grants arrive, then fold every pending grant in
+            remaining = item.created_at + self.coalesce_window - time.monotonic()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+            with self._cond:
+                grants = [item] + [a for a in self._heap if a.grant_name is not None]
+                if len(grants) > 1:
+                    self._heap = [a for a in self._heap if a.grant_name is None]
+                    heapq.heapify(self._heap)
+                    grants.sort(key=lambda a: a.seq)
+                    self.counters['coalesced'] += len(grants) - 1
+                self._cond.notify_all()
+            names = list(dict.fromkeys(a.grant_name for a in grants))
+            return f"Access granted to {join_names(names)}. Welcome to the Lab", grants[0].created_at
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            text, created_at = await self._next_text()
+            self._latencies.append(time.monotonic() - created_at)
+            await loop.run_in_executor(self._speech, self.backend.speak, text)
+            self.counters['spoken'] += 1
+
+    # ----- metrics -----
+    def stats(self) -> dict:
+        samples = sorted(self._latencies)
+
+        def pct(p):
+            if not samples:
+                return 0.0
+            return samples[min(int(round(p / 100.0 * (len(samples) - 1))), len(samples) - 1)]
+
+        stats = dict(self.counters)
+        stats.update({
+            'pending': len(self._heap),
+            'latency_p50': pct(50),
+            'latency_p95': pct(95),
+            'latency_max': samples[-1] if samples else 0.0,
+        })
+        return stats
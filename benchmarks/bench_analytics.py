@@ -0,0 +1,131 @@
+"""Historical analytics: rollup build, incremental update and 12-month queries.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_analytics [--days 365] [--people 1000]
+
+Writes a synthetic history of weekday visits (access decisions plus
+entry/exit events) straight into an event store, folds it into the
+rollups, then times each dashboard query over the whole range against
+the same answer computed from the raw events.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import pandas as pd
+
+from analytics import Analytics
+from benchmarks.loadgen import tag_epc
+from event_store import EventStore
+
+INSERT = ("INSERT INTO events (ts, kind, status, action, epc, name, reason, duration) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+def day_events(day_start: float, people: int, rng: random.Random):
+    """One day of visits, oldest first: most people on weekdays, a few at weekends"""
+    weekday = time.localtime(day_start + 43200).tm_wday
+    rate = 0.7 if weekday < 5 else 0.1
+    rows = []
+    for person in range(people):
+        if rng.random() >= rate:
+            continue
+        epc, name = tag_epc(person), f"Person {person}"
+        enter = day_start + rng.uniform(7, 11) * 3600
+        stay = min(rng.lognormvariate(9.6, 0.6), 20 * 3600)  # median ~4h
+        rows.append((enter, 'access', 'GRANTED', 'ENTRY', epc, name, 'Access granted - ENTRY', None))
+        rows.append((enter, 'occupancy', None, 'ENTRY', epc, name, None, None))
+        rows.append((enter + stay, 'access', 'GRANTED', 'EXIT', epc, name, 'Access granted - EXIT', None))
+        rows.append((enter + stay, 'occupancy', None, 'EXIT', epc, name, None, stay))
+        if rng.random() < 0.02:
+            rows.append((enter - 5, 'access', 'DENIED', None, epc, name, 'Outside permitted hours', None))
+    rows.sort(key=lambda row: row[0])
+    return rows
+
+
+def best_of(fn, repeats: int = 3) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def raw_attendance(conn, start, end):
+    return conn.execute(
+        "SELECT epc, COUNT(*), SUM(duration) FROM events "
+        "WHERE kind = 'occupancy' AND ts >= ? AND ts < ? GROUP BY epc", (start, end)).fetchall()
+
+
+def raw_hourly_peak(conn, start, end):
+    """Replay every entry/exit to find the most people inside per hour"""
+    df = pd.read_sql_query(
+        "SELECT ts, action FROM events WHERE kind = 'occupancy' AND ts >= ? AND ts < ? ORDER BY ts",
+        conn, params=(start, end))
+    level = (df['action'] == 'ENTRY').astype(int).mul(2).sub(1).cumsum()
+    return level.groupby((df['ts'] // 3600).astype(int)).max()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--people', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    today = time.mktime(time.localtime()[:3] + (0, 0, 0, 0, 0, -1))
+    first_day = today - args.days * 86400
+
+    with tempfile.TemporaryDirectory() as workdir:
+        store = EventStore(os.path.join(workdir, 'events.db'))
+        conn = store.connect()
+        with conn:
+            for day in range(args.days):
+                conn.executemany(INSERT, day_events(first_day + day * 86400, args.people, rng))
+        events = store.count()
+
+        analytics = Analytics(store)
+        start = time.perf_counter()
+        analytics.update()
+        build = time.perf_counter() - start
+        print(f"{args.days} days, {args.people:,} people: {events:,} events")
+        print(f"initial rollup: {build:.2f} s ({events / build:,.0f} events/s)")
+
+        latencies = []
+        for hour in range(24):
+            with conn:
+                batch = [row for row in day_events(today, args.people, rng)
+                         if today + hour * 3600 <= row[0] < today + (hour + 1) * 3600]
+                conn.executemany(INSERT, batch)
+            start = time.perf_counter()
+            analytics.update()
+            latencies.append(time.perf_counter() - start)
+        print(f"incremental update of one hour of events: median {statistics.median(latencies) * 1000:.1f} ms, "
+              f"max {max(latencies) * 1000:.1f} ms")
+
+        span = (first_day, time.time())
+        queries = [
+            ('hourly occupancy (peak)', lambda: analytics.occupancy(*span, 'hour'),
+             lambda: raw_hourly_peak(conn, *span)),
+            ('attendance per person', lambda: analytics.attendance(*span),
+             lambda: raw_attendance(conn, *span)),
+            ('dwell distribution', lambda: analytics.dwell_distribution(*span), None),
+            ('dwell summary', lambda: analytics.dwell_summary(*span), None),
+            ('weekday x hour heatmap', lambda: analytics.heatmap(*span, 'entries'), None),
+            ('daily traffic', lambda: analytics.traffic(*span, 'day'), None),
+        ]
+        print(f"\n{args.days}-day queries {'rollups ms':>24} {'raw events ms':>14}")
+        for label, rolled, raw in queries:
+            raw_ms = f"{best_of(raw) * 1000:>14.0f}" if raw is not None else f"{'':>14}"
+            print(f"{label:<28} {best_of(rolled) * 1000:>12.1f} {raw_ms}")
+        conn.close()
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
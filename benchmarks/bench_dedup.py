@@ -0,0 +1,44 @@
+"""Throughput benchmark for ReadDeduplicator.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_dedup [--reads 1000000] [--tags 2000] [--rate 10000]
+"""
+import argparse
+import random
+import time
+
+from read_dedup import ReadDeduplicator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reads', type=int, default=1_000_000)
+    parser.add_argument('--tags', type=int, default=2_000, help='distinct EPCs in the field')
+    parser.add_argument('--rate', type=float, default=10_000.0, help='simulated reads per second')
+    parser.add_argument('--cooldown', type=float, default=5.0)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    epcs = [f"A02A0610{i:016X}" for i in range(args.tags)]
+    reads = [(rng.choice(epcs), rng.uniform(-70.0, -30.0)) for _ in range(args.reads)]
+    step = 1.0 / args.rate
+
+    dedup = ReadDeduplicator(cooldown=args.cooldown)
+    start = time.perf_counter()
+    now = 0.0
+    for epc, rssi in reads:
+        now += step
+        dedup.offer(epc, rssi, now)
+    elapsed = time.perf_counter() - start
+
+    stats = dedup.stats()
+    print(f"reads: {args.reads:,} over {now:.1f} simulated s from {args.tags:,} tags")
+    print(f"processed in {elapsed:.2f} s -> {args.reads / elapsed:,.0f} reads/s "
+          f"({elapsed / args.reads * 1e6:.2f} us/read)")
+    print(f"forwarded: {stats['events_forwarded']:,}  suppressed: {stats['reads_suppressed']:,}  "
+          f"tags tracked at end: {stats['tags_tracked']:,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""Accuracy and latency of DirectionInferrer on a replay corpus of synthetic walk-throughs.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_direction                      # replay the bundled corpus
+    python -m benchmarks.bench_direction --generate --tags 2000 [--save corpus.csv]
+
+Each tag starts outside and walks through the door repeatedly, sometimes
+loitering on one side without crossing. Reads arrive at ``--read-rate`` per
+antenna while the tag is in range; each read is lost with ``--miss``
+probability and reported by the opposite antenna with ``--bleed``
+probability. The corpus records every read plus the ground truth of each
+walk, so one file replays identically everywhere.
+
+The same reads are also scored with the old behaviour (deduplicated
+passes toggling ENTRY/EXIT) for comparison.
+"""
+import argparse
+import bisect
+import csv
+import os
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Tuple
+
+from direction import DEFAULT_CONFIRM_READS, DEFAULT_REFRACTORY, DEFAULT_WINDOW, DirectionInferrer
+from read_dedup import ReadDeduplicator
+from zones import IN, OUT
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'walkthroughs.csv')
+OUTER_ANTENNA = 1
+INNER_ANTENNA = 2
+LOITER = 'none'
+
+
+class Walk(NamedTuple):
+    epc: str
+    direction: str   # IN, OUT or LOITER
+    start: float
+    cross: float     # moment the tag passes the door (== start for loiters)
+    end: float
+
+
+class Read(NamedTuple):
+    t: float
+    epc: str
+    antenna: int
+
+
+# ----------- Corpus ------------
+def _reads_on(rng, epc, antenna, start, end, rate, miss, bleed, out: List[Read]):
+    other = INNER_ANTENNA if antenna == OUTER_ANTENNA else OUTER_ANTENNA
+    t = start + rng.expovariate(rate)
+    while t < end:
+        if rng.random() >= miss:
+            out.append(Read(t, epc, other if rng.random() < bleed else antenna))
+        t += rng.expovariate(rate)
+
+
+def generate(tags: int, walks: int, loiter: float, read_rate: float, miss: float, bleed: float,
+             seed: int) -> Tuple[List[Walk], List[Read]]:
+    rng = random.Random(seed)
+    truth: List[Walk] = []
+    reads: List[Read] = []
+    for i in range(tags):
+        epc = f"A02A0610{i:016X}"
+        inside = False
+        t = rng.uniform(0, 600)
+        for _ in range(walks):
+            side = INNER_ANTENNA if inside else OUTER_ANTENNA
+            if rng.random() < loiter:
+                end = t + rng.uniform(1.0, 4.0)
+                _reads_on(rng, epc, side, t, end, read_rate, miss, bleed, reads)
+                truth.append(Walk(epc, LOITER, t, t, end))
+            else:
+                cross = t + rng.uniform(0.5, 1.5)
+                end = cross + rng.uniform(0.5, 1.5)
+                other = OUTER_ANTENNA if inside else INNER_ANTENNA
+                _reads_on(rng, epc, side, t, cross, read_rate, miss, bleed, reads)
+                _reads_on(rng, epc, other, cross, end, read_rate, miss, bleed, reads)
+                truth.append(Walk(epc, OUT if inside else IN, t, cross, end))
+                inside = not inside
+            t = end + rng.uniform(10, 120)
+    reads.sort()
+    return truth, reads
+
+
+def save(path: str, truth: List[Walk], reads: List[Read]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['kind', 't', 'epc', 'antenna', 'direction', 'start', 'end'])
+        for w in truth:
+            writer.writerow(['walk', f"{w.cross:.4f}", w.epc, '', w.direction, f"{w.start:.4f}", f"{w.end:.4f}"])
+        for r in reads:
+            writer.writerow(['read', f"{r.t:.4f}", r.epc, r.antenna, '', '', ''])
+
+
+def load(path: str) -> Tuple[List[Walk], List[Read]]:
+    truth: List[Walk] = []
+    reads: List[Read] = []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            if row['kind'] == 'walk':
+                truth.append(Walk(row['epc'], row['direction'], float(row['start']),
+                                  float(row['t']), float(row['end'])))
+            else:
+                reads.append(Read(float(row['t']), row['epc'], int(row['antenna'])))
+    reads.sort()
+    return truth, reads
+
+
+# ----------- Scoring ------------
+def _state_at(changes: Dict[str, List[Tuple[float, bool]]], epc: str, t: float) -> bool:
+    history = changes.get(epc, [])
+    i = bisect.bisect_right(history, (t, True))
+    return history[i - 1][1] if i else False
+
+
+def score(truth: List[Walk], reads: List[Read], window: float, refractory: float,
+          confirm_reads: int) -> dict:
+    inferrer = DirectionInferrer(OUTER_ANTENNA, INNER_ANTENNA, window=window, refractory=refractory,
+                                 confirm_reads=confirm_reads)
+    crossings = defaultdict(list)
+    start = time.perf_counter()
+    for r in reads:
+        crossing = inferrer.observe(r.epc, r.antenna, r.t)
+        if crossing is not None:
+            crossings[r.epc].append(crossing)
+    elapsed = time.perf_counter() - start
+
+    # Baseline: one deduplicated pass per walk toggles inside/outside
+    dedup = ReadDeduplicator()
+    toggles = defaultdict(list)
+    for r in reads:
+        if dedup.offer(r.epc, None, r.t):
+            inside = not (toggles[r.epc][-1][1] if toggles[r.epc] else False)
+            toggles[r.epc].append((r.t, inside))
+
+    inferred = {epc: [(c.detected_at, c.direction == IN) for c in found] for epc, found in crossings.items()}
+    counts = dict.fromkeys(('crossings', 'loiters', 'correct', 'wrong_direction', 'missed', 'extra',
+                            'false_crossings', 'state_ok', 'baseline_state_ok'), 0)
+    latencies = []
+    inside = defaultdict(bool)  # true state per tag, walks are in time order per tag
+    for w in sorted(truth, key=lambda w: (w.epc, w.start)):
+        found = [c for c in crossings.get(w.epc, ()) if w.start <= c.detected_at <= w.end + window]
+        if w.direction == LOITER:
+            counts['loiters'] += 1
+            counts['false_crossings'] += len(found)
+        else:
+            counts['crossings'] += 1
+            if not found:
+                counts['missed'] += 1
+            elif found[0].direction != w.direction:
+                counts['wrong_direction'] += 1
+            else:
+                counts['correct'] += 1
+                latencies.append(found[0].detected_at - w.cross)
+            counts['extra'] += max(len(found) - 1, 0)
+
+        if w.direction != LOITER:
+            inside[w.epc] = w.direction == IN
+        checked = w.end + window
+        counts['state_ok'] += _state_at(inferred, w.epc, checked) == inside[w.epc]
+        counts['baseline_state_ok'] += _state_at(toggles, w.epc, checked) == inside[w.epc]
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(int(round(p / 100.0 * (len(latencies) - 1))), len(latencies) - 1)] if latencies else 0.0
+
+    counts.update({'reads': len(reads), 'walks': len(truth), 'seconds': elapsed,
+                   'latency_p50': pct(50), 'latency_p95': pct(95), 'latency_p99': pct(99)})
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', default=CORPUS_PATH, help='replay corpus to score')
+    parser.add_argument('--generate', action='store_true', help='generate a corpus instead of loading one')
+    parser.add_argument('--save', help='write the generated corpus here')
+    parser.add_argument('--tags', type=int, default=200)
+    parser.add_argument('--walks', type=int, default=6, help='walks per tag')
+    parser.add_argument('--loiter', type=float, default=0.15, help='share of walks that never cross')
+    parser.add_argument('--read-rate', type=float, default=15.0, help='reads/s per tag per antenna')
+    parser.add_argument('--miss', type=float, default=0.3, help='probability a read is lost')
+    parser.add_argument('--bleed', type=float, default=0.05, help='probability a read hits the other antenna')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--window', type=float, default=DEFAULT_WINDOW)
+    parser.add_argument('--refractory', type=float, default=DEFAULT_REFRACTORY)
+    parser.add_argument('--confirm-reads', type=int, default=DEFAULT_CONFIRM_READS)
+    args = parser.parse_args()
+
+    if args.generate or not os.path.exists(args.corpus):
+        truth, reads = generate(args.tags, args.walks, args.loiter, args.read_rate,
+                                args.miss, args.bleed, args.seed)
+        if args.save:
+            save(args.save, truth, reads)
+    else:
+        truth, reads = load(args.corpus)
+
+    r = score(truth, reads, args.window, args.refractory, args.confirm_reads)
+    crossings = max(r['crossings'], 1)
+    print(f"walks: {r['walks']:,} ({r['crossings']:,} crossings, {r['loiters']:,} loiters), "
+          f"reads: {r['reads']:,}")
+    print(f"processed in {r['seconds']:.3f} s -> {r['reads'] / r['seconds']:,.0f} reads/s "
+          f"({r['seconds'] / r['reads'] * 1e6:.2f} us/read)")
+    print(f"direction correct: {r['correct'] / crossings:.1%}  wrong: {r['wrong_direction']:,}  "
+          f"missed: {r['missed']:,}  extra: {r['extra']:,}  false on loiter: {r['false_crossings']:,}")
+    print(f"detection latency after crossing: p50 {r['latency_p50'] * 1000:.0f} ms, "
+          f"p95 {r['latency_p95'] * 1000:.0f} ms, p99 {r['latency_p99'] * 1000:.0f} ms")
+    print(f"inside/outside correct after each walk: {r['state_ok'] / r['walks']:.1%} "
+          f"(toggling baseline: {r['baseline_state_ok'] / r['walks']:.1%})")
+
+
+if __name__ == '__main__':
+    main()
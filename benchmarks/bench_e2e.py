@@ -0,0 +1,258 @@
+"""End-to-end load benchmark: generated reads through the real registry, engine, store and matcher.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_e2e                        # paced run of the default profile
+    python -m benchmarks.bench_e2e --max-speed            # ignore timestamps, measure capacity
+    python -m benchmarks.bench_e2e --save-baseline        # record benchmarks/baselines/e2e.json
+    python -m benchmarks.bench_e2e --check                # exit 1 if worse than the baseline
+    python -m benchmarks.bench_e2e --instrument           # with stage timers on, plus their summary
+
+Reads go through ReaderChannel.offer (dedup, bounded queue) into
+CheckpointEngine, whose workers call process_rfid_scan, update occupancy,
+persist to an EventStore and queue announcements on a stub TTS backend.
+Meanwhile a second thread runs compare_active_with_reference over
+everything read so far, as the dashboard does. Streamlit is not involved.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from typing import List, Optional
+
+import pandas as pd
+
+from announcer import Announcer, StubBackend
+from benchmarks.loadgen import LoadProfile, LoadRead, generate, load_trace, save_trace, write_reference_csv
+from checkpoint_engine import CheckpointEngine
+from epc_matching import compare_active_with_reference
+from event_pipeline import QueueMetrics
+from event_store import EventStore
+from instrumentation import REGISTRY as INSTRUMENTS
+from readers import ReaderConfig, ReaderManager
+from reference_registry import ReferenceRegistry
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines', 'e2e.json')
+DRAIN_TIMEOUT = 30.0          # seconds to wait for queued scans after the schedule ends
+COMPARE_INTERVAL = 1.0        # seconds between match-status recomputations
+# Metrics checked against the baseline, with an absolute slack on top of the
+# relative tolerance so sub-millisecond jitter is not reported as a regression
+LOWER_IS_BETTER = {'latency_p50_ms': 1.0, 'latency_p95_ms': 2.0, 'latency_p99_ms': 5.0,
+                   'compare_p50_ms': 10.0, 'peak_rss_mb': 20.0}
+HIGHER_IS_BETTER = {'decisions_per_second': 0.0, 'reads_per_second': 0.0}
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(int(round(pct / 100.0 * (len(samples) - 1))), len(samples) - 1)]
+
+
+async def _idle_feed(channel):
+    await asyncio.Event().wait()
+
+
+class MatchLoop(threading.Thread):
+    """Recomputes match status over all reads so far, like the dashboard's EPC panel"""
+
+    def __init__(self, registry: ReferenceRegistry, seen: List[str], interval: float):
+        super().__init__(name="bench-compare", daemon=True)
+        self.registry = registry
+        self.seen = seen
+        self.interval = interval
+        self.durations: List[float] = []
+        self.stop_event = threading.Event()
+
+    def run(self):
+        reference_df = self.registry.to_dataframe()
+        lookup = self.registry.lookup_series()
+        while not self.stop_event.wait(self.interval):
+            active_df = pd.DataFrame({'EPC': self.seen[:len(self.seen)]})
+            start = time.perf_counter()
+            compare_active_with_reference(active_df, reference_df, lookup=lookup)
+            self.durations.append(time.perf_counter() - start)
+
+
+def run(reads: List[LoadRead], profile: LoadProfile, readers: int, max_speed: bool,
+        use_store: bool, workdir: str) -> dict:
+    reference_path = os.path.join(workdir, 'reference.csv')
+    write_reference_csv(reference_path, profile.tags)
+    registry = ReferenceRegistry(reference_path)
+    registry.refresh()
+
+    store = EventStore(os.path.join(workdir, 'events.db')) if use_store else None
+    announcer = Announcer(StubBackend())
+    manager = ReaderManager([ReaderConfig(f"bench-{i}") for i in range(readers)], feed=_idle_feed)
+    engine = CheckpointEngine(registry, announcer=announcer, readers=manager, store=store)
+    engine.metrics = QueueMetrics(sample_size=len(reads))
+    channels = list(manager.channels.values())
+
+    seen: List[str] = []
+    matcher = MatchLoop(registry, seen, COMPARE_INTERVAL)
+    engine.start()
+    matcher.start()
+
+    start = time.perf_counter()
+    for r in reads:
+        if not max_speed:
+            delay = r.t - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        # Stable across runs (str hash is salted per process)
+        channels[zlib.crc32(r.epc.encode()) % readers].offer(r.epc, r.rssi)
+        seen.append(r.epc)
+    offered = time.perf_counter() - start
+
+    expected = sum(c.dedup.events_forwarded - c.dropped for c in channels)
+    deadline = time.monotonic() + DRAIN_TIMEOUT
+    while engine.metrics.events_processed < expected and time.monotonic() < deadline:
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - start
+
+    matcher.stop_event.set()
+    matcher.join()
+    engine.stop()
+    announcer.stop()
+    events_written = 0
+    if store is not None:
+        store.flush()
+        events_written = store.stats()['events_written']
+        store.close()
+
+    metrics = engine.metrics
+    latencies = list(metrics._latencies)
+    return {
+        'reads': len(reads),
+        'decisions': metrics.events_processed,
+        'dropped': sum(c.dropped for c in channels),
+        'events_persisted': events_written,
+        'offer_seconds': offered,
+        'elapsed_seconds': elapsed,
+        'reads_per_second': len(reads) / offered if offered else 0.0,
+        'decisions_per_second': metrics.events_processed / elapsed if elapsed else 0.0,
+        'latency_p50_ms': percentile(latencies, 50) * 1000,
+        'latency_p95_ms': percentile(latencies, 95) * 1000,
+        'latency_p99_ms': percentile(latencies, 99) * 1000,
+        'latency_max_ms': metrics.max_latency * 1000,
+        'compare_runs': len(matcher.durations),
+        'compare_p50_ms': percentile(matcher.durations, 50) * 1000,
+        'compare_p95_ms': percentile(matcher.durations, 95) * 1000,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def check(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Metrics that regressed by more than ``tolerance`` against the baseline"""
+    regressions = []
+    old = baseline['results']
+    for key, slack in LOWER_IS_BETTER.items():
+        if old.get(key) and results.get(key) is not None and results[key] > old[key] * (1 + tolerance) + slack:
+            regressions.append(f"{key}: {results[key]:.2f} vs baseline {old[key]:.2f}")
+    for key, slack in HIGHER_IS_BETTER.items():
+        if old.get(key) and results.get(key) is not None and results[key] < old[key] * (1 - tolerance) - slack:
+            regressions.append(f"{key}: {results[key]:.2f} vs baseline {old[key]:.2f}")
+    return regressions
+
+
+def main():
+    defaults = LoadProfile()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tags', type=int, default=defaults.tags)
+    parser.add_argument('--pass-rate', type=float, default=defaults.pass_rate, help='tag passes/s outside bursts')
+    parser.add_argument('--reads-per-pass', type=int, default=defaults.reads_per_pass)
+    parser.add_argument('--unknown-ratio', type=float, default=defaults.unknown_ratio)
+    parser.add_argument('--duration', type=float, default=defaults.duration)
+    parser.add_argument('--burst-every', type=float, default=defaults.burst_every, help='0 disables bursts')
+    parser.add_argument('--burst-seconds', type=float, default=defaults.burst_seconds)
+    parser.add_argument('--burst-factor', type=float, default=defaults.burst_factor)
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    parser.add_argument('--readers', type=int, default=1)
+    parser.add_argument('--max-speed', action='store_true', help='offer reads as fast as possible')
+    parser.add_argument('--no-store', action='store_true', help='skip the SQLite event store')
+    parser.add_argument('--trace', help='replay this trace instead of generating one')
+    parser.add_argument('--save-trace', help='write the generated schedule here')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true', help='compare against the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative regression')
+    parser.add_argument('--instrument', action='store_true', help='enable the stage timers during the run')
+    args = parser.parse_args()
+    INSTRUMENTS.enabled = args.instrument
+
+    profile = LoadProfile(args.tags, args.pass_rate, args.reads_per_pass, defaults.read_spacing,
+                          args.unknown_ratio, args.duration, args.burst_every, args.burst_seconds,
+                          args.burst_factor, args.seed)
+    reads = load_trace(args.trace) if args.trace else generate(profile)
+    if args.save_trace:
+        save_trace(args.save_trace, reads)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run(reads, profile, args.readers, args.max_speed, not args.no_store, workdir)
+
+    mode = 'max speed' if args.max_speed else 'paced'
+    print(f"{results['reads']:,} reads ({mode}, {args.readers} reader(s)) -> {results['decisions']:,} decisions, "
+          f"{results['dropped']:,} dropped, {results['events_persisted']:,} events persisted")
+    print(f"throughput: {results['reads_per_second']:,.0f} reads/s offered, "
+          f"{results['decisions_per_second']:,.0f} decisions/s")
+    print(f"read -> decision: p50 {results['latency_p50_ms']:.2f} ms, p95 {results['latency_p95_ms']:.2f} ms, "
+          f"p99 {results['latency_p99_ms']:.2f} ms, max {results['latency_max_ms']:.2f} ms")
+    print(f"match status over all reads: {results['compare_runs']} runs, "
+          f"p50 {results['compare_p50_ms']:.1f} ms, p95 {results['compare_p95_ms']:.1f} ms")
+    if results['peak_rss_mb'] is not None:
+        print(f"peak RSS: {results['peak_rss_mb']:.0f} MB")
+    for row in INSTRUMENTS.stage_summary():
+        print(f"stage {row['stage']}: {row['count']:,} calls, mean {row['mean'] * 1e6:.1f} us, "
+              f"total {row['total'] * 1000:.0f} ms")
+
+    record = {
+        'profile': profile._asdict(),
+        'options': {'readers': args.readers, 'max_speed': args.max_speed, 'store': not args.no_store,
+                    'trace': args.trace, 'instrument': args.instrument},
+        'platform': {'python': platform.python_version(), 'machine': platform.machine(),
+                     'system': platform.system()},
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"no baseline at {args.baseline}; run with --save-baseline first")
+            sys.exit(2)
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['profile'] != record['profile'] or baseline['options'] != record['options']:
+            print("warning: baseline was recorded with a different profile or options")
+        regressions = check(results, baseline, args.tolerance)
+        if regressions:
+            print("REGRESSIONS:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%} of the baseline")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(record, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
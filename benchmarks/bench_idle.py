@@ -0,0 +1,98 @@
+"""Idle cost and restart hygiene of the background workers.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_idle [--seconds 10] [--restarts 20]
+
+Starts the same workers as the dashboard (two simulated readers, their
+decision workers, event store, announcer on a stub backend, heartbeat
+and upload against an address that refuses connections), lets them idle,
+and reports CPU time per second and thread count. Then it runs the
+Restart button's stop/reset/start sequence repeatedly and reports the
+thread count after each cycle, which must not grow.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from announcer import Announcer, StubBackend
+from benchmarks.loadgen import write_reference_csv
+from checkpoint_engine import CheckpointEngine
+from event_store import EventStore
+from heartbeat import HeartbeatMonitor
+from readers import ReaderConfig, ReaderManager
+from reference_registry import ReferenceRegistry
+from runtime import RUNTIME
+from server_sync import ServerSync
+from zones import OUTSIDE, Door, ZoneGraph, ZoneOccupancy
+
+REFUSED_URL = 'http://127.0.0.1:9/'  # discard port: nothing listens, connections fail at once
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--restarts', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path = os.path.join(workdir, 'reference.csv')
+        write_reference_csv(csv_path, 1000)
+        baseline_threads = threading.active_count()
+
+        store = EventStore(os.path.join(workdir, 'events.db'))
+        announcer = Announcer(StubBackend())
+        engine = CheckpointEngine(
+            ReferenceRegistry(csv_path),
+            announcer=announcer,
+            readers=ReaderManager([ReaderConfig('door-a', door='main'), ReaderConfig('door-b', door='main')]),
+            zones=ZoneOccupancy(ZoneGraph([Door('main', OUTSIDE, 'lab')])),
+            store=store,
+        )
+        monitor = HeartbeatMonitor({'primary': REFUSED_URL}, timeout=1.0)
+        sync = ServerSync(store, REFUSED_URL, is_online=lambda: monitor.connected, timeout=1.0)
+
+        engine.start()
+        engine.start_reader()
+        monitor.start()
+        sync.start()
+        time.sleep(1.0)
+
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        time.sleep(args.seconds)
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+        running_threads = threading.active_count()
+
+        counts = []
+        for _ in range(args.restarts):
+            engine.stop_reader()
+            monitor.stop()
+            sync.stop()
+            engine.reset()
+            engine.start_reader()
+            monitor.start()
+            sync.start()
+            counts.append(threading.active_count())
+
+        print(f"idle for {wall:.1f} s: {cpu / wall * 1000:.1f} ms CPU per second")
+        print(f"threads: {baseline_threads} before start, {running_threads} running "
+              f"({running_threads - baseline_threads} added)")
+        print(f"after {args.restarts} restarts: min {min(counts)}, max {max(counts)}, last {counts[-1]}")
+
+        engine.stop()
+        monitor.stop()
+        sync.stop()
+        announcer.stop()
+        store.close()
+        stopped = threading.active_count()
+        RUNTIME.shutdown()
+        print(f"after stopping every component: {stopped} threads; "
+              f"after shutting the runtime down: {threading.active_count()} "
+              f"({', '.join(sorted(t.name for t in threading.enumerate() if t is not threading.main_thread())) or 'none besides main'})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark for compare_active_with_reference.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_matching [--max-active 1000000] [--reference 100000]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from epc_matching import build_lookup, compare_active_with_reference
+
+
+def make_reference(n: int, seed: int = 0) -> pd.DataFrame:
+    """Registry with a few duplicate EPCs and trailing blank rows like ref22.csv"""
+    epcs = [f"A02A0610{i:016X}" for i in range(n)]
+    names = [f"Person {i}" for i in range(n)]
+    df = pd.DataFrame({'EPC': epcs, 'Name': names}, dtype=object)
+    dupes = df.sample(n=max(n // 100, 1), random_state=seed).assign(Name='Duplicate')
+    blanks = pd.DataFrame({'EPC': [None] * 50, 'Name': [None] * 50}, dtype=object)
+    return pd.concat([df, dupes, blanks], ignore_index=True)
+
+
+def make_active(n: int, reference_size: int, unknown_ratio: float = 0.2, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(0, reference_size, size=n)
+    epcs = np.array([f"A02A0610{i:016X}" for i in ids], dtype=object)
+    unknown = rng.random(n) < unknown_ratio
+    epcs[unknown] = "UNKNOWN123456789"
+    return pd.DataFrame({'EPC': epcs})
+
+
+def legacy_compare(active_df, reference_df):
+    """The original per-row apply + per-match column scan, for comparison"""
+    active_df = active_df.copy()
+    reference_epcs = set(reference_df['EPC'])
+    active_df['status'] = active_df['EPC'].apply(lambda epc: 'MATCHED ✅' if epc in reference_epcs else 'NOT FOUND ❌')
+    matched_epcs = active_df[active_df['status'] == 'MATCHED ✅']['EPC'].tolist()
+    matched_names = []
+    for epc in matched_epcs:
+        name_row = reference_df[reference_df['EPC'] == epc]
+        if not name_row.empty:
+            matched_names.append(name_row.iloc[0]['Name'])
+    return active_df, matched_names, matched_epcs
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reference', type=int, default=100_000)
+    parser.add_argument('--max-active', type=int, default=1_000_000)
+    parser.add_argument('--legacy-max', type=int, default=1_000,
+                        help='largest active size to time the legacy implementation on')
+    args = parser.parse_args()
+
+    reference_df = make_reference(args.reference)
+    lookup, build_s = timed(build_lookup, reference_df)
+    print(f"reference rows: {len(reference_df):,}  unique EPCs: {len(lookup):,}  "
+          f"lookup build: {build_s * 1000:.1f} ms")
+    print(f"{'active rows':>12} {'vectorized ms':>14} {'rows/s':>14} {'legacy ms':>12}")
+
+    size = 1_000
+    while size <= args.max_active:
+        active_df = make_active(size, args.reference)
+        (_, names, epcs), fast_s = timed(compare_active_with_reference, active_df, reference_df, lookup=lookup)
+        legacy = ''
+        if size <= args.legacy_max:
+            (_, old_names, old_epcs), slow_s = timed(legacy_compare, active_df, reference_df)
+            assert old_epcs == epcs and old_names == names
+            legacy = f"{slow_s * 1000:.1f}"
+        print(f"{size:>12,} {fast_s * 1000:>14.1f} {size / fast_s:>14,.0f} {legacy:>12}")
+        size *= 10
+
+
+if __name__ == '__main__':
+    main()
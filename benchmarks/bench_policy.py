@@ -0,0 +1,106 @@
+"""Scan decision latency with the access policy, by number of rules.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_policy [--tags 200000] [--scans 200000] [--rules 0,100,10000,200000]
+
+Times process_rfid_scan for the same scan stream without a policy and
+with policies of growing size: one badge rule per listed tag, spread over
+``--roles`` roles that each have their own zones and schedule windows
+(with anti-passback on). Latency should not depend on the rule count.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from access_policy import AccessPolicy, DAY_NAMES
+from benchmarks.loadgen import tag_epc, unknown_epc, write_reference_csv
+from checkpoint import LabOccupancyTracker, process_rfid_scan
+from reference_registry import ReferenceRegistry
+
+
+def make_policy(rules: int, roles: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    role_names = [f"role-{i}" for i in range(roles)]
+    return {
+        'anti_passback': True,
+        'default_role': role_names[0],
+        'roles': {
+            name: {
+                'zones': ['lab', f"zone-{i % 7}"],
+                'schedule': [f"{DAY_NAMES[i % 5]}-sun 00:00-23:59", f"mon-{DAY_NAMES[i % 7]} 22:00-06:00"],
+            }
+            for i, name in enumerate(role_names)
+        },
+        'badges': {
+            tag_epc(i): {'role': rng.choice(role_names),
+                         **({'expires': '2099-12-31'} if i % 3 == 0 else {})}
+            for i in range(rules)
+        },
+    }
+
+
+def run(scans, registry, policy):
+    """Per-scan latency in microseconds and the number of scans denied"""
+    tracker = LabOccupancyTracker()
+    timings, denied = [], 0
+    clock = time.perf_counter_ns
+    for epc, action in scans:
+        start = clock()
+        result = process_rfid_scan(epc, registry, tracker, action, policy=policy, move=('outside', 'lab'))
+        timings.append((clock() - start) / 1000)
+        denied += result['status'] == 'DENIED'
+    return timings, denied
+
+
+def check_ns(policy, scans) -> float:
+    """Mean cost of AccessPolicy.check alone, in nanoseconds"""
+    now = time.time()
+    start = time.perf_counter_ns()
+    for epc, action in scans:
+        policy.check(epc, action or 'ENTRY', now, False, 'outside', 'lab')
+    return (time.perf_counter_ns() - start) / len(scans)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tags', type=int, default=200_000)
+    parser.add_argument('--scans', type=int, default=200_000)
+    parser.add_argument('--rules', default='0,100,10000,200000', help='comma-separated badge rule counts')
+    parser.add_argument('--roles', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    scans = [(tag_epc(rng.randrange(args.tags)) if rng.random() < 0.9 else unknown_epc(rng.randrange(1000)),
+              rng.choice(('ENTRY', 'EXIT', None)))
+             for _ in range(args.scans)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path = os.path.join(workdir, 'reference.csv')
+        write_reference_csv(csv_path, args.tags)
+        registry = ReferenceRegistry(csv_path)
+        registry.refresh()
+
+        print(f"{args.tags:,} registered tags, {args.scans:,} scans, {args.roles} roles")
+        print(f"{'rules':>10} {'compile s':>10} {'check ns':>9} {'mean us':>8} {'p50 us':>7} {'p99 us':>7} {'denied':>7}")
+        baseline, denied = run(scans, registry, None)
+        print(f"{'no policy':>10} {'':>10} {'':>9} {statistics.fmean(baseline):>8.2f} "
+              f"{statistics.median(baseline):>7.2f} {statistics.quantiles(baseline, n=100)[98]:>7.2f} "
+              f"{denied / args.scans:>7.0%}")
+
+        for rules in (int(r) for r in args.rules.split(',')):
+            policy = AccessPolicy()
+            start = time.perf_counter()
+            policy.load(make_policy(rules, args.roles))
+            compile_s = time.perf_counter() - start
+            timings, denied = run(scans, registry, policy)
+            print(f"{rules:>10,} {compile_s:>10.2f} {check_ns(policy, scans):>9.0f} "
+                  f"{statistics.fmean(timings):>8.2f} {statistics.median(timings):>7.2f} "
+                  f"{statistics.quantiles(timings, n=100)[98]:>7.2f} {denied / args.scans:>7.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Registry cold start: CSV parse vs memory-mapped snapshot.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_registry [--tags 1000000]
+
+Each cold start runs in a fresh interpreter (imports included) and ends
+with one lookup, the way the engine's first decision would.
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.loadgen import tag_epc, write_reference_csv
+from reference_registry import ReferenceRegistry
+from registry_snapshot import SnapshotIndex, read_registry_csv, write_snapshot
+
+COLD_START = """
+import sys, time
+start = time.perf_counter()
+from reference_registry import ReferenceRegistry
+registry = ReferenceRegistry(sys.argv[1], sys.argv[2] or None)
+registry.refresh()
+assert registry.lookup(sys.argv[3]) is not None
+print(time.perf_counter() - start, registry.source)
+"""
+
+
+def cold_start(args, repeats: int = 3) -> float:
+    """Best wall time from interpreter start of the snippet to the first lookup"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    best = float('inf')
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', COLD_START, *args], cwd=root,
+                             capture_output=True, text=True, check=True).stdout.split()
+        best = min(best, float(out[0]))
+    return best
+
+
+def lookups_per_second(lookup, epcs) -> float:
+    start = time.perf_counter()
+    for epc in epcs:
+        lookup(epc)
+    return len(epcs) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tags', type=int, default=1_000_000)
+    parser.add_argument('--lookups', type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path = os.path.join(workdir, 'reference.csv')
+        snapshot_path = os.path.join(workdir, 'reference.rsnap')
+        write_reference_csv(csv_path, args.tags)
+        probe = tag_epc(args.tags - 1)
+
+        start = time.perf_counter()
+        header, rows, report = read_registry_csv(csv_path)
+        write_snapshot(snapshot_path, header, rows, source=csv_path)
+        import_seconds = time.perf_counter() - start
+
+        csv_cold = cold_start([csv_path, '', probe])
+        snapshot_cold = cold_start([csv_path, snapshot_path, probe])
+
+        rng = random.Random(0)
+        epcs = [tag_epc(rng.randrange(args.tags)) for _ in range(args.lookups)]
+        registry = ReferenceRegistry(csv_path)
+        registry.refresh()
+        snapshot = SnapshotIndex(snapshot_path)
+
+        print(f"{args.tags:,} tags: CSV {os.path.getsize(csv_path) / 1e6:.1f} MB, "
+              f"snapshot {os.path.getsize(snapshot_path) / 1e6:.1f} MB")
+        print(f"bulk import (validate, normalize, write snapshot): {import_seconds:.2f} s, "
+              f"{report.rows_kept:,} rows kept")
+        print(f"cold start to first lookup: CSV {csv_cold * 1000:,.0f} ms, snapshot {snapshot_cold * 1000:,.1f} ms")
+        print(f"lookups: dict {lookups_per_second(registry.lookup, epcs):,.0f}/s, "
+              f"snapshot {lookups_per_second(snapshot.get, epcs):,.0f}/s")
+
+
+if __name__ == '__main__':
+    main()
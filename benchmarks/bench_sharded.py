@@ -0,0 +1,78 @@
+"""Scaling of sharded matching across worker processes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sharded [--reference 2000000] [--active 300000] [--workers 1,2,4,8]
+
+Times the same hash join in a single process (ShardedMatcher with one
+chunk and processes=False) as the baseline, then ShardedMatcher with each
+worker count (pool started and shards loaded beforehand). Checks every
+result is identical to compare_active_with_reference and reports speedup
+and scaling efficiency (speedup / workers) against that baseline, plus the
+share of the pool's capacity spent on chunk work. The vectorized
+in-process match is printed for reference only; it is a different
+algorithm, so it is not what the speedup is measured against.
+"""
+import argparse
+import os
+import time
+
+from benchmarks.bench_matching import make_active, make_reference
+from epc_matching import build_lookup, compare_active_with_reference
+from sharded_matching import ShardedMatcher
+
+
+def best_of(repeats, fn, *args, **kwargs):
+    best, result = float('inf'), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    cores = os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1))) or [1]
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reference', type=int, default=2_000_000)
+    parser.add_argument('--active', type=int, default=300_000)
+    parser.add_argument('--workers', default=','.join(map(str, default_workers)),
+                        help='comma-separated worker counts')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    reference_df = make_reference(args.reference)
+    lookup = build_lookup(reference_df)
+    active_df = make_active(args.active, args.reference)
+    print(f"{len(lookup):,} registered EPCs, {len(active_df):,} active reads, {cores} core(s)")
+
+    (_, names, epcs), vectorized = best_of(args.repeats, compare_active_with_reference,
+                                           active_df, reference_df, lookup=lookup)
+    baseline = ShardedMatcher(1, processes=False)
+    baseline.load(lookup)
+    (_, serial_names, serial_epcs), serial = best_of(args.repeats, baseline.compare,
+                                                     active_df, reference_df, lookup=lookup)
+    baseline.close()
+    assert serial_names == names and serial_epcs == epcs
+    print(f"vectorized match_epcs (reference only): {vectorized * 1000:,.0f} ms")
+    print(f"single-process hash join (baseline):    {serial * 1000:,.0f} ms")
+    print(f"{'workers':>8} {'load s':>8} {'ms':>9} {'speedup':>8} {'efficiency':>11} {'pool busy':>10}")
+
+    for workers in (int(w) for w in args.workers.split(',')):
+        matcher = ShardedMatcher(workers)
+        start = time.perf_counter()
+        matcher.load(lookup)
+        load_s = time.perf_counter() - start
+        matcher.compare(active_df, reference_df, lookup=lookup)  # start the pool
+        (_, sharded_names, sharded_epcs), elapsed = best_of(args.repeats, matcher.compare,
+                                                            active_df, reference_df, lookup=lookup)
+        assert sharded_names == names and sharded_epcs == epcs
+        speedup = serial / elapsed
+        print(f"{workers:>8} {load_s:>8.2f} {elapsed * 1000:>9,.0f} {speedup:>8.2f} "
+              f"{speedup / workers:>10.0%} {matcher.last_stats['pool_busy']:>10.0%}")
+        matcher.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Replayable RFID load: a seeded schedule of tag reads with bursts and unknown tags.
+
+A schedule is a list of LoadRead sorted by time. The same LoadProfile
+always yields the same schedule, and save_trace()/load_trace() keep one on
+disk so a run can be replayed exactly (or shared).
+"""
+import csv
+import os
+import random
+from typing import List, NamedTuple
+
+
+class LoadProfile(NamedTuple):
+    """Shape of the generated load"""
+    tags: int = 10_000            # registered tag population
+    pass_rate: float = 200.0      # tag passes per second outside bursts
+    reads_per_pass: int = 5       # raw reads the reader reports per pass
+    read_spacing: float = 0.02    # seconds between reads within a pass
+    unknown_ratio: float = 0.05   # share of passes by unregistered tags
+    duration: float = 20.0        # seconds of schedule
+    burst_every: float = 10.0     # seconds between burst starts (0 disables bursts)
+    burst_seconds: float = 2.0    # length of each burst
+    burst_factor: float = 5.0     # pass-rate multiplier during a burst
+    seed: int = 0
+
+
+class LoadRead(NamedTuple):
+    t: float      # seconds from the start of the schedule
+    epc: str
+    rssi: float
+
+
+def tag_epc(i: int) -> str:
+    return f"A02A0610{i:016X}"
+
+
+def unknown_epc(i: int) -> str:
+    return f"FFFF0000{i:016X}"
+
+
+def in_burst(profile: LoadProfile, t: float) -> bool:
+    return profile.burst_every > 0 and (t % profile.burst_every) < profile.burst_seconds
+
+
+def generate(profile: LoadProfile) -> List[LoadRead]:
+    rng = random.Random(profile.seed)
+    reads: List[LoadRead] = []
+    t = 0.0
+    unknown = 0
+    while True:
+        rate = profile.pass_rate * (profile.burst_factor if in_burst(profile, t) else 1.0)
+        t += rng.expovariate(rate)
+        if t >= profile.duration:
+            break
+        if rng.random() < profile.unknown_ratio:
+            epc = unknown_epc(unknown)
+            unknown += 1
+        else:
+            epc = tag_epc(rng.randrange(profile.tags))
+        for k in range(profile.reads_per_pass):
+            reads.append(LoadRead(t + k * profile.read_spacing, epc, rng.uniform(-70.0, -30.0)))
+    reads.sort()
+    return reads
+
+
+def write_reference_csv(path: str, tags: int):
+    """Reference file in the same layout as ref22.csv for the generated population"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['EPC', 'Name'])
+        for i in range(tags):
+            writer.writerow([tag_epc(i), f"Person {i}"])
+
+
+def save_trace(path: str, reads: List[LoadRead]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['t', 'epc', 'rssi'])
+        for r in reads:
+            writer.writerow([f"{r.t:.6f}", r.epc, f"{r.rssi:.1f}"])
+
+
+def load_trace(path: str) -> List[LoadRead]:
+    with open(path, newline='') as f:
+        return [LoadRead(float(row['t']), row['epc'], float(row['rssi'])) for row in csv.DictReader(f)]
@@ -0,0 +1,210 @@
+import random
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+ENTRY_EXIT_LOG_LIMIT = 500  # recent entries kept in memory; full history goes to the event sink
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def format_timestamp(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime(TIMESTAMP_FORMAT)
+
+
+def format_duration(seconds: float) -> str:
+    """'Xh Ym' over the whole duration (stays correct past 24 hours)"""
+    seconds = max(int(seconds), 0)
+    return f"{seconds // 3600}h {(seconds % 3600) // 60}m"
+
+
+# ----------- Lab Occupancy Tracking ------------
+class OccupantRecord:
+    """One person (or asset) currently inside, keyed by EPC"""
+    __slots__ = ('epc', 'name', 'entry_ts', 'entry_mono')
+
+    def __init__(self, epc: str, name: str, entry_ts: float, entry_mono: float):
+        self.epc = epc
+        self.name = name
+        self.entry_ts = entry_ts      # wall clock, for display and persistence
+        self.entry_mono = entry_mono  # monotonic clock, for dwell times
+
+    @property
+    def entry_time(self) -> str:
+        return format_timestamp(self.entry_ts)
+
+    def dwell_seconds(self, now_mono: Optional[float] = None) -> float:
+        now_mono = time.monotonic() if now_mono is None else now_mono
+        return now_mono - self.entry_mono
+
+
+class LabOccupancyTracker:
+    """Current occupants keyed by EPC, kept in entry order.
+
+    Membership, count and longest-dwell lookups are O(1): the OrderedDict
+    holds occupants oldest entry first, so the longest stay is always at
+    the front. occupants_by_entry() is rebuilt only after a change.
+    """
+
+    def __init__(self, event_sink: Optional[Callable[[Dict], None]] = None):
+        self._occupants: 'OrderedDict[str, OccupantRecord]' = OrderedDict()
+        self.entry_exit_log = deque(maxlen=ENTRY_EXIT_LOG_LIMIT)
+        self.event_sink = event_sink
+        self.version = 0
+        self._view: Tuple[OccupantRecord, ...] = ()
+        self._view_version = 0
+
+    def _log(self, entry: Dict):
+        self.entry_exit_log.append(entry)
+        if self.event_sink is not None:
+            self.event_sink(entry)
+
+    def _insert(self, record: OccupantRecord):
+        self._occupants.pop(record.epc, None)
+        self._occupants[record.epc] = record
+        self.version += 1
+
+    def restore(self, name: str, epc: str, entry_ts: float):
+        """Mark someone present without logging a new entry (used after restart)"""
+        entry_mono = time.monotonic() - max(time.time() - entry_ts, 0.0)
+        self._insert(OccupantRecord(epc, name, entry_ts, entry_mono))
+
+    def person_entered(self, name: str, epc: str, ts: Optional[float] = None) -> OccupantRecord:
+        """Record person entering the lab"""
+        ts = time.time() if ts is None else ts
+        record = OccupantRecord(epc, name, ts, time.monotonic())
+        self._insert(record)
+        self._log({
+            'name': name,
+            'epc': epc,
+            'action': 'ENTRY',
+            'timestamp': format_timestamp(ts),
+            'ts': ts
+        })
+        return record
+
+    def person_exited(self, epc: str, ts: Optional[float] = None) -> Optional[Dict]:
+        """Record person exiting the lab; returns the exit log entry"""
+        record = self._occupants.pop(epc, None)
+        if record is None:
+            return None
+        self.version += 1
+        return self._log_exit(record, time.time() if ts is None else ts, time.monotonic())
+
+    def _log_exit(self, record: OccupantRecord, ts: float, now_mono: float) -> Dict:
+        seconds = record.dwell_seconds(now_mono)
+        entry = {
+            'name': record.name,
+            'epc': record.epc,
+            'action': 'EXIT',
+            'timestamp': format_timestamp(ts),
+            'ts': ts,
+            'duration': format_duration(seconds),
+            'duration_seconds': seconds
+        }
+        self._log(entry)
+        return entry
+
+    def is_present(self, epc: str) -> bool:
+        return epc in self._occupants
+
+    __contains__ = is_present
+
+    def get_occupant(self, epc: str) -> Optional[OccupantRecord]:
+        return self._occupants.get(epc)
+
+    def get_occupancy_count(self) -> int:
+        """Get current occupancy count"""
+        return len(self._occupants)
+
+    def longest_dwell(self) -> Optional[OccupantRecord]:
+        """Occupant who has been inside the longest"""
+        return next(iter(self._occupants.values()), None)
+
+    def occupants_by_entry(self) -> Tuple[OccupantRecord, ...]:
+        """Immutable view of current occupants, oldest entry first"""
+        if self._view_version != self.version:
+            self._view = tuple(self._occupants.values())
+            self._view_version = self.version
+        return self._view
+
+    def force_exit_all(self, ts: Optional[float] = None) -> int:
+        """Force exit all occupants (for emergency or system reset)"""
+        records = self._occupants
+        if not records:
+            return 0
+        self._occupants = OrderedDict()
+        self.version += 1
+        ts = time.time() if ts is None else ts
+        now_mono = time.monotonic()
+        for record in records.values():
+            self._log_exit(record, ts, now_mono)
+        return len(records)
+
+# ----------- RFID Simulation ------------
+def simulate_rfid_scan():
+    return random.choice([
+        "A02A061028A201547A021102",
+        "A02A061028A201548A021802",
+        "A02A061028A201550A021902",
+        "UNKNOWN123456789"
+    ])
+
+def process_rfid_scan(card_id, registry, tracker, action=None, policy=None, move=None):
+    """Decide on one scan. ``action`` comes from the zone graph when the reader
+    covers a known door; without it a present badge exits and any other enters.
+
+    With an AccessPolicy, a registered badge is also checked against its
+    rules; ``move`` is the (from_zone, to_zone) of the crossing, if known.
+    """
+    name = registry.lookup(card_id)
+    ts = time.time()
+    timestamp = format_timestamp(ts)
+    
+    if name is None:
+        return {
+            'status': 'DENIED',
+            'reason': 'User not found',
+            'name': 'Unknown',
+            'card_id': card_id,
+            'timestamp': timestamp
+        }
+    
+    if action is None:
+        # Check if the badge is already inside (for exit tracking)
+        action = 'EXIT' if tracker.is_present(card_id) else 'ENTRY'
+
+    if policy is not None:
+        from_zone, to_zone = move if move is not None else (None, None)
+        reason = policy.check(card_id, action, ts, tracker.is_present(card_id), from_zone, to_zone)
+        if reason is not None:
+            return {
+                'status': 'DENIED',
+                'reason': reason,
+                'name': name,
+                'card_id': card_id,
+                'timestamp': timestamp,
+                'message': f"Access denied for {name}. {reason}"
+            }
+
+    if action == 'EXIT':
+        # Person is exiting
+        tracker.person_exited(card_id, ts)
+        message = f"Goodbye {name}. Thank you for visiting the lab."
+    elif action == 'ENTRY':
+        # Person is entering
+        tracker.person_entered(name, card_id, ts)
+        message = f"Access granted to {name}. Welcome to the Lab"
+    else:
+        # Moving between zones inside the perimeter
+        message = f"Access granted to {name}"
+    
+    return {
+        'status': 'GRANTED',
+        'reason': f'Access granted - {action}',
+        'name': name,
+        'card_id': card_id,
+        'timestamp': timestamp,
+        'action': action,
+        'message': message
+    }
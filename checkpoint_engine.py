@@ -0,0 +1,294 @@
+import asyncio
+import threading
+from collections import deque
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from checkpoint import LabOccupancyTracker, OccupantRecord, format_timestamp, process_rfid_scan
+from event_pipeline import BatchBudget, QueueMetrics, drain_events
+from readers import DEFAULT_READER_ID, ReaderChannel, ReaderConfig, ReaderManager
+from zones import IN, OUT, OUTSIDE, ZoneOccupancy
+from event_store import EventStore
+from access_stats import AccessStats
+from announcer import Announcer
+from access_policy import AccessPolicy
+from reference_registry import normalize_epc
+from instrumentation import REGISTRY as INSTRUMENTS
+from runtime import RUNTIME, Runtime, Worker
+
+# ----------- Engine Configuration ------------
+ACCESS_LOG_LIMIT = 50         # access log entries kept in the published snapshot
+REFRESH_INTERVAL = 1.0        # seconds between checks of the registry and policy files
+
+# Lab-wide action for an inferred crossing at a reader without a mapped door
+DIRECTION_ACTIONS = {IN: 'ENTRY', OUT: 'EXIT'}
+
+
+class EngineSnapshot(NamedTuple):
+    """Read-only view of engine state published after every change"""
+    version: int
+    running: bool
+    access_logs: Tuple[dict, ...]
+    last_scan: Optional[dict]
+    occupants: Tuple[OccupantRecord, ...]  # oldest entry first
+    zone_counts: Dict[str, int]             # people per zone (empty without a zone graph)
+
+
+# ----------- Checkpoint Engine ------------
+class CheckpointEngine:
+    """Headless checkpoint service: owns the reader feeds, occupancy state and logs.
+
+    Each reader has its own bounded queue and decision worker, so adding a
+    door adds a consumer instead of lengthening one queue; workers only
+    share the brief state update under the engine lock. The workers are
+    coroutines on the shared runtime loop and sleep until a scan arrives.
+    Results do not depend on whether (or how many) dashboards are open.
+    The dashboard only calls snapshot() and the command methods below.
+    """
+
+    def __init__(self, registry, announcer: Optional[Announcer] = None,
+                 budget: BatchBudget = BatchBudget(), log_limit: int = ACCESS_LOG_LIMIT,
+                 readers: Optional[ReaderManager] = None, zones: Optional[ZoneOccupancy] = None,
+                 store: Optional[EventStore] = None, policy: Optional[AccessPolicy] = None,
+                 runtime: Runtime = RUNTIME):
+        self.registry = registry
+        self.runtime = runtime
+        self.policy = policy
+        self.announcer = announcer
+        self.budget = budget
+        self.readers = readers or ReaderManager([ReaderConfig(DEFAULT_READER_ID)])
+        self.zones = zones
+        self.store = store
+        self.metrics = QueueMetrics()
+        self.stats = AccessStats()
+        self.tracker = self._new_tracker()
+        self._restore_occupancy()
+
+        self._logs = deque(maxlen=log_limit)
+        self._last_scan: Optional[dict] = None
+        self._lock = threading.RLock()
+        self._version = 0
+        self._workers: List[Worker] = []
+        self._publish()  # occupants restored from the store show before the first scan
+
+    # ----- lifecycle -----
+    def start(self):
+        """Start one decision worker per reader, plus the file refresher (idempotent)"""
+        if any(worker.running for worker in self._workers):
+            return
+        self._workers = [
+            self.runtime.spawn(f"checkpoint-engine-{channel.reader_id}",
+                               lambda channel=channel: self._run(channel))
+            for channel in self.readers.channels.values()
+        ]
+        self._workers.append(self.runtime.spawn("checkpoint-refresh", self._refresh))
+
+    def stop(self):
+        """Stop the reader feeds and the workers, waiting for them to exit"""
+        self.stop_reader()
+        self.runtime.stop_workers(self._workers)
+        self._workers = []
+
+    def start_reader(self):
+        """Start every reader feed"""
+        self.readers.start()
+        self._publish()
+
+    def stop_reader(self):
+        self.readers.stop()
+        self._publish()
+
+    @property
+    def running(self) -> bool:
+        return self.readers.running
+
+    # ----- inputs -----
+    def submit(self, card_id: str, reader_id: Optional[str] = None, antenna: Optional[int] = None):
+        """Queue a scan for a decision, bypassing read deduplication (the reader normalizes the EPC)"""
+        self.readers.channel(reader_id).submit(card_id, antenna)
+
+    def submit_read(self, epc: str, rssi: Optional[float] = None, reader_id: Optional[str] = None,
+                    antenna: Optional[int] = None) -> bool:
+        """Feed a raw reader report; only the first read of each pass is queued"""
+        return self.readers.channel(reader_id).offer(epc, rssi, antenna)
+
+    def log_bulk_access(self, matched_names: List[str], matched_epcs: List[str]) -> List[str]:
+        """Log every matched user and mark them present; returns the names granted.
+
+        A badge not yet inside is checked against the access policy as an
+        entry at the perimeter door would be, and logged DENIED with the
+        rule's reason if refused. Newly present badges are placed in that
+        door's inner zone, so their next read there is an exit, not a
+        second entry. Badges already inside are logged as granted.
+        """
+        ts = time.time()
+        timestamp = format_timestamp(ts)
+        entry_zone = self.zones.graph.entry_zone() if self.zones is not None else None
+        granted = []
+        with self._lock:
+            for i, name in enumerate(matched_names):
+                epc = normalize_epc(matched_epcs[i]) if i < len(matched_epcs) else "Unknown"
+                result = {
+                    'status': 'GRANTED',
+                    'reason': 'Bulk access granted',
+                    'name': name,
+                    'card_id': epc,
+                    'timestamp': timestamp
+                }
+                if not self.tracker.is_present(epc):
+                    reason = None
+                    if self.policy is not None:
+                        from_zone = OUTSIDE if entry_zone is not None else None
+                        reason = self.policy.check(epc, 'ENTRY', ts, False, from_zone, entry_zone)
+                    if reason is not None:
+                        result.update(status='DENIED', reason=reason,
+                                      message=f"Access denied for {name}. {reason}")
+                    else:
+                        self.tracker.person_entered(name, epc, ts)
+                        if entry_zone is not None and self.zones.zone_of(epc) == OUTSIDE:
+                            self.zones.move(epc, entry_zone)
+                            result['zone'] = entry_zone
+                self._log_access(result)
+                if result['status'] == 'GRANTED':
+                    granted.append(name)
+        self._publish()
+        return granted
+
+    def force_exit_all(self):
+        with self._lock:
+            self.tracker.force_exit_all()
+            if self.zones is not None:
+                self.zones.clear()
+        self._publish()
+
+    def reset(self):
+        """Clear logs, occupancy and any pending scans.
+
+        Occupants are exited first so the persisted history agrees with the
+        empty lab a restart would otherwise restore.
+        """
+        with self._lock:
+            self.tracker.force_exit_all()
+            if self.zones is not None:
+                self.zones.clear()
+            self.readers.clear()
+            self._logs.clear()
+            self._last_scan = None
+            self.stats = AccessStats()
+            self.tracker = self._new_tracker()
+        self._publish()
+
+    # ----- outputs -----
+    def snapshot(self) -> EngineSnapshot:
+        """Latest published state; safe to read from any thread"""
+        return self._snapshot
+
+    def access_stats(self) -> dict:
+        """Totals, windowed counts and top users for the statistics panel"""
+        return self.stats.snapshot()
+
+    def queue_stats(self) -> dict:
+        """Scan queue gauges and dedup counters summed over readers, plus per-reader detail"""
+        channels = list(self.readers.channels.values())
+        stats = self.metrics.snapshot(*(channel.queue for channel in channels))
+        per_reader = self.readers.stats()
+        for key in ('reads_seen', 'events_forwarded', 'reads_suppressed', 'tags_tracked', 'dropped'):
+            stats[key] = sum(reader[key] for reader in per_reader.values())
+        stats['readers'] = per_reader
+        return stats
+
+    # ----- internals -----
+    def _new_tracker(self) -> LabOccupancyTracker:
+        sink = None
+        if self.store is not None:
+            # Called under the engine lock, which the loop needs: never wait for room here
+            sink = lambda entry: self.store.append('occupancy', entry, block=False)
+        return LabOccupancyTracker(event_sink=sink)
+
+    def _restore_occupancy(self):
+        """Rebuild who is in the lab from the persisted entry/exit history"""
+        if self.store is None:
+            return
+        # History written before scans were normalized may hold other spellings
+        for row in self.store.open_occupancy():
+            self.tracker.restore(row['name'], normalize_epc(row['epc']), row['ts'])
+        if self.zones is not None:
+            for epc, zone in self.store.last_zones().items():
+                epc = normalize_epc(epc)
+                if zone != OUTSIDE and self.tracker.is_present(epc):
+                    self.zones.move(epc, zone)
+
+    def _log_access(self, result: dict):
+        self._logs.append(result)
+        self.stats.record(result)
+        if self.store is not None:
+            self.store.append('access', result, block=False)
+
+    def _publish(self):
+        with self._lock:
+            self._version += 1
+            self._snapshot = EngineSnapshot(
+                version=self._version,
+                running=self.running,
+                access_logs=tuple(self._logs),
+                last_scan=self._last_scan,
+                occupants=self.tracker.occupants_by_entry(),
+                zone_counts=self.zones.counts() if self.zones is not None else {},
+            )
+
+    def _zone_action(self, event) -> Tuple[Optional[str], Optional[Tuple[str, str]]]:
+        """(action, (from_zone, to_zone)) for a scan; (None, None) falls back to toggling.
+
+        An inferred direction decides the action on its own; without one a
+        mapped door assumes the tag is crossing away from its current zone.
+        """
+        if event.card_id not in self.registry:
+            return None, None
+        if self.zones is None or event.door is None:
+            return DIRECTION_ACTIONS.get(event.direction), None
+        move = self.zones.preview(event.card_id, event.door, event.direction)
+        from_zone, to_zone = move
+        if to_zone == OUTSIDE:
+            return 'EXIT', move
+        if from_zone == OUTSIDE:
+            return 'ENTRY', move
+        return 'MOVE', move
+
+    def _handle(self, event) -> dict:
+        with INSTRUMENTS.time('scan_process'), self._lock:
+            action, move = self._zone_action(event)
+            result = process_rfid_scan(event.card_id, self.registry, self.tracker, action,
+                                       policy=self.policy, move=move)
+            result['reader_id'] = event.reader_id
+            result['antenna'] = event.antenna
+            if move is not None and result['status'] == 'GRANTED':
+                self.zones.move(event.card_id, move[1])
+                result['zone'] = move[1]
+            self._log_access(result)
+            self._last_scan = result
+        if self.announcer is not None:
+            if result.get('action') == 'ENTRY':
+                self.announcer.announce_grant(result['name'])
+            elif result['status'] == 'DENIED':
+                self.announcer.say(result.get('message', "Access denied. Unknown user"))
+            elif result.get('action') == 'EXIT':
+                self.announcer.say(result['message'])
+            # Moves between inner zones are not announced
+        return result
+
+    async def _run(self, channel: ReaderChannel):
+        while True:
+            if self.store is not None:
+                # Backpressure: a full write buffer holds decisions, and the reader queue absorbs it
+                await self.store.wait_writable()
+            results = await drain_events(channel.queue, self._handle, self.budget, self.metrics)
+            if results:
+                self._publish()
+
+    async def _refresh(self):
+        """Pick up registry and policy file changes; reloads run on the I/O threads"""
+        while True:
+            await asyncio.to_thread(self.registry.refresh)
+            if self.policy is not None:
+                await asyncio.to_thread(self.policy.refresh)
+            await asyncio.sleep(REFRESH_INTERVAL)
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from zones import IN, OUT
+
+# ----------- Direction Configuration ------------
+DEFAULT_WINDOW = 3.0         # max seconds between the last read on one side and the first on the other
+DEFAULT_REFRACTORY = 2.0     # seconds after a crossing during which the tag cannot cross back
+DEFAULT_CONFIRM_READS = 2    # reads on a side, with none on the other between, to believe it
+DEFAULT_MAX_TAGS = 100_000   # hard cap on tracked tags (LRU eviction beyond it)
+
+OUTER_SIDE = 0
+INNER_SIDE = 1
+
+
+class Crossing(NamedTuple):
+    """A door crossing inferred from an outer -> inner (IN) or inner -> outer (OUT) read order"""
+    epc: str
+    direction: str
+    left_side_at: float   # last read on the side the tag came from
+    detected_at: float    # read that confirmed the side it reached
+
+
+class TagTrack:
+    """Per-tag state machine: confirmed side, reads pending on the other side, last crossing"""
+    __slots__ = ('side', 'last_seen', 'pending_side', 'pending_reads', 'pending_since',
+                 'crossed_at', 'touched')
+
+    def __init__(self, now: float):
+        self.side: Optional[int] = None   # unknown until confirm_reads agree
+        self.last_seen = now              # last read on the confirmed side
+        self.pending_side: Optional[int] = None
+        self.pending_reads = 0
+        self.pending_since = now
+        self.crossed_at: Optional[float] = None
+        self.touched = now                # last read on either side, for expiry
+
+
+# ----------- Direction Inference ------------
+class DirectionInferrer:
+    """Turns reads from a paired outer/inner antenna into IN/OUT crossings.
+
+    A side counts once ``confirm_reads`` reads land on it with no read on
+    the other side in between, so a stray read bleeding onto the wrong
+    antenna is ignored. A tag confirmed on one side and then, within
+    ``window`` seconds, on the other has crossed in that order. Reads on a
+    single side never produce a crossing, so a missed read costs one event
+    instead of inverting the tag's state, and someone loitering at the door
+    is not logged at all. After a crossing the reverse crossing is ignored
+    for ``refractory`` seconds so a tag standing between the antennas
+    cannot flap.
+
+    Tracks are kept in an LRU ordered by last read and expired from the
+    front in amortized O(1), like ReadDeduplicator.
+    """
+
+    def __init__(self, outer_antenna: int, inner_antenna: int, window: float = DEFAULT_WINDOW,
+                 refractory: float = DEFAULT_REFRACTORY, confirm_reads: int = DEFAULT_CONFIRM_READS,
+                 max_tags: int = DEFAULT_MAX_TAGS):
+        if outer_antenna == inner_antenna:
+            raise ValueError("outer and inner antenna must differ")
+        self.sides = {outer_antenna: OUTER_SIDE, inner_antenna: INNER_SIDE}
+        self.window = window
+        self.refractory = refractory
+        self.confirm_reads = max(confirm_reads, 1)
+        self.max_tags = max_tags
+        self._ttl = max(window, refractory)
+        self._tags: 'OrderedDict[str, TagTrack]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.reads_seen = 0
+        self.reads_ignored = 0   # reads from antennas outside the pair
+        self.crossings = 0
+        self.suppressed_flaps = 0
+
+    def observe(self, epc: str, antenna: int, now: Optional[float] = None) -> Optional[Crossing]:
+        """Record a read; returns the crossing it completes, if any"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.reads_seen += 1
+            side = self.sides.get(antenna)
+            if side is None:
+                self.reads_ignored += 1
+                return None
+
+            track = self._tags.get(epc)
+            if track is None:
+                track = self._tags[epc] = TagTrack(now)
+            else:
+                self._tags.move_to_end(epc)
+            track.touched = now
+            crossing = self._advance(epc, track, side, now)
+            self._evict(now)
+        return crossing
+
+    def _advance(self, epc: str, track: TagTrack, side: int, now: float) -> Optional[Crossing]:
+        if side == track.side:
+            track.last_seen = now
+            track.pending_reads = 0
+            return None
+
+        if track.pending_side != side or not track.pending_reads or now - track.pending_since > self.window:
+            track.pending_side = side
+            track.pending_reads = 0
+            track.pending_since = now
+        track.pending_reads += 1
+        if track.pending_reads < self.confirm_reads:
+            return None
+        track.pending_reads = 0
+
+        previous_side, left_at = track.side, track.last_seen
+        if previous_side is not None and now - left_at <= self.window:
+            if track.crossed_at is not None and now - track.crossed_at < self.refractory:
+                self.suppressed_flaps += 1
+                return None
+            track.side = side
+            track.last_seen = now
+            track.crossed_at = now
+            self.crossings += 1
+            return Crossing(epc, IN if side == INNER_SIDE else OUT, left_at, now)
+
+        # First sighting, or the other side was too long ago: a fresh approach from here
+        track.side = side
+        track.last_seen = now
+        return None
+
+    def _evict(self, now: float):
+        tags = self._tags
+        while tags:
+            oldest = next(iter(tags.values()))
+            if now - oldest.touched <= self._ttl and len(tags) <= self.max_tags:
+                break
+            tags.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            'reads_seen': self.reads_seen,
+            'events_forwarded': self.crossings,
+            'reads_suppressed': self.reads_seen - self.crossings,
+            'tags_tracked': len(self._tags),
+            'reads_ignored': self.reads_ignored,
+            'suppressed_flaps': self.suppressed_flaps,
+        }
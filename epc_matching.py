@@ -0,0 +1,75 @@
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from reference_registry import normalize_epc
+
+# ----------- Match Labels ------------
+MATCHED_LABEL = 'MATCHED ✅'
+NOT_FOUND_LABEL = 'NOT FOUND ❌'
+
+
+def normalize_epcs(epcs: pd.Series) -> pd.Series:
+    """normalize_epc every cell and turn blank cells into missing values"""
+    epcs = epcs.astype(object).map(normalize_epc, na_action='ignore')
+    return epcs.mask(epcs == '')
+
+
+def build_lookup(reference_df: pd.DataFrame) -> pd.Series:
+    """EPC-indexed Series of names, one entry per EPC (first occurrence wins)"""
+    if reference_df.empty or 'EPC' not in reference_df.columns:
+        return pd.Series([], index=pd.Index([], dtype=object), dtype=object)
+    epcs = normalize_epcs(reference_df['EPC'])
+    keep = epcs.notna().to_numpy()
+    names = reference_df['Name'] if 'Name' in reference_df.columns else pd.Series(None, index=reference_df.index)
+    lookup = pd.Series(names.to_numpy()[keep], index=pd.Index(epcs.to_numpy()[keep], dtype=object), dtype=object)
+    return lookup[~lookup.index.duplicated(keep='first')]
+
+
+def match_epcs(active_epcs: pd.Series, lookup: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Hash-join active EPCs against the lookup.
+
+    Returns a boolean match mask aligned with ``active_epcs`` and the
+    positions of each matched row in ``lookup``. Readers report the same
+    tag many times, so the join runs on the distinct EPCs only.
+    """
+    codes, uniques = pd.factorize(active_epcs, use_na_sentinel=True)
+    unique_epcs = normalize_epcs(pd.Series(uniques, dtype=object))
+    unique_positions = lookup.index.get_indexer(unique_epcs.to_numpy())
+    # Blank cells never count as a match, even if the registry has blank rows
+    unique_positions[unique_epcs.isna().to_numpy()] = -1
+
+    positions = np.where(codes >= 0, unique_positions[codes], -1)
+    matched = positions >= 0
+    return matched, positions[matched]
+
+
+MatchFn = Callable[[pd.Series, pd.Series], Tuple[np.ndarray, np.ndarray]]
+
+
+def compare_active_with_reference(active_df: pd.DataFrame, reference_df: pd.DataFrame,
+                                  lookup: Optional[pd.Series] = None,
+                                  match: MatchFn = match_epcs) -> Tuple[pd.DataFrame, List, List]:
+    """Label each active row and return (result_df, matched_names, matched_epcs).
+
+    ``lookup`` can be passed in (see ReferenceRegistry.lookup_series) to skip
+    rebuilding the EPC index from ``reference_df`` on every call. ``match``
+    replaces the in-process join with another one returning the same
+    (mask, positions) pair, e.g. ShardedMatcher.match_epcs.
+    """
+    if lookup is None:
+        lookup = build_lookup(reference_df)
+
+    result_df = active_df.copy()
+    if 'EPC' not in result_df.columns or result_df.empty:
+        result_df['status'] = NOT_FOUND_LABEL
+        return result_df, [], []
+
+    matched, positions = match(result_df['EPC'], lookup)
+    result_df['status'] = pd.Categorical.from_codes(matched.astype(np.int8),
+                                                    categories=[NOT_FOUND_LABEL, MATCHED_LABEL])
+
+    matched_epcs = lookup.index.to_numpy()[positions].tolist()
+    matched_names = lookup.to_numpy()[positions].tolist()
+    return result_df, matched_names, matched_epcs
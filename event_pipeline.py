@@ -0,0 +1,126 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, List, NamedTuple, Optional
+
+from runtime import BoundedBuffer
+
+# ----------- Batch Configuration ------------
+DEFAULT_MAX_EVENTS = 500      # events handled per drain at most
+DEFAULT_MAX_SECONDS = 0.1     # wall-clock budget per drain
+LATENCY_SAMPLE_SIZE = 1000    # recent read-to-decision latencies kept for percentiles
+
+
+class ScanEvent(NamedTuple):
+    """A single tag read waiting in a reader's scan queue"""
+    card_id: str
+    read_at: float  # time.monotonic() when the read was queued
+    reader_id: Optional[str] = None
+    antenna: Optional[int] = None
+    door: Optional[str] = None       # door the reader covers, if zones are configured
+    direction: Optional[str] = None  # zones.IN / zones.OUT when inferred from antenna order
+
+
+def make_scan_event(card_id: str, reader_id: Optional[str] = None, antenna: Optional[int] = None,
+                    door: Optional[str] = None, direction: Optional[str] = None) -> ScanEvent:
+    return ScanEvent(card_id, time.monotonic(), reader_id, antenna, door, direction)
+
+
+class BatchBudget(NamedTuple):
+    """Upper bounds for one drain cycle; whichever is hit first ends the batch"""
+    max_events: int = DEFAULT_MAX_EVENTS
+    max_seconds: float = DEFAULT_MAX_SECONDS
+
+
+def oldest_event_age(q: BoundedBuffer, now: Optional[float] = None) -> float:
+    """Seconds the head of the queue has been waiting (0 when empty)"""
+    head = q.head()
+    if head is None:
+        return 0.0
+    now = time.monotonic() if now is None else now
+    return max(now - head.read_at, 0.0)
+
+
+# ----------- Queue Metrics ------------
+class QueueMetrics:
+    """Queue depth, event age and read-to-decision latency for the scan queue"""
+
+    def __init__(self, sample_size: int = LATENCY_SAMPLE_SIZE):
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=sample_size)
+        self.events_processed = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.last_batch_seconds = 0.0
+        self.max_latency = 0.0
+
+    def record_batch(self, latencies: List[float], seconds: float):
+        with self._lock:
+            self._latencies.extend(latencies)
+            self.events_processed += len(latencies)
+            self.batches += 1
+            self.last_batch_size = len(latencies)
+            self.last_batch_seconds = seconds
+            if latencies:
+                self.max_latency = max(self.max_latency, max(latencies))
+
+    def latency_percentile(self, pct: float) -> float:
+        """Latency percentile (seconds) over the recent sample window"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return 0.0
+        rank = min(int(round(pct / 100.0 * (len(samples) - 1))), len(samples) - 1)
+        return samples[rank]
+
+    def snapshot(self, *queues: BoundedBuffer) -> dict:
+        """Current gauges for display, summed over the given queues"""
+        return {
+            'queue_depth': sum(q.qsize() for q in queues),
+            'oldest_event_age': max((oldest_event_age(q) for q in queues), default=0.0),
+            'events_processed': self.events_processed,
+            'batches': self.batches,
+            'last_batch_size': self.last_batch_size,
+            'last_batch_seconds': self.last_batch_seconds,
+            'latency_p50': self.latency_percentile(50),
+            'latency_p95': self.latency_percentile(95),
+            'latency_max': self.max_latency,
+        }
+
+
+# ----------- Batch Consumer ------------
+async def drain_events(q: BoundedBuffer, handler: Callable[[ScanEvent], Any],
+                       budget: BatchBudget = BatchBudget(),
+                       metrics: Optional[QueueMetrics] = None) -> List[Any]:
+    """Wait for an event, then run handler over pending events until the
+    queue is empty or the budget is spent.
+
+    The batch itself runs without yielding to the loop; the budget bounds
+    how long other workers wait. Events left over stay queued in order for
+    the next cycle.
+    """
+    await q.wait_ready()
+    results = []
+    latencies = []
+    try:
+        event = q.get_nowait()
+    except queue.Empty:
+        return results
+    start = time.monotonic()
+    deadline = start + budget.max_seconds
+
+    while True:
+        results.append(handler(event))
+        now = time.monotonic()
+        latencies.append(now - event.read_at)
+        if now >= deadline or len(results) >= budget.max_events:
+            break
+        try:
+            event = q.get_nowait()
+        except queue.Empty:
+            break
+
+    if metrics is not None:
+        metrics.record_batch(latencies, time.monotonic() - start)
+    return results
@@ -0,0 +1,341 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from runtime import RUNTIME, BoundedBuffer, Runtime
+
+# ----------- Store Configuration ------------
+DEFAULT_BATCH_SIZE = 1000        # events written per transaction at most
+DEFAULT_RETENTION_DAYS = 400     # a year of checkpoint history plus margin
+COMPACT_INTERVAL = 3600          # seconds between retention passes
+COMPACT_CHUNK = 10_000           # rows deleted per retention transaction
+MAX_PENDING = 100_000            # writes buffered in memory before producers block
+COMMIT_RETRY_BASE = 0.5          # first delay before retrying a failed commit (seconds)
+COMMIT_RETRY_MAX = 30.0          # retry delay cap
+CLOSE_TIMEOUT = 10.0             # seconds close() waits for pending writes
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id       INTEGER PRIMARY KEY,
+    ts       REAL NOT NULL,
+    kind     TEXT NOT NULL,
+    status   TEXT,
+    action   TEXT,
+    epc      TEXT,
+    name     TEXT,
+    reason   TEXT,
+    duration REAL,
+    reader   TEXT,
+    zone     TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS idx_events_epc_ts ON events (epc, ts);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id    INTEGER PRIMARY KEY,
+    ts    REAL NOT NULL,
+    error TEXT NOT NULL,
+    row   TEXT NOT NULL
+);
+"""
+
+# Rows above this id have not been acknowledged by the central server yet
+SYNC_CURSOR_KEY = 'sync_cursor'
+# Rows above this id have not been folded into the analytics rollups yet
+ROLLUP_CURSOR_KEY = 'rollup_cursor'
+
+
+# Columns added after the first release, created on open if missing
+_ADDED_COLUMNS = (('reader', 'TEXT'), ('zone', 'TEXT'))
+
+_COLUMNS = ('ts', 'kind', 'status', 'action', 'epc', 'name', 'reason', 'duration', 'reader', 'zone')
+_INSERT = f"INSERT INTO events ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+_INSERT_DEAD_LETTER = "INSERT INTO dead_letters (ts, error, row) VALUES (?, ?, ?)"
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+# ----------- Event Store ------------
+class EventStore:
+    """Durable, append-only log of access and occupancy events (SQLite, WAL mode).
+
+    append() only enqueues; a single writer on the runtime loop
+    group-commits whatever is pending in one transaction, so the scan path
+    never waits on disk. Commits run on the store's own disk thread, never
+    queued behind network calls on the shared I/O threads. A commit that
+    fails for an operational reason (database busy, disk full) is retried
+    with backoff and nothing is dropped: flush() only returns True once rows
+    are on disk, and the full buffer pushes back on producers meanwhile. A
+    batch refused for its contents is written row by row instead, and the
+    rows SQLite rejects go to the dead_letters table, so one bad event
+    cannot stop the writer. Rows older than the retention window are
+    deleted in small chunks while the writer is idle.
+    """
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                 retention_days: float = DEFAULT_RETENTION_DAYS, runtime: Runtime = RUNTIME):
+        self.path = path
+        self.runtime = runtime
+        self.batch_size = batch_size
+        self.retention_seconds = retention_days * 86400
+        self.events_written = 0
+        self.commits = 0
+        self.commit_errors = 0
+        self.events_rejected = 0             # rows moved to dead_letters
+        self.last_error: Optional[str] = None
+
+        self._pending = BoundedBuffer(MAX_PENDING, runtime)
+        self._local = threading.local()
+        self._last_compact = 0.0
+        self._appended = 0
+        self._done = 0                      # rows committed (or failed) so far
+        self._done_cond = threading.Condition()
+
+        conn = sqlite3.connect(path)
+        # auto_vacuum must be chosen before the first table is created
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.executescript(_SCHEMA)
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(events)")}
+        for column, sql_type in _ADDED_COLUMNS:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE events ADD COLUMN {column} {sql_type}")
+        conn.commit()
+        conn.close()
+
+        self._writer_conn = _connect(path)
+        self._disk = ThreadPoolExecutor(1, thread_name_prefix="event-store-disk")
+        self._writer = runtime.spawn("event-store-writer", self._write_loop)
+
+    # ----- writes -----
+    def append(self, kind: str, event: Dict, ts: Optional[float] = None, block: bool = True):
+        """Queue an event for the next group commit.
+
+        A full buffer makes the caller wait for room, unless ``block`` is
+        False: callers holding a lock the loop needs queue the row past the
+        bound instead, since waiting there would stop the writer too.
+        """
+        row = (
+            ts if ts is not None else event.get('ts', time.time()),
+            kind,
+            event.get('status'),
+            event.get('action'),
+            event.get('epc', event.get('card_id')),
+            event.get('name'),
+            event.get('reason'),
+            event.get('duration_seconds'),
+            event.get('reader_id'),
+            event.get('zone'),
+        )
+        with self._done_cond:
+            self._appended += 1
+        # The loop never blocks: its producers wait in wait_writable() before a batch instead
+        self._pending.put(row, timeout=None, force=not block or self.runtime.in_loop())
+
+    async def wait_writable(self):
+        """Wait while the write buffer is full (backpressure for producers on the loop)"""
+        await self._pending.wait_writable()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every event queued so far has been committed (not from the loop)"""
+        with self._done_cond:
+            target = self._appended
+            return self._done_cond.wait_for(lambda: self._done >= target, timeout)
+
+    def close(self, timeout: float = CLOSE_TIMEOUT):
+        if not self.flush(timeout):
+            print(f"Event store closing with {self._appended - self._done} events not written: {self.last_error}")
+        self._writer.stop()
+        self._disk.shutdown(wait=True)
+        self._writer_conn.close()
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._pending.qsize():
+                if time.time() - self._last_compact >= COMPACT_INTERVAL:
+                    await loop.run_in_executor(self._disk, self._maybe_compact)
+                try:
+                    await asyncio.wait_for(self._pending.wait_ready(), COMPACT_INTERVAL)
+                except asyncio.TimeoutError:
+                    continue
+            # Everything that arrived while the previous commit ran goes into this one
+            batch = self._pending.get_batch(self.batch_size)
+            delay = COMMIT_RETRY_BASE
+            while not await loop.run_in_executor(self._disk, self._commit, batch):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, COMMIT_RETRY_MAX)
+
+    def _commit(self, batch: List[tuple]) -> bool:
+        """Write one batch in one transaction; False (batch kept for a retry) on a transient failure"""
+        try:
+            try:
+                with self._writer_conn:
+                    self._writer_conn.executemany(_INSERT, batch)
+                written = len(batch)
+            except sqlite3.OperationalError:
+                raise
+            except sqlite3.Error:
+                # Something in the batch cannot be written: set it aside rather than retry forever
+                written = self._commit_rows(batch)
+        except sqlite3.OperationalError as e:
+            if self.last_error is None:
+                print(f"Event store error, retrying {len(batch)} events: {e}")
+            self.commit_errors += 1
+            self.last_error = str(e)
+            return False
+        if self.last_error is not None:
+            print(f"Event store writing again after {self.last_error}")
+            self.last_error = None
+        self.events_written += written
+        self.commits += 1
+        with self._done_cond:
+            self._done += len(batch)
+            self._done_cond.notify_all()
+        return True
+
+    def _commit_rows(self, batch: List[tuple]) -> int:
+        """Write rows one at a time in one transaction, moving rejected ones to dead_letters"""
+        rejected = 0
+        conn = self._writer_conn
+        with conn:
+            for row in batch:
+                try:
+                    conn.execute(_INSERT, row)
+                except sqlite3.OperationalError:
+                    raise
+                except sqlite3.Error as e:
+                    rejected += 1
+                    conn.execute(_INSERT_DEAD_LETTER, (time.time(), str(e), repr(row)))
+        self.events_rejected += rejected
+        print(f"Event store rejected {rejected} of {len(batch)} events (kept in dead_letters)")
+        return len(batch) - rejected
+
+    # ----- retention -----
+    def _maybe_compact(self):
+        now = time.time()
+        if now - self._last_compact >= COMPACT_INTERVAL:
+            self._last_compact = now
+            self.compact(now)
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """Delete events past the retention window; returns rows removed"""
+        cutoff = (time.time() if now is None else now) - self.retention_seconds
+        conn = self._writer_conn
+        # Never drop events that are still waiting to be uploaded or rolled up
+        cursors = [int(value) for value in map(self.get_meta, (SYNC_CURSOR_KEY, ROLLUP_CURSOR_KEY))
+                   if value is not None]
+        max_id = min(cursors) if cursors else self.max_id()
+        removed = 0
+        while True:
+            with conn:
+                cur = conn.execute(
+                    "DELETE FROM events WHERE id IN "
+                    "(SELECT id FROM events WHERE ts < ? AND id <= ? ORDER BY ts LIMIT ?)",
+                    (cutoff, max_id, COMPACT_CHUNK))
+            removed += cur.rowcount
+            if cur.rowcount < COMPACT_CHUNK:
+                break
+        if removed:
+            conn.execute("PRAGMA incremental_vacuum")
+        return removed
+
+    # ----- queries -----
+    def connect(self) -> sqlite3.Connection:
+        """A new connection to the store's database, for components keeping their own tables in it"""
+        return _connect(self.path)
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = _connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              epc: Optional[str] = None, kind: Optional[str] = None,
+              limit: Optional[int] = 1000, newest_first: bool = True) -> List[Dict]:
+        """Events in [start, end), optionally for one EPC and/or kind"""
+        clauses, params = [], []
+        if epc is not None:
+            clauses.append("epc = ?")
+            params.append(epc)
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(end)
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        sql = "SELECT * FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY ts DESC" if newest_first else " ORDER BY ts"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [dict(row) for row in self._reader().execute(sql, params)]
+
+    def count(self) -> int:
+        return self._reader().execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def max_id(self) -> int:
+        return self._reader().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    def read_after(self, after_id: int, limit: int) -> List[Dict]:
+        """Committed events with id > after_id, oldest first"""
+        rows = self._reader().execute(
+            "SELECT * FROM events WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit))
+        return [dict(row) for row in rows]
+
+    # ----- metadata -----
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._reader().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def set_meta(self, key: str, value: str):
+        conn = self._reader()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def open_occupancy(self) -> List[Dict]:
+        """Latest occupancy event per EPC where that event is an ENTRY"""
+        sql = (
+            "SELECT e.* FROM events e JOIN "
+            "(SELECT epc, MAX(id) AS id FROM events WHERE kind = 'occupancy' GROUP BY epc) last "
+            "ON e.id = last.id WHERE e.action = 'ENTRY' ORDER BY e.ts"
+        )
+        return [dict(row) for row in self._reader().execute(sql)]
+
+    def last_zones(self) -> Dict[str, str]:
+        """Zone each EPC was last granted into, from zone-tagged access events"""
+        sql = (
+            "SELECT e.epc, e.zone FROM events e JOIN "
+            "(SELECT epc, MAX(id) AS id FROM events "
+            "WHERE kind = 'access' AND zone IS NOT NULL GROUP BY epc) last "
+            "ON e.id = last.id"
+        )
+        return {row['epc']: row['zone'] for row in self._reader().execute(sql)}
+
+    def stats(self) -> dict:
+        return {
+            'events_written': self.events_written,
+            'commits': self.commits,
+            'commit_errors': self.commit_errors,
+            'events_rejected': self.events_rejected,
+            'last_error': self.last_error,
+            'pending_writes': self._pending.qsize(),
+        }
@@ -1,133 +1,123 @@
 import streamlit as st
 import pandas as pd
 import time
-import random
-from datetime import datetime, timedelta
-import threading
 import queue
-import os
-import pyttsx3
-import requests
-from typing import Dict, List, Optional
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+from reference_registry import ReferenceRegistry, CachedCsvFile
+from epc_matching import compare_active_with_reference
+from sharded_matching import ShardedMatcher
+from event_pipeline import BatchBudget
+from checkpoint import format_duration
+from checkpoint_engine import CheckpointEngine
+from readers import ReaderConfig, ReaderManager
+from file_tail import CsvTail, tail_feed
+from zones import OUTSIDE, Door, ZoneGraph, ZoneOccupancy
+from event_store import EventStore
+from announcer import Announcer, Pyttsx3Backend, join_names, LOW, NORMAL, URGENT
+from heartbeat import HeartbeatMonitor
+from server_sync import ServerSync
+from instrumentation import REGISTRY as INSTRUMENTS, MetricsServer, SamplingProfiler
+from access_policy import AccessPolicy
+from runtime import RUNTIME
+from analytics import Analytics
 
 # ----------- File Configuration ------------
 REFERENCE_FILE_PATH = "/Users/dhaval/Desktop/RA/ref22.csv"
+REFERENCE_SNAPSHOT_PATH = "/Users/dhaval/Desktop/RA/ref22.rsnap"  # built by registry_snapshot.py; the CSV is read when missing or stale
 ACTIVE_FILE_PATH = "/Users/dhaval/Desktop/RA/Testing.csv"
+ACCESS_POLICY_PATH = "/Users/dhaval/Desktop/RA/access_policy.json"  # per-badge rules, reloaded on change; missing file allows every registered badge
+ACTIVE_FILE_STREAMING = True  # tail the active file by offset and feed new EPCs to the pipeline
+ACTIVE_FILE_READER_ID = "active-file"
+EVENT_STORE_PATH = "checkpoint_events.db"  # SQLite history of access/occupancy events
+EVENT_RETENTION_DAYS = 400
 
 # ----------- Server Configuration ------------
 SERVER_URL = "http://your-server.com/api/heartbeat"  # Replace with your actual server URL
+SYNC_URL = None  # e.g. "https://your-server.com/api/events"; events (names, EPCs, times) are uploaded only once set
+SYNC_MAX_EVENTS_PER_SECOND = 2000  # catch-up rate after an outage
 SERVER_TIMEOUT = 5  # seconds
 CONNECTION_WARNING_THRESHOLD = 60  # seconds
+HEARTBEAT_INTERVAL = 10  # seconds between checks while connected
+HEARTBEAT_ENDPOINTS = {"primary": SERVER_URL}  # add more name: url pairs to monitor them too
+
+# ----------- Event Processing Configuration ------------
+EVENT_BATCH_MAX_EVENTS = 500  # scans processed per cycle at most
+EVENT_BATCH_MAX_SECONDS = 0.1  # time budget per cycle
+READ_COOLDOWN_SECONDS = 5.0  # repeat reads of a tag within this window are one pass
+
+# ----------- Matching Configuration ------------
+SHARDED_MATCH_MIN_ACTIVE = 250_000  # active tables at least this long are matched by a process pool
+SHARDED_MATCH_WORKERS = None  # pool size; None uses one worker per core
+
+# ----------- Reader / Zone Configuration ------------
+# Each door is a crossing between two zones; each reader covers one door
+DOORS = [
+    Door("lab-main", outer_zone=OUTSIDE, inner_zone="lab"),
+]
+READERS = [
+    # Antenna 1 faces the corridor, antenna 2 the lab: read order gives direction
+    ReaderConfig("lab-main-reader", door="lab-main", antennas=(1, 2), outer_antenna=1, inner_antenna=2),
+]
+if ACTIVE_FILE_STREAMING:
+    # EPCs the reader software appends to ACTIVE_FILE_PATH, seen at the main door
+    READERS.append(ReaderConfig(ACTIVE_FILE_READER_ID, door="lab-main"))
+
+# ----------- Instrumentation Configuration ------------
+INSTRUMENTATION_ENABLED = True  # stage timers; when off every hook is a no-op
+METRICS_PORT = 9108  # Prometheus text at http://127.0.0.1:9108/metrics (None disables the endpoint)
+
+# ----------- Display Configuration ------------
+OCCUPANT_DISPLAY_LIMIT = 25  # occupants listed individually in the panels
+REFRESH_INTERVAL = 1.0  # seconds between refreshes of each live panel while running
+REFERENCE_REFRESH_INTERVAL = 10.0  # the reference table changes rarely
+TABLE_PAGE_SIZE = 100  # rows per page of the large tables
+HISTORY_DEFAULT_DAYS = 30  # range of the History panel until another is picked
+HISTORY_REFRESH_INTERVAL = 30.0  # rollups advance every few seconds; history needs no faster refresh
 
 # ----------- Global Queues ------------
-rfid_event_queue = queue.Queue()
-server_status_queue = queue.Queue()
+# Streamlit re-executes this script on every rerun, so process-wide objects
+# live in st.cache_resource to stay shared with the background threads.
+@st.cache_resource
+def get_server_status_queue():
+    return queue.Queue()
+
+server_status_queue = get_server_status_queue()
 
 # ----------- TTS Function ------------
-def speak(text):
-    def _speak():
-        try:
-            engine = pyttsx3.init()
-            engine.say(text)
-            engine.runAndWait()
-        except Exception as e:
-            print(f"TTS Error: {e}")
-    threading.Thread(target=_speak, daemon=True).start()
+@st.cache_resource
+def get_announcer():
+    """One TTS engine and worker thread for the whole process"""
+    return Announcer(Pyttsx3Backend())
 
-# ----------- Server Connection Functions ------------
-def check_server_connection():
-    """Check if server is reachable"""
-    try:
-        response = requests.get(SERVER_URL, timeout=SERVER_TIMEOUT)
-        return response.status_code == 200
-    except Exception:
-        return False
-
-def server_monitor_thread(running_flag):
-    """Background thread to monitor server connectivity"""
-    last_successful_connection = datetime.now()
-    
-    while running_flag['running']:
-        if check_server_connection():
-            last_successful_connection = datetime.now()
-            server_status_queue.put({
-                'status': 'connected',
-                'timestamp': last_successful_connection,
-                'message': 'Server connected'
-            })
-        else:
-            time_since_last_connection = datetime.now() - last_successful_connection
-            if time_since_last_connection.total_seconds() > CONNECTION_WARNING_THRESHOLD:
-                server_status_queue.put({
-                    'status': 'disconnected',
-                    'timestamp': datetime.now(),
-                    'message': f'Server disconnected for {int(time_since_last_connection.total_seconds())} seconds',
-                    'last_connected': last_successful_connection
-                })
-        
-        time.sleep(10)  # Check every 10 seconds
+def speak(text, priority=NORMAL):
+    get_announcer().say(text, priority)
 
-# ----------- Lab Occupancy Tracking ------------
-class LabOccupancyTracker:
-    def __init__(self):
-        self.current_occupants = {}  # {name: entry_timestamp}
-        self.entry_exit_log = []
-    
-    def person_entered(self, name: str, epc: str, timestamp: str):
-        """Record person entering the lab"""
-        self.current_occupants[name] = {
-            'epc': epc,
-            'entry_time': timestamp,
-            'status': 'IN'
-        }
-        self.entry_exit_log.append({
-            'name': name,
-            'epc': epc,
-            'action': 'ENTRY',
-            'timestamp': timestamp
-        })
-    
-    def person_exited(self, name: str, timestamp: str):
-        """Record person exiting the lab"""
-        if name in self.current_occupants:
-            entry_time = self.current_occupants[name]['entry_time']
-            duration = self.calculate_duration(entry_time, timestamp)
-            
-            self.entry_exit_log.append({
-                'name': name,
-                'epc': self.current_occupants[name]['epc'],
-                'action': 'EXIT',
-                'timestamp': timestamp,
-                'duration': duration
-            })
-            
-            del self.current_occupants[name]
-    
-    def calculate_duration(self, entry_time: str, exit_time: str) -> str:
-        """Calculate duration between entry and exit"""
-        try:
-            entry_dt = datetime.strptime(entry_time, '%Y-%m-%d %H:%M:%S')
-            exit_dt = datetime.strptime(exit_time, '%Y-%m-%d %H:%M:%S')
-            duration = exit_dt - entry_dt
-            
-            hours = duration.seconds // 3600
-            minutes = (duration.seconds % 3600) // 60
-            return f"{hours}h {minutes}m"
-        except:
-            return "Unknown"
-    
-    def get_current_occupants(self) -> Dict:
-        """Get list of people currently in the lab"""
-        return self.current_occupants.copy()
-    
-    def get_occupancy_count(self) -> int:
-        """Get current occupancy count"""
-        return len(self.current_occupants)
-    
-    def force_exit_all(self, timestamp: str):
-        """Force exit all occupants (for emergency or system reset)"""
-        for name in list(self.current_occupants.keys()):
-            self.person_exited(name, timestamp)
+# ----------- Server Connection Functions ------------
+@st.cache_resource
+def get_heartbeat_monitor():
+    """Process-wide heartbeat checks over a pooled keep-alive session"""
+    return HeartbeatMonitor(
+        HEARTBEAT_ENDPOINTS,
+        status_queue=server_status_queue,
+        interval=HEARTBEAT_INTERVAL,
+        timeout=SERVER_TIMEOUT,
+        warning_threshold=CONNECTION_WARNING_THRESHOLD,
+    )
+
+@st.cache_resource
+def get_server_sync():
+    """Uploads persisted events whenever the heartbeat reports the server up (None without SYNC_URL)"""
+    if not SYNC_URL:
+        return None
+    monitor = get_heartbeat_monitor()
+    return ServerSync(
+        get_event_store(),
+        SYNC_URL,
+        is_online=lambda: monitor.connected,
+        max_events_per_second=SYNC_MAX_EVENTS_PER_SECOND,
+    )
 
 # ----------- Enhanced Functions ------------
 def announce_all_matches(matched_names):
@@ -136,49 +126,26 @@ def announce_all_matches(matched_names):
         speak("No matches found")
         return
     
-    if len(matched_names) == 1:
-        speak(f"Access granted to {matched_names[0]}. Welcome to the Lab")
-    else:
-        names_text = ", ".join(matched_names[:-1]) + f", and {matched_names[-1]}"
-        speak(f"Access granted to {names_text}. Welcome to the Lab")
+    speak(f"Access granted to {join_names(matched_names)}. Welcome to the Lab")
 
 def log_all_matches(matched_names, matched_epcs):
-    """Log all matched users to access logs"""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    for i, name in enumerate(matched_names):
-        epc = matched_epcs[i] if i < len(matched_epcs) else "Unknown"
-        log_entry = {
-            'status': 'GRANTED',
-            'reason': 'Bulk access granted',
-            'name': name,
-            'card_id': epc,
-            'timestamp': timestamp
-        }
-        st.session_state.access_logs.append(log_entry)
-        
-        # Track occupancy
-        st.session_state.occupancy_tracker.person_entered(name, epc, timestamp)
-    
-    # Keep only last 50 logs
-    if len(st.session_state.access_logs) > 50:
-        st.session_state.access_logs = st.session_state.access_logs[-50:]
+    """Log all matched users to access logs; returns the names the access policy granted"""
+    return get_engine().log_bulk_access(matched_names, matched_epcs)
 
 def announce_lab_occupancy():
     """Announce current lab occupancy with names"""
-    occupants = st.session_state.occupancy_tracker.get_current_occupants()
+    occupants = get_engine().snapshot().occupants
     count = len(occupants)
     
     if count == 0:
-        speak("Lab is currently empty")
+        speak("Lab is currently empty", LOW)
         return
     
-    names = list(occupants.keys())
+    names = [occupant.name for occupant in occupants]
     if count == 1:
-        speak(f"One person currently in the lab: {names[0]}")
+        speak(f"One person currently in the lab: {names[0]}", LOW)
     else:
-        names_text = ", ".join(names[:-1]) + f", and {names[-1]}"
-        speak(f"{count} people currently in the lab: {names_text}")
+        speak(f"{count} people currently in the lab: {join_names(names)}", LOW)
 
 # ----------- Page Configuration ------------
 st.set_page_config(
@@ -189,222 +156,511 @@ st.set_page_config(
 )
 
 # ----------- Initialize Session State ------------
-if 'system_running' not in st.session_state:
-    st.session_state.system_running = False
-
-if 'access_logs' not in st.session_state:
-    st.session_state.access_logs = []
-
-if 'last_scan' not in st.session_state:
-    st.session_state.last_scan = None
-
 if 'last_comparison_time' not in st.session_state:
     st.session_state.last_comparison_time = None
 
-if 'occupancy_tracker' not in st.session_state:
-    st.session_state.occupancy_tracker = LabOccupancyTracker()
-
-if 'server_status' not in st.session_state:
-    st.session_state.server_status = {
-        'connected': True,
-        'last_check': datetime.now(),
-        'message': 'Checking connection...'
-    }
-
 # ----------- Data Loading Functions ------------
+@st.cache_resource
+def get_reference_registry():
+    """Process-wide EPC index, shared by every session and rerun"""
+    return ReferenceRegistry(REFERENCE_FILE_PATH, snapshot_path=REFERENCE_SNAPSHOT_PATH)
+
+@st.cache_resource
+def get_active_file():
+    """Tails the file when streaming; otherwise rereads it whenever it changes"""
+    if ACTIVE_FILE_STREAMING:
+        return CsvTail(ACTIVE_FILE_PATH, default_columns=['EPC'])
+    return CachedCsvFile(ACTIVE_FILE_PATH, default_columns=['EPC'])
+
 def get_reference_data():
-    if os.path.exists(REFERENCE_FILE_PATH):
-        return pd.read_csv(REFERENCE_FILE_PATH)
-    else:
-        return pd.DataFrame(columns=['EPC', 'Name'])
+    with INSTRUMENTS.time('reference_load'):
+        registry = get_reference_registry()
+        registry.refresh()
+        return registry.to_dataframe()
 
 def get_active_data():
-    if os.path.exists(ACTIVE_FILE_PATH):
-        return pd.read_csv(ACTIVE_FILE_PATH)
-    else:
-        return pd.DataFrame(columns=['EPC'])
+    with INSTRUMENTS.time('csv_load'):
+        return get_active_file().load()
+
+@st.cache_resource
+def get_sharded_matcher():
+    """Worker pool and shared memory shards, started on the first large active table"""
+    if SHARDED_MATCH_WORKERS is None:
+        return ShardedMatcher()
+    return ShardedMatcher(SHARDED_MATCH_WORKERS)
+
+def compare_active(active_df, reference_df):
+    with INSTRUMENTS.time('compare'):
+        lookup = get_reference_lookup()
+        if len(active_df) >= SHARDED_MATCH_MIN_ACTIVE:
+            return get_sharded_matcher().compare(active_df, reference_df, lookup=lookup)
+        return compare_active_with_reference(active_df, reference_df, lookup=lookup)
+
+def get_reference_lookup():
+    registry = get_reference_registry()
+    registry.refresh()
+    return registry.lookup_series()
+
+# ----------- Checkpoint Engine ------------
+@st.cache_resource
+def get_event_store():
+    return EventStore(EVENT_STORE_PATH, retention_days=EVENT_RETENTION_DAYS)
+
+@st.cache_resource
+def get_analytics():
+    """Rollups of the event history, kept current by a background worker"""
+    analytics = Analytics(get_event_store())
+    analytics.start()
+    return analytics
+
+@st.cache_resource
+def get_access_policy():
+    """Compiled access rules; the engine picks up edits to the file without a restart"""
+    policy = AccessPolicy(ACCESS_POLICY_PATH)
+    policy.refresh()
+    return policy
+
+@st.cache_resource
+def get_engine():
+    """Started once per process; every session reads the same engine"""
+    feeds = {}
+    if ACTIVE_FILE_STREAMING:
+        feeds[ACTIVE_FILE_READER_ID] = tail_feed(get_active_file())
+    engine = CheckpointEngine(
+        get_reference_registry(),
+        announcer=get_announcer(),
+        budget=BatchBudget(EVENT_BATCH_MAX_EVENTS, EVENT_BATCH_MAX_SECONDS),
+        readers=ReaderManager(READERS, cooldown=READ_COOLDOWN_SECONDS, feeds=feeds),
+        zones=ZoneOccupancy(ZoneGraph(DOORS)),
+        store=get_event_store(),
+        policy=get_access_policy(),
+    )
+    engine.start()
+    return engine
+
+# ----------- Instrumentation ------------
+@st.cache_resource
+def get_profiler():
+    """Sampling profiler, idle until switched on from the sidebar"""
+    return SamplingProfiler()
+
+@st.cache_resource
+def get_metrics_server():
+    """Registers scrape-time gauges and serves them (and profiler stacks) locally"""
+    INSTRUMENTS.enabled = INSTRUMENTATION_ENABLED
+    engine = get_engine()
+    announcer = get_announcer()
+    monitor = get_heartbeat_monitor()
+    sync = get_server_sync()
+
+    for reader_id, channel in engine.readers.channels.items():
+        INSTRUMENTS.collect('queue_depth', channel.queue.qsize, {'queue': f"reader:{reader_id}"},
+                            "Items waiting in each queue")
+        INSTRUMENTS.collect('reads_seen_total', lambda c=channel: c.stats()['reads_seen'], {'reader': reader_id},
+                            "Raw reads offered by each reader", kind='counter')
+        INSTRUMENTS.collect('reads_dropped_total', lambda c=channel: c.dropped, {'reader': reader_id},
+                            "Reads dropped because the reader queue was full", kind='counter')
+    INSTRUMENTS.collect('queue_depth', server_status_queue.qsize, {'queue': 'server_status'})
+    INSTRUMENTS.collect('queue_depth', lambda: announcer.stats()['pending'], {'queue': 'announcer'})
+    if sync is not None:
+        INSTRUMENTS.collect('queue_depth', lambda: sync.stats()['backlog'], {'queue': 'upload'})
+    INSTRUMENTS.collect('queue_oldest_age_seconds', lambda: engine.queue_stats()['oldest_event_age'], None,
+                        "Age of the oldest scan waiting for a decision")
+    INSTRUMENTS.collect('decision_latency_p95_seconds', lambda: engine.queue_stats()['latency_p95'], None,
+                        "Read-to-decision latency, 95th percentile of recent scans")
+    for status in ('granted', 'denied'):
+        INSTRUMENTS.collect('scans_total', lambda key=status: engine.access_stats()[key], {'status': status},
+                            "Access decisions by outcome", kind='counter')
+    INSTRUMENTS.collect('occupancy', lambda: len(engine.snapshot().occupants), None, "People in the lab")
+    INSTRUMENTS.collect('policy_version', lambda: engine.policy.version, None,
+                        "Access policy reloads applied")
+    if engine.store is not None:
+        INSTRUMENTS.collect('events_persisted_total', lambda: engine.store.stats()['events_written'], None,
+                            "Events written to the SQLite store", kind='counter')
+        INSTRUMENTS.collect('event_store_errors_total', lambda: engine.store.stats()['commit_errors'], None,
+                            "Failed event store commits (retried)", kind='counter')
+        INSTRUMENTS.collect('event_store_rejected_total', lambda: engine.store.stats()['events_rejected'], None,
+                            "Events the store could not write, kept in dead_letters", kind='counter')
+        INSTRUMENTS.collect('queue_depth', lambda: get_analytics().stats()['backlog'], {'queue': 'analytics'})
+    for name in HEARTBEAT_ENDPOINTS:
+        INSTRUMENTS.collect('server_connected', lambda n=name: monitor.status()[n]['connected'],
+                            {'endpoint': name}, "1 while the heartbeat endpoint answers")
+    INSTRUMENTS.collect('runtime_workers', lambda: len(RUNTIME.stats()['workers']), None,
+                        "Background workers running on the event loop")
+    INSTRUMENTS.collect('worker_restarts_total', lambda: RUNTIME.restarts, None,
+                        "Background workers restarted after a crash", kind='counter')
+    INSTRUMENTS.collect('threads', threading.active_count, None, "Threads in the dashboard process")
+    INSTRUMENTS.describe('stage_seconds', "Time spent in each pipeline stage")
+
+    server = MetricsServer(INSTRUMENTS, profiler=get_profiler(), port=METRICS_PORT or 0)
+    if METRICS_PORT is not None:
+        try:
+            server.start()
+        except OSError as e:
+            print(f"Metrics endpoint unavailable on port {METRICS_PORT}: {e}")
+    return server
+
+# ----------- Display Helpers ------------
+@st.cache_resource
+def get_render_cache():
+    """Derived tables shared by every session, keyed by panel name"""
+    return {}
+
+def versioned(name, version, build):
+    """Return build()'s result, rebuilding only when ``version`` differs from the cached one"""
+    cache = get_render_cache()
+    entry = cache.get(name)
+    if entry is None or entry[0] != version:
+        entry = cache[name] = (version, build())
+    return entry[1]
+
+def paginate(df, key, page_size=TABLE_PAGE_SIZE):
+    """One page of ``df``; only that page is sent to the browser"""
+    if len(df) <= page_size:
+        return df
+    pages = (len(df) - 1) // page_size + 1
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1, key=key)
+    start = (page - 1) * page_size
+    st.caption(f"Rows {start + 1:,}–{min(start + page_size, len(df)):,} of {len(df):,}")
+    return df.iloc[start:start + page_size]
+
+def live_fragment(render, interval=REFRESH_INTERVAL):
+    """Rerun ``render`` on its own every ``interval`` seconds while the system runs.
+
+    Each panel refreshes independently instead of the whole page, and is
+    static while the system is stopped (any button press redraws the page).
+    """
+    return st.fragment(render, run_every=interval if get_engine().running else None)()
+
+def active_version():
+    """Changes whenever the active file's parsed contents change"""
+    return get_active_file().version
+
+# ----------- Dashboard Panels ------------
+def render_server_alerts():
+    # The queue only carries connect/disconnect transitions
+    while not server_status_queue.empty():
+        status_update = server_status_queue.get()
 
-# ----------- Enhanced EPC Comparison ------------
-def compare_active_with_reference(active_df, reference_df):
-    reference_epcs = set(reference_df['EPC'])
-    active_df['status'] = active_df['EPC'].apply(lambda epc: 'MATCHED ✅' if epc in reference_epcs else 'NOT FOUND ❌')
-    
-    # Get matched names and EPCs
-    matched_epcs = active_df[active_df['status'] == 'MATCHED ✅']['EPC'].tolist()
-    matched_names = []
-    
-    for epc in matched_epcs:
-        name_row = reference_df[reference_df['EPC'] == epc]
-        if not name_row.empty:
-            matched_names.append(name_row.iloc[0]['Name'])
-    
-    return active_df, matched_names, matched_epcs
-
-# ----------- RFID Simulation ------------
-def simulate_rfid_scan():
-    return random.choice([
-        "A02A061028A201547A021102",
-        "A02A061028A201548A021802",
-        "A02A061028A201550A021902",
-        "UNKNOWN123456789"
-    ])
-
-def process_rfid_scan(card_id, reference_df):
-    user_info = reference_df[reference_df['EPC'] == card_id]
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    if user_info.empty:
-        return {
-            'status': 'DENIED',
-            'reason': 'User not found',
-            'name': 'Unknown',
-            'card_id': card_id,
-            'timestamp': timestamp
-        }
-    
-    user = user_info.iloc[0]
-    name = user['Name']
-    
-    # Check if person is already in lab (for exit tracking)
-    current_occupants = st.session_state.occupancy_tracker.get_current_occupants()
-    
-    if name in current_occupants:
-        # Person is exiting
-        st.session_state.occupancy_tracker.person_exited(name, timestamp)
-        action = 'EXIT'
-        message = f"Goodbye {name}. Thank you for visiting the lab."
+        if status_update['status'] == 'disconnected':
+            st.error(f"⚠️ {status_update['message']}")
+            speak("Warning: Server connection lost", URGENT)
+
+def render_system_status():
+    engine = get_engine()
+    monitor = get_heartbeat_monitor()
+    snapshot = engine.snapshot()
+
+    st.header("System Status")
+    status_color = "🟢" if snapshot.running else "🔴"
+    status_text = "RUNNING" if snapshot.running else "STOPPED"
+    st.markdown(f"**Status:** {status_color} {status_text}")
+
+    # Server status
+    server_statuses = monitor.status()
+    for name, server_status in server_statuses.items():
+        server_color = "🟢" if server_status['connected'] else "🔴"
+        server_text = "CONNECTED" if server_status['connected'] else "DISCONNECTED"
+        latency = server_status['latency_ms']
+        latency_text = f" ({latency:.0f} ms)" if latency is not None else ""
+        label = "Server" if len(server_statuses) == 1 else f"Server {name}"
+        st.markdown(f"**{label}:** {server_color} {server_text}{latency_text}")
+
+    # Lab occupancy
+    occupancy_count = len(snapshot.occupants)
+    st.markdown(f"**Lab Occupancy:** {occupancy_count} people")
+    if len(snapshot.zone_counts) > 1:
+        for zone, count in sorted(snapshot.zone_counts.items()):
+            st.markdown(f"- {zone}: {count}")
+
+    # Scan queue health
+    queue_stats = engine.queue_stats()
+    st.markdown(f"**Scan Queue:** {queue_stats['queue_depth']} pending "
+                f"(oldest {queue_stats['oldest_event_age'] * 1000:.0f} ms)")
+    st.markdown(f"**Read → Decision:** p50 {queue_stats['latency_p50'] * 1000:.0f} ms, "
+                f"p95 {queue_stats['latency_p95'] * 1000:.0f} ms")
+    st.markdown(f"**Reads Deduplicated:** {queue_stats['reads_suppressed']} of {queue_stats['reads_seen']}")
+    if queue_stats['dropped']:
+        st.markdown(f"**Reads Dropped (queue full):** {queue_stats['dropped']}")
+    if engine.store is not None:
+        store_stats = engine.store.stats()
+        st.markdown(f"**Events Persisted:** {store_stats['events_written']}")
+        if store_stats['events_rejected']:
+            st.markdown(f"**Events Rejected:** {store_stats['events_rejected']} (see the dead_letters table)")
+        if store_stats['last_error']:
+            st.markdown(f"**Event Store Retrying:** {store_stats['pending_writes']} pending, "
+                        f"{store_stats['last_error']}")
+    policy = engine.policy.summary()
+    st.markdown(f"**Access Policy:** v{policy['version']}, {policy['badges']} badge rules, "
+                f"{policy['roles']} roles")
+    if policy['last_error']:
+        st.markdown(f"**Policy Not Applied:** {policy['last_error']}")
+    sync = get_server_sync()
+    if sync is not None:
+        st.markdown(f"**Pending Upload:** {sync.stats()['backlog']} events")
     else:
-        # Person is entering
-        st.session_state.occupancy_tracker.person_entered(name, card_id, timestamp)
-        action = 'ENTRY'
-        message = f"Access granted to {name}. Welcome to the Lab"
-    
-    return {
-        'status': 'GRANTED',
-        'reason': f'Access granted - {action}',
-        'name': name,
-        'card_id': card_id,
-        'timestamp': timestamp,
-        'action': action,
-        'message': message
-    }
-
-# ----------- Scanner Thread ------------
-def rfid_scanner_thread(running_flag):
-    while running_flag['running']:
-        if random.random() < 0.3:
-            card_id = simulate_rfid_scan()
-            rfid_event_queue.put(card_id)
-        time.sleep(1)
+        st.markdown("**Event Upload:** off (set SYNC_URL to enable)")
+    tts_stats = get_announcer().stats()
+    st.markdown(f"**Announcer:** {tts_stats['pending']} queued, "
+                f"p95 {tts_stats['latency_p95'] * 1000:.0f} ms, "
+                f"{tts_stats['dropped_stale'] + tts_stats['dropped_full']} dropped")
+    runtime_stats = RUNTIME.stats()
+    st.markdown(f"**Workers:** {len(runtime_stats['workers'])} running, "
+                f"{runtime_stats['threads']} threads, {runtime_stats['restarts']} restarts")
+
+def render_diagnostics():
+    profiler = get_profiler()
+    stages = INSTRUMENTS.stage_summary()
+    if stages:
+        st.dataframe(pd.DataFrame([{
+            'Stage': row['stage'],
+            'Calls': row['count'],
+            'Mean (ms)': round(row['mean'] * 1000, 2),
+            'p95 (ms)': row['p95'] * 1000 if row['p95'] is not None else None,
+        } for row in stages]), hide_index=True, use_container_width=True)
+    if profiler.samples:
+        st.caption(f"Hottest functions over {profiler.samples} samples")
+        for function, count in profiler.top(10):
+            st.write(f"`{function}` {count}")
+
+def styled_access_logs(access_logs):
+    logs_df = pd.DataFrame(list(access_logs))
+    if 'timestamp' in logs_df.columns:
+        logs_df = logs_df.sort_values('timestamp', ascending=False)
+    logs_df = logs_df.fillna("N/A")
+
+    def color_status(val):
+        return 'background-color: #d4edda' if val == 'GRANTED' else 'background-color: #f8d7da'
+
+    return logs_df.style.map(color_status, subset=['status'])
+
+def render_access_monitor():
+    with INSTRUMENTS.time('render_access_monitor'):
+        st.header("📊 Access Monitor")
+        snapshot = get_engine().snapshot()
+
+        # Display last scan result
+        if snapshot.last_scan:
+            result = snapshot.last_scan
+            if result['status'] == 'GRANTED':
+                st.success("✅ ACCESS GRANTED")
+                action_emoji = "🚪➡️" if result.get('action') == 'ENTRY' else "🚪⬅️"
+                st.markdown(f"""
+                **Action:** {action_emoji} {result.get('action', 'ACCESS')}  
+                **Name:** {result['name']}  
+                **EPC:** {result['card_id']}  
+                **Time:** {result['timestamp']}
+                """)
+            else:
+                st.error("❌ ACCESS DENIED")
+                st.markdown(f"""
+                **Reason:** {result['reason']}  
+                **Name:** {result['name']}  
+                **EPC:** {result['card_id']}  
+                **Time:** {result['timestamp']}
+                """)
+
+        st.markdown("---")
+        st.subheader("📋 Recent Access Logs")
+
+        if snapshot.access_logs:
+            styled_df = versioned('access_logs', snapshot.version,
+                                  lambda: styled_access_logs(snapshot.access_logs))
+            st.dataframe(styled_df, use_container_width=True, height=300)
+        else:
+            st.info("No access attempts yet.")
+
+def render_statistics():
+    with INSTRUMENTS.time('render_statistics'):
+        engine = get_engine()
+        st.header("📈 Statistics")
+        stats = engine.access_stats()
+        if stats['total']:
+            total = stats['total']
+            granted = stats['granted']
+            denied = stats['denied']
+            st.metric("Total Attempts", total)
+            st.metric("Access Granted", granted, delta=f"{(granted/total*100):.1f}%")
+            st.metric("Access Denied", denied, delta=f"{(denied/total*100):.1f}%")
+
+            for label, window in stats['windows'].items():
+                st.write(f"**Last {label}:** {window['total']} attempts "
+                         f"({window['granted']} granted, {window['denied']} denied)")
+
+            st.markdown("---")
+            st.subheader("👥 Top Users")
+            for user, count in stats['top_users']:
+                st.write(f"**{user}:** {count} entries")
+        else:
+            st.info("No statistics available.")
+
+        st.markdown("---")
+        st.subheader("🏢 Current Lab Occupancy")
+        current_occupants = engine.snapshot().occupants
+
+        if current_occupants:
+            st.success(f"**{len(current_occupants)} people in lab:**")
+            now_mono = time.monotonic()
+            for occupant in current_occupants[:OCCUPANT_DISPLAY_LIMIT]:
+                st.write(f"**{occupant.name}** - {format_duration(occupant.dwell_seconds(now_mono))}")
+            if len(current_occupants) > OCCUPANT_DISPLAY_LIMIT:
+                st.caption(f"…and {len(current_occupants) - OCCUPANT_DISPLAY_LIMIT} more (longest stays shown first)")
+        else:
+            st.info("Lab is currently empty")
+
+def render_reference_table():
+    st.subheader("💾 Database View")
+    reference_df = get_reference_data()
+    st.write(f"**Reference Records:** {len(reference_df)}")
+    st.dataframe(paginate(reference_df, key='reference_page'), use_container_width=True)
+
+def render_server_warning():
+    monitor = get_heartbeat_monitor()
+    if monitor.connected:
+        return
+    st.error("🚨 **SERVER CONNECTION WARNING**")
+    for server_status in monitor.status().values():
+        if not server_status['connected']:
+            st.error(server_status['message'])
+
+    # Show people still in lab during server outage
+    current_occupants = get_engine().snapshot().occupants
+    if current_occupants:
+        st.warning("⚠️ **People still in lab during server outage:**")
+        for occupant in current_occupants[:OCCUPANT_DISPLAY_LIMIT]:
+            st.write(f"• {occupant.name}")
+        if len(current_occupants) > OCCUPANT_DISPLAY_LIMIT:
+            st.write(f"• …and {len(current_occupants) - OCCUPANT_DISPLAY_LIMIT} more")
+
+def render_match_status():
+    active_df = get_active_data()
+    reference_df = get_reference_data()
+
+    with INSTRUMENTS.time('render_match_status'):
+        if not active_df.empty and not reference_df.empty:
+            version = (active_version(), get_reference_registry().version)
+            result_df, matched_names, matched_epcs = versioned(
+                'match_status', version, lambda: compare_active(active_df, reference_df))
+
+            st.dataframe(paginate(result_df, key='match_page'), use_container_width=True)
+
+            if matched_names:
+                st.success(f"✅ **{len(matched_names)} people detected:**")
+                for i, name in enumerate(matched_names[:OCCUPANT_DISPLAY_LIMIT], 1):
+                    st.write(f"{i}. {name}")
+                if len(matched_names) > OCCUPANT_DISPLAY_LIMIT:
+                    st.caption(f"…and {len(matched_names) - OCCUPANT_DISPLAY_LIMIT} more")
+            else:
+                st.warning("❌ No matches found between active and reference files")
+        else:
+            st.warning("One or both files are empty or missing.")
+
+def render_history():
+    analytics = get_analytics()
+    today = date.today()
+    picked = st.date_input("Range", value=(today - timedelta(days=HISTORY_DEFAULT_DAYS), today),
+                           max_value=today, key='history_range')
+    if not isinstance(picked, (tuple, list)) or len(picked) != 2:
+        st.info("Pick a start and an end date.")
+        return
+    start = datetime.combine(picked[0], datetime.min.time()).timestamp()
+    end = datetime.combine(picked[1] + timedelta(days=1), datetime.min.time()).timestamp()
+
+    with INSTRUMENTS.time('render_history'):
+        history = versioned('history', (start, end, analytics.cursor), lambda: {
+            'occupancy': analytics.occupancy(start, end, 'hour'),
+            'heatmap': analytics.heatmap(start, end, 'entries'),
+            'dwell': analytics.dwell_distribution(start, end),
+            'summary': analytics.dwell_summary(start, end),
+            'attendance': analytics.attendance(start, end),
+        })
+        summary, attendance = history['summary'], history['attendance']
+        if not summary['stays'] and attendance.empty:
+            st.info("No visits recorded in this range.")
+            return
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Visits", int(attendance['visits'].sum()))
+        col2.metric("People", len(attendance))
+        col3.metric("Mean Stay", format_duration(summary['mean_seconds']) if summary['mean_seconds'] else "N/A")
+        median = summary['p50_seconds']
+        col4.metric("Median Stay", f"≤ {format_duration(median)}" if median is not None else "over 24h")
+
+        st.subheader("Peak Occupancy per Hour")
+        st.line_chart(history['occupancy']['peak'])
+        st.subheader("Entries by Weekday and Hour")
+        st.dataframe(history['heatmap'], use_container_width=True)
+        st.subheader("Dwell Time")
+        st.bar_chart(history['dwell']['stays'])
+        st.subheader("Attendance")
+        table = attendance.rename(columns={'epc': 'EPC', 'name': 'Name', 'days': 'Days', 'visits': 'Visits',
+                                           'hours': 'Hours', 'last_day': 'Last Seen'}).round({'Hours': 1})
+        st.dataframe(paginate(table, key='attendance_page'), hide_index=True, use_container_width=True)
 
 # ----------- Main Application ------------
 def main():
     st.title("🔐 RFID Entrance System with Server Monitoring")
     st.markdown("---")
 
-    # Check server status
-    if not server_status_queue.empty():
-        status_update = server_status_queue.get()
-        st.session_state.server_status = status_update
-        
-        if status_update['status'] == 'disconnected':
-            st.error(f"⚠️ {status_update['message']}")
-            speak("Warning: Server connection lost")
+    engine = get_engine()
+    monitor = get_heartbeat_monitor()
+    sync = get_server_sync()
+    metrics_server = get_metrics_server()
 
-    with st.sidebar:
+    live_fragment(render_server_alerts)
+
+    with st.sidebar, INSTRUMENTS.time('render_sidebar'):
         st.header("System Controls")
         col1, col2 = st.columns(2)
 
         with col1:
             if st.button("🟢 Start System", use_container_width=True):
-                st.session_state.system_running = True
                 st.success("System Started!")
                 speak("RFID system initialized")
                 
                 # Start RFID scanner
-                if 'scanner_thread' not in st.session_state or not st.session_state.scanner_thread.is_alive():
-                    st.session_state.system_running_flag = {"running": True}
-                    st.session_state.scanner_thread = threading.Thread(
-                        target=rfid_scanner_thread,
-                        args=(st.session_state.system_running_flag,),
-                        daemon=True
-                    )
-                    st.session_state.scanner_thread.start()
+                engine.start_reader()
                 
-                # Start server monitor
-                if 'server_monitor_thread' not in st.session_state or not st.session_state.server_monitor_thread.is_alive():
-                    st.session_state.server_monitor_flag = {"running": True}
-                    st.session_state.server_monitor_thread = threading.Thread(
-                        target=server_monitor_thread,
-                        args=(st.session_state.server_monitor_flag,),
-                        daemon=True
-                    )
-                    st.session_state.server_monitor_thread.start()
+                # Start server monitor and event upload
+                monitor.start()
+                if sync is not None:
+                    sync.start()
 
         with col2:
             if st.button("🔴 Stop System", use_container_width=True):
-                st.session_state.system_running = False
-                if 'system_running_flag' in st.session_state:
-                    st.session_state.system_running_flag['running'] = False
-                if 'server_monitor_flag' in st.session_state:
-                    st.session_state.server_monitor_flag['running'] = False
+                engine.stop_reader()
+                monitor.stop()
+                if sync is not None:
+                    sync.stop()
                 st.warning("System Stopped!")
 
         if st.button("🔄 Restart System", use_container_width=True):
             # Stop everything
-            st.session_state.system_running = False
-            if 'system_running_flag' in st.session_state:
-                st.session_state.system_running_flag['running'] = False
-            if 'server_monitor_flag' in st.session_state:
-                st.session_state.server_monitor_flag['running'] = False
-            
-            time.sleep(0.5)
+            engine.stop_reader()
+            monitor.stop()
+            if sync is not None:
+                sync.stop()
             
             # Reset and restart
-            st.session_state.system_running = True
-            st.session_state.access_logs = []
-            st.session_state.last_scan = None
-            st.session_state.occupancy_tracker = LabOccupancyTracker()
+            engine.reset()
             st.info("System Restarted!")
             
-            # Restart threads
-            st.session_state.system_running_flag = {"running": True}
-            st.session_state.scanner_thread = threading.Thread(
-                target=rfid_scanner_thread,
-                args=(st.session_state.system_running_flag,),
-                daemon=True
-            )
-            st.session_state.scanner_thread.start()
-            
-            st.session_state.server_monitor_flag = {"running": True}
-            st.session_state.server_monitor_thread = threading.Thread(
-                target=server_monitor_thread,
-                args=(st.session_state.server_monitor_flag,),
-                daemon=True
-            )
-            st.session_state.server_monitor_thread.start()
+            # Restart workers
+            engine.start_reader()
+            monitor.start()
+            if sync is not None:
+                sync.start()
 
+        # Status panels are drawn only after the controls above have acted on the engine
         st.markdown("---")
-        st.header("System Status")
-        status_color = "🟢" if st.session_state.system_running else "🔴"
-        status_text = "RUNNING" if st.session_state.system_running else "STOPPED"
-        st.markdown(f"**Status:** {status_color} {status_text}")
-        
-        # Server status
-        server_color = "🟢" if st.session_state.server_status.get('connected', True) else "🔴"
-        server_text = "CONNECTED" if st.session_state.server_status.get('connected', True) else "DISCONNECTED"
-        st.markdown(f"**Server:** {server_color} {server_text}")
-
-        # Lab occupancy
-        occupancy_count = st.session_state.occupancy_tracker.get_occupancy_count()
-        st.markdown(f"**Lab Occupancy:** {occupancy_count} people")
+        live_fragment(render_system_status)
 
         st.markdown("---")
         st.header("Manual Testing")
         test_card = st.text_input("Enter EPC:", placeholder="A02A061028A201547A021102")
         if st.button("🔍 Test Scan"):
-            if test_card and st.session_state.system_running:
-                rfid_event_queue.put(test_card)
+            if test_card and engine.running:
+                engine.submit(test_card)
 
         st.markdown("---")
         st.header("Lab Management")
@@ -413,11 +669,15 @@ def main():
             active_df = get_active_data()
             reference_df = get_reference_data()
             if not active_df.empty and not reference_df.empty:
-                _, matched_names, matched_epcs = compare_active_with_reference(active_df, reference_df)
+                _, matched_names, matched_epcs = compare_active(active_df, reference_df)
                 if matched_names:
-                    announce_all_matches(matched_names)
-                    log_all_matches(matched_names, matched_epcs)
-                    st.success(f"Announced and logged {len(matched_names)} matches!")
+                    granted = log_all_matches(matched_names, matched_epcs)
+                    refused = list((Counter(matched_names) - Counter(granted)).elements())
+                    announce_all_matches(granted)
+                    if granted:
+                        st.success(f"Announced and logged {len(granted)} matches!")
+                    if refused:
+                        st.warning(f"Refused by the access policy (logged as denied): {', '.join(refused)}")
                 else:
                     speak("No one detected in the lab")
                     st.info("No matches found to announce")
@@ -428,147 +688,42 @@ def main():
             announce_lab_occupancy()
         
         if st.button("🚪 Force Exit All", use_container_width=True):
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            st.session_state.occupancy_tracker.force_exit_all(timestamp)
+            engine.force_exit_all()
             st.success("All occupants marked as exited")
             speak("All lab occupants have been logged as exited")
 
-    col1, col2 = st.columns([2, 1])
-
-    with col1:
-        st.header("📊 Access Monitor")
-
-        # Process RFID events
-        if st.session_state.system_running and not rfid_event_queue.empty():
-            card_id = rfid_event_queue.get()
-            reference_df = get_reference_data()
-            result = process_rfid_scan(card_id, reference_df)
-
-            st.session_state.access_logs.append(result)
-            st.session_state.last_scan = result
-
-            if len(st.session_state.access_logs) > 50:
-                st.session_state.access_logs = st.session_state.access_logs[-50:]
-
-            if result['status'] == 'GRANTED':
-                st.write(f"✅ Speaking: {result['message']}")
-                speak(result['message'])
-            else:
-                st.write("❌ Speaking: Access denied")
-                speak("Access denied. Unknown user")
-
-        # Display last scan result
-        if st.session_state.last_scan:
-            result = st.session_state.last_scan
-            if result['status'] == 'GRANTED':
-                st.success("✅ ACCESS GRANTED")
-                action_emoji = "🚪➡️" if result.get('action') == 'ENTRY' else "🚪⬅️"
-                st.markdown(f"""
-                **Action:** {action_emoji} {result.get('action', 'ACCESS')}  
-                **Name:** {result['name']}  
-                **EPC:** {result['card_id']}  
-                **Time:** {result['timestamp']}
-                """)
-            else:
-                st.error("❌ ACCESS DENIED")
-                st.markdown(f"""
-                **Reason:** {result['reason']}  
-                **EPC:** {result['card_id']}  
-                **Time:** {result['timestamp']}
-                """)
-
         st.markdown("---")
-        st.subheader("📋 Recent Access Logs")
-
-        if st.session_state.access_logs:
-            logs_df = pd.DataFrame(st.session_state.access_logs)
-            if 'timestamp' in logs_df.columns:
-                logs_df = logs_df.sort_values('timestamp', ascending=False)
-            logs_df = logs_df.fillna("N/A")
+        with st.expander("⏱️ Diagnostics"):
+            INSTRUMENTS.enabled = st.toggle("Stage timing", value=INSTRUMENTS.enabled)
+            profiler = get_profiler()
+            if st.toggle("Sampling profiler", value=profiler.running):
+                profiler.start()
+            else:
+                profiler.stop()
+            live_fragment(render_diagnostics)
+            if metrics_server.serving:
+                st.caption(f"Metrics: http://{metrics_server.host}:{metrics_server.port}/metrics "
+                           f"(profiler stacks at /profile)")
 
-            def color_status(val):
-                return 'background-color: #d4edda' if val == 'GRANTED' else 'background-color: #f8d7da'
+    col1, col2 = st.columns([2, 1])
 
-            styled_df = logs_df.style.map(color_status, subset=['status'])
-            st.dataframe(styled_df, use_container_width=True, height=300)
-        else:
-            st.info("No access attempts yet.")
+    with col1:
+        live_fragment(render_access_monitor)
 
     with col2:
-        st.header("📈 Statistics")
-        if st.session_state.access_logs:
-            logs_df = pd.DataFrame(st.session_state.access_logs)
-            total = len(logs_df)
-            granted = len(logs_df[logs_df['status'] == 'GRANTED'])
-            denied = len(logs_df[logs_df['status'] == 'DENIED'])
-            st.metric("Total Attempts", total)
-            st.metric("Access Granted", granted, delta=f"{(granted/total*100):.1f}%")
-            st.metric("Access Denied", denied, delta=f"{(denied/total*100):.1f}%")
-
-            top_users = logs_df[logs_df['status'] == 'GRANTED']['name'].value_counts().head(5)
-            st.markdown("---")
-            st.subheader("👥 Top Users")
-            for user, count in top_users.items():
-                st.write(f"**{user}:** {count} entries")
-        else:
-            st.info("No statistics available.")
-
+        live_fragment(render_statistics)
         st.markdown("---")
-        st.subheader("🏢 Current Lab Occupancy")
-        current_occupants = st.session_state.occupancy_tracker.get_current_occupants()
-        
-        if current_occupants:
-            st.success(f"**{len(current_occupants)} people in lab:**")
-            for name, info in current_occupants.items():
-                entry_time = datetime.strptime(info['entry_time'], '%Y-%m-%d %H:%M:%S')
-                duration = datetime.now() - entry_time
-                hours = duration.seconds // 3600
-                minutes = (duration.seconds % 3600) // 60
-                st.write(f"**{name}** - {hours}h {minutes}m")
-        else:
-            st.info("Lab is currently empty")
+        live_fragment(render_reference_table, REFERENCE_REFRESH_INTERVAL)
 
-        st.markdown("---")
-        st.subheader("💾 Database View")
-        reference_df = get_reference_data()
-        st.write(f"**Reference Records:** {len(reference_df)}")
-        st.dataframe(reference_df, use_container_width=True)
-
-    # Server status warning
-    if not st.session_state.server_status.get('connected', True):
-        st.error("🚨 **SERVER CONNECTION WARNING**")
-        st.error(st.session_state.server_status.get('message', 'Server disconnected'))
-        
-        # Show people still in lab during server outage
-        current_occupants = st.session_state.occupancy_tracker.get_current_occupants()
-        if current_occupants:
-            st.warning("⚠️ **People still in lab during server outage:**")
-            for name in current_occupants.keys():
-                st.write(f"• {name}")
+    live_fragment(render_server_warning)
 
     st.markdown("---")
     st.header("🔍 EPC Match Status Check")
+    live_fragment(render_match_status)
 
-    active_df = get_active_data()
-    reference_df = get_reference_data()
-
-    if not active_df.empty and not reference_df.empty:
-        result_df, matched_names, matched_epcs = compare_active_with_reference(active_df, reference_df)
-        
-        st.dataframe(result_df, use_container_width=True)
-        
-        if matched_names:
-            st.success(f"✅ **{len(matched_names)} people detected:**")
-            for i, name in enumerate(matched_names, 1):
-                st.write(f"{i}. {name}")
-        else:
-            st.warning("❌ No matches found between active and reference files")
-    else:
-        st.warning("One or both files are empty or missing.")
-
-    if st.session_state.system_running:
-        time.sleep(1)
-        st.rerun()
+    st.markdown("---")
+    st.header("📅 History")
+    live_fragment(render_history, HISTORY_REFRESH_INTERVAL)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,288 @@
+import asyncio
+import csv
+import io
+import os
+import threading
+import time
+from collections import deque
+from typing import BinaryIO, Callable, Deque, List, Optional
+
+import pandas as pd
+
+from reference_registry import EPC_COLUMN, PREFIX_CHECK_BYTES
+
+# ----------- Tail Configuration ------------
+READ_CHUNK_BYTES = 1 << 20   # buffered read size while catching up
+POLL_INTERVAL = 0.5          # seconds between polls of the tail feed
+PARTIAL_LINE_TIMEOUT = 5.0   # seconds a line without its newline must sit unchanged before it is passed on
+
+RowListener = Callable[[List[List[str]]], None]
+
+
+# ----------- CSV Tail ------------
+class CsvTail:
+    """Follows a CSV that a reader keeps appending to.
+
+    Each poll() reads only the bytes added since the previous one through
+    a long-lived buffered handle, so a poll costs O(new bytes) however long
+    the shift's file has grown. A trailing line without a newline is shown
+    in to_dataframe() straight away but only handed to listeners once it
+    is complete: its newline arrived, or the file stayed unchanged for
+    ``partial_timeout`` seconds. If a line passed on that way grows after
+    all, the row is replaced and listeners get the whole line again, never
+    just the remainder.
+
+    - Rotation (the path now points at a different file) drains what is
+      left of the old file, then starts on the new one.
+    - Truncation, or a rewrite that changes the first bytes, restarts
+      from the top.
+
+    In both cases rows() then reflects the current file only, matching a
+    full reload. Listeners get every newly parsed batch of rows.
+    """
+
+    def __init__(self, path: str, default_columns: Optional[List[str]] = None,
+                 partial_timeout: float = PARTIAL_LINE_TIMEOUT):
+        self.path = path
+        self.default_columns = list(default_columns or [EPC_COLUMN])
+        self.partial_timeout = partial_timeout
+        self.version = 0
+        self.rotations = 0
+        self.truncations = 0
+        self.bytes_read = 0
+
+        self._lock = threading.RLock()
+        self._file: Optional[BinaryIO] = None
+        self._inode = None
+        self._signature = None       # (size, mtime) at the last poll
+        self._offset = 0
+        self._prefix = b""
+        self._partial = b""
+        self._partial_since = 0.0    # time.monotonic() when _partial last grew
+        self._provisional = 0        # rows at the end of _rows parsed from _partial
+        self._columns = list(self.default_columns)
+        self._epc_col = 0
+        self._header_pending = True
+        self._rows: List[List[str]] = []
+        self._listeners: List[RowListener] = []
+        self._df: Optional[pd.DataFrame] = None
+        self._df_version = -1
+
+    # ----- listeners -----
+    def subscribe(self, listener: RowListener):
+        """Receive rows appended from now on (rows already in the file are not replayed)"""
+        with self._lock:
+            self.poll()
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: RowListener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    # ----- polling -----
+    def poll(self) -> List[List[str]]:
+        """Parse whatever was appended since the last poll; returns the new rows"""
+        with self._lock:
+            new_rows = self._poll()
+            if new_rows:
+                self.version += 1
+                for listener in list(self._listeners):
+                    listener(new_rows)
+            return new_rows
+
+    def _poll(self) -> List[List[str]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            st = None
+
+        new_rows: List[List[str]] = []
+        if self._file is not None and (st is None or (st.st_dev, st.st_ino) != self._inode):
+            # Rotated or removed: finish the old file before letting it go
+            new_rows.extend(self._read_available())
+            if self._partial and not self._provisional:
+                new_rows.extend(self._parse(self._partial))
+            self._close()
+            self.rotations += 1
+            self._restart()
+        if st is None:
+            return new_rows
+
+        signature = (st.st_size, st.st_mtime_ns)
+        if self._file is not None and signature == self._signature:
+            if (self._partial and not self._provisional and not self._header_pending
+                    and time.monotonic() - self._partial_since >= self.partial_timeout):
+                # The writer has gone quiet mid-line: pass the line on, but keep
+                # its bytes so that a late remainder replaces it rather than
+                # arriving as a row of its own
+                rows = self._parse(self._partial)
+                self._provisional = len(rows)
+                new_rows.extend(rows)
+            return new_rows
+        self._signature = signature
+        if self._file is None:
+            self._open(st)
+        elif st.st_size < self._offset or not self._prefix_intact():
+            self.truncations += 1
+            self._file.seek(0)
+            self._restart()
+        new_rows.extend(self._read_available())
+        return new_rows
+
+    def _open(self, st):
+        self._file = open(self.path, "rb")
+        self._inode = (st.st_dev, st.st_ino)
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self._inode = None
+        self._signature = None
+
+    def _restart(self):
+        """Forget the previous file's contents; the next bytes read start a new file"""
+        self._offset = 0
+        self._prefix = b""
+        self._partial = b""
+        self._provisional = 0
+        self._columns = list(self.default_columns)
+        self._epc_col = 0
+        self._header_pending = True
+        self._rows = []
+        self.version += 1
+
+    def _prefix_intact(self) -> bool:
+        if not self._prefix:
+            return True
+        self._file.seek(0)
+        same = self._file.read(len(self._prefix)) == self._prefix
+        self._file.seek(self._offset)
+        return same
+
+    def _read_available(self) -> List[List[str]]:
+        rows: List[List[str]] = []
+        self._file.seek(self._offset)
+        while True:
+            chunk = self._file.read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            if len(self._prefix) < PREFIX_CHECK_BYTES:
+                self._prefix += chunk[:PREFIX_CHECK_BYTES - len(self._prefix)]
+            self._offset += len(chunk)
+            self.bytes_read += len(chunk)
+            self.version += 1
+            if self._provisional:
+                # The line passed on after going quiet has grown: parse it again whole
+                del self._rows[-self._provisional:]
+                self._provisional = 0
+            data = self._partial + chunk
+            end = data.rfind(b"\n") + 1
+            self._partial = data[end:]
+            self._partial_since = time.monotonic()
+            if end:
+                rows.extend(self._parse(data[:end]))
+        return rows
+
+    def _parse(self, data: bytes) -> List[List[str]]:
+        first = self._header_pending
+        text = data.decode("utf-8-sig" if first else "utf-8", errors="replace")
+        reader = csv.reader(io.StringIO(text, newline=""))
+        if first:
+            header = next(reader, None)
+            if header is None:
+                return []
+            self._set_header(header)
+            self._header_pending = False
+
+        width = len(self._columns)
+        rows = []
+        for row in reader:
+            if not row:
+                continue
+            if len(row) < width:
+                row = row + [""] * (width - len(row))
+            elif len(row) > width:
+                row = row[:width]
+            rows.append(row)
+        self._rows.extend(rows)
+        return rows
+
+    def _pending_row(self) -> Optional[List[str]]:
+        """The incomplete last line, parsed provisionally"""
+        if not self._partial or self._header_pending or self._provisional:
+            return None
+        row = next(csv.reader([self._partial.decode("utf-8", errors="replace")]), None)
+        if not row:
+            return None
+        width = len(self._columns)
+        return (row + [""] * width)[:width]
+
+    def _set_header(self, header: List[str]):
+        self._columns = [h.strip() for h in header]
+        self._epc_col = self._columns.index(EPC_COLUMN) if EPC_COLUMN in self._columns else 0
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    # ----- queries -----
+    def epcs(self, rows: List[List[str]]) -> List[str]:
+        """EPC values of the given rows (blank cells skipped)"""
+        col = self._epc_col
+        return [epc for epc in (row[col].strip() for row in rows) if epc]
+
+    def load(self) -> pd.DataFrame:
+        """Poll, then return the current contents (same contract as CachedCsvFile.load)"""
+        self.poll()
+        return self.to_dataframe()
+
+    def rows(self) -> List[List[str]]:
+        return self._rows
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Current file contents as a DataFrame, rebuilt only after new rows arrive"""
+        with self._lock:
+            if self._df is None or self._df_version != self.version:
+                pending = self._pending_row()
+                rows = self._rows + [pending] if pending is not None else self._rows
+                df = pd.DataFrame(rows, columns=self._columns, dtype=object)
+                self._df = df.replace("", None)
+                self._df_version = self.version
+            return self._df
+
+    def stats(self) -> dict:
+        return {
+            'rows': len(self._rows),
+            'offset': self._offset,
+            'bytes_read': self.bytes_read,
+            'rotations': self.rotations,
+            'truncations': self.truncations,
+        }
+
+
+# ----------- Pipeline Feed ------------
+def tail_feed(tail: CsvTail, interval: float = POLL_INTERVAL):
+    """ReaderManager feed that offers every EPC appended to ``tail`` to the reader's channel.
+
+    Polls, the first catch-up included, run on the runtime's I/O threads,
+    so a large backlog never holds up the loop. The tail may also be
+    polled elsewhere (the dashboard's load()); the listener only queues
+    the rows, and they are offered to the channel from this coroutine, so
+    a full channel never blocks whichever thread polled.
+    """
+    async def feed(channel):
+        pending: Deque[List[List[str]]] = deque()
+        on_rows = pending.append  # called on the polling thread
+        await asyncio.to_thread(tail.subscribe, on_rows)
+        try:
+            while True:
+                while pending:
+                    for epc in tail.epcs(pending.popleft()):
+                        await channel.offer_async(epc)
+                await asyncio.sleep(interval)
+                await asyncio.to_thread(tail.poll)
+        finally:
+            tail.unsubscribe(on_rows)
+    return feed
@@ -0,0 +1,176 @@
+import asyncio
+import queue
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrumentation import Histogram
+from runtime import RUNTIME, Runtime, Worker
+
+# ----------- Heartbeat Configuration ------------
+DEFAULT_INTERVAL = 10.0              # seconds between checks while the server is up
+DEFAULT_TIMEOUT = 5.0                # per-request timeout (seconds)
+DEFAULT_WARNING_THRESHOLD = 60.0     # seconds of failures before reporting a disconnect
+BACKOFF_BASE = 2.0                   # first retry delay while down (seconds)
+BACKOFF_MAX = 120.0                  # retry delay cap while down (seconds)
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+# ----------- Endpoint State ------------
+class EndpointState:
+    """Connection state machine and retry schedule for one monitored URL"""
+
+    def __init__(self, name: str, url: str, interval: float, warning_threshold: float):
+        self.name = name
+        self.url = url
+        self.interval = interval
+        self.warning_threshold = warning_threshold
+        self.connected = True
+        self.failures = 0
+        self.last_success = datetime.now()
+        self.last_success_mono = time.monotonic()
+        self.last_latency_ms: Optional[float] = None
+        self.histogram = Histogram(LATENCY_BUCKETS_MS)  # round trips in ms
+
+    def record(self, ok: bool, latency_ms: Optional[float]) -> Optional[dict]:
+        """Apply a check result; returns a status update only when the state flips"""
+        if ok:
+            self.failures = 0
+            self.last_success = datetime.now()
+            self.last_success_mono = time.monotonic()
+            self.last_latency_ms = latency_ms
+            self.histogram.observe(latency_ms)
+            if not self.connected:
+                self.connected = True
+                return self.status(message=f'Server {self.name} reconnected')
+            return None
+
+        self.failures += 1
+        down_for = time.monotonic() - self.last_success_mono
+        if self.connected and down_for > self.warning_threshold:
+            self.connected = False
+            return self.status(message=f'Server {self.name} disconnected for {int(down_for)} seconds')
+        return None
+
+    def next_delay(self) -> float:
+        """Regular interval while up; capped exponential backoff with full jitter while failing"""
+        if not self.failures:
+            return self.interval
+        ceiling = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (self.failures - 1)))
+        return random.uniform(BACKOFF_BASE / 2, max(ceiling, BACKOFF_BASE / 2))
+
+    def _default_message(self) -> str:
+        if self.connected:
+            return 'Server connected'
+        down_for = time.monotonic() - self.last_success_mono
+        return f'Server {self.name} disconnected for {int(down_for)} seconds'
+
+    def status(self, message: Optional[str] = None) -> dict:
+        return {
+            'endpoint': self.name,
+            'url': self.url,
+            'status': 'connected' if self.connected else 'disconnected',
+            'connected': self.connected,
+            'timestamp': datetime.now(),
+            'message': message or self._default_message(),
+            'last_connected': self.last_success,
+            'latency_ms': self.last_latency_ms,
+            'consecutive_failures': self.failures,
+        }
+
+
+# ----------- Heartbeat Monitor ------------
+class HeartbeatMonitor:
+    """Checks one or more heartbeat URLs over a shared keep-alive session.
+
+    Each endpoint has its own worker on the runtime loop, and the blocking
+    requests run on the monitor's own threads, one per endpoint, so a slow
+    server cannot delay the others or anything else on the runtime.
+    status_queue only receives an update when an endpoint flips between
+    connected and disconnected.
+    """
+
+    def __init__(self, endpoints: Dict[str, str], status_queue: Optional[queue.Queue] = None,
+                 interval: float = DEFAULT_INTERVAL, timeout: float = DEFAULT_TIMEOUT,
+                 warning_threshold: float = DEFAULT_WARNING_THRESHOLD, runtime: Runtime = RUNTIME):
+        self.runtime = runtime
+        self.status_queue = status_queue
+        self.timeout = timeout
+        self.endpoints = {
+            name: EndpointState(name, url, interval, warning_threshold)
+            for name, url in endpoints.items()
+        }
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max(len(endpoints), 1), pool_maxsize=max(len(endpoints), 1))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._workers: List[Worker] = []
+        self._network: Optional[ThreadPoolExecutor] = None
+
+    def check(self, state: EndpointState) -> Optional[dict]:
+        """Run one heartbeat against an endpoint and apply the result"""
+        start = time.perf_counter()
+        try:
+            response = self.session.get(state.url, timeout=self.timeout)
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        latency_ms = (time.perf_counter() - start) * 1000
+        change = state.record(ok, latency_ms if ok else None)
+        if change is not None and self.status_queue is not None:
+            self.status_queue.put(change)
+        return change
+
+    async def _loop(self, state: EndpointState):
+        while True:
+            await asyncio.get_running_loop().run_in_executor(self._network, self.check, state)
+            await asyncio.sleep(state.next_delay())
+
+    # ----- lifecycle -----
+    def start(self):
+        if self.running:
+            return
+        now = time.monotonic()
+        for state in self.endpoints.values():
+            if state.connected:
+                # Time spent stopped does not count towards the warning threshold
+                state.last_success_mono = now
+        self._network = ThreadPoolExecutor(max(len(self.endpoints), 1), thread_name_prefix="heartbeat")
+        self._workers = [
+            self.runtime.spawn(f"heartbeat-{name}", lambda state=state: self._loop(state))
+            for name, state in self.endpoints.items()
+        ]
+
+    def stop(self):
+        """Stop checking; a request already in flight finishes on its own (bounded by the timeout)"""
+        self.runtime.stop_workers(self._workers)
+        self._workers = []
+        if self._network is not None:
+            self._network.shutdown(wait=False)
+            self._network = None
+
+    @property
+    def running(self) -> bool:
+        return any(worker.running for worker in self._workers)
+
+    # ----- status -----
+    @property
+    def connected(self) -> bool:
+        return all(state.connected for state in self.endpoints.values())
+
+    def status(self) -> Dict[str, dict]:
+        """Current status of every endpoint, for display"""
+        return {name: state.status() for name, state in self.endpoints.items()}
+
+    def histograms(self) -> Dict[str, dict]:
+        histograms = {}
+        for name, state in self.endpoints.items():
+            h = state.histogram
+            histograms[name] = {'buckets_ms': h.buckets, 'counts': list(h.counts),
+                                'count': h.count, 'sum_ms': h.sum}
+        return histograms
@@ -0,0 +1,353 @@
+import bisect
+import collections
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+# ----------- Instrumentation Configuration ------------
+METRIC_PREFIX = 'rfid_'
+STAGE_METRIC = 'stage_seconds'
+STAGE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+DEFAULT_PORT = 9108                 # local Prometheus scrape port
+PROFILE_INTERVAL = 0.01             # seconds between profiler samples
+PROFILE_MAX_STACKS = 10_000         # distinct stacks kept before new ones are folded into "other"
+PROFILE_MAX_DEPTH = 64
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> Labels:
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _format_labels(labels: Labels, extra: str = '') -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+# ----------- Metric Types ------------
+class Histogram:
+    """Fixed-bucket histogram, rendered with cumulative ``le`` buckets.
+
+    Stage timings are observed in seconds; other users pick their own unit
+    and buckets (the heartbeat records round trips in milliseconds).
+    """
+    __slots__ = ('buckets', 'counts', 'count', 'sum', '_lock')
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None if empty or +Inf)"""
+        if not self.count:
+            return None
+        target, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return None
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+class _StageTimer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+# ----------- Metrics Registry ------------
+class MetricsRegistry:
+    """Counters, stage histograms and values collected at scrape time.
+
+    While disabled, time() hands back a shared no-op context manager and
+    inc() returns at once, so hooks left in the hot path cost one attribute
+    check. Collected values are callables evaluated only when rendered.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = collections.defaultdict(float)
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._collected: Dict[Tuple[str, Labels], Tuple[str, Callable[[], float]]] = {}
+        self._help: Dict[str, str] = {}
+
+    # ----- hooks -----
+    def time(self, stage: str):
+        """Context manager timing one pipeline stage into rfid_stage_seconds{stage=...}"""
+        if not self.enabled:
+            return _NOOP
+        histogram = self._histograms.get((STAGE_METRIC, (('stage', stage),)))
+        if histogram is None:
+            histogram = self.histogram(STAGE_METRIC, {'stage': stage})
+        return _StageTimer(histogram)
+
+    def inc(self, name: str, amount: float = 1.0, labels: Optional[Dict[str, str]] = None):
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] += amount
+
+    # ----- registration -----
+    def histogram(self, name: str, labels: Optional[Dict[str, str]] = None,
+                  buckets=STAGE_BUCKETS) -> Histogram:
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            return histogram
+
+    def collect(self, name: str, fn: Callable[[], float], labels: Optional[Dict[str, str]] = None,
+                help_text: str = '', kind: str = 'gauge'):
+        """Register (or replace) a value read by calling ``fn`` at scrape time.
+
+        Use kind='counter' for totals a component already keeps (reads seen,
+        events written), so the hot path pays nothing to export them.
+        """
+        with self._lock:
+            self._collected[(name, _labels(labels))] = (kind, fn)
+            if help_text:
+                self._help[name] = help_text
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    # ----- reading -----
+    def stage_summary(self) -> List[dict]:
+        """Per-stage count, mean and approximate p95 (seconds), slowest first"""
+        with self._lock:
+            stages = [(labels[0][1], h) for (name, labels), h in self._histograms.items()
+                      if name == STAGE_METRIC]
+        rows = [{'stage': stage, 'count': h.count, 'mean': h.sum / h.count if h.count else 0.0,
+                 'p95': h.quantile(0.95), 'total': h.sum} for stage, h in stages]
+        return sorted(rows, key=lambda row: row['total'], reverse=True)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = dict(self._histograms)
+            collected = dict(self._collected)
+
+        lines: List[str] = []
+        emitted = set()
+
+        def header(name: str, kind: str):
+            if name in emitted:
+                return
+            emitted.add(name)
+            if name in self._help:
+                lines.append(f"# HELP {METRIC_PREFIX}{name} {self._help[name]}")
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, 'counter')
+            lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value:g}")
+
+        for (name, labels), (kind, fn) in sorted(collected.items(), key=lambda item: item[0]):
+            try:
+                value = float(fn())
+            except Exception:
+                continue
+            header(name, kind)
+            lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value:g}")
+
+        for (name, labels), h in sorted(histograms.items(), key=lambda item: item[0]):
+            header(name, 'histogram')
+            with h._lock:
+                counts, total, count = list(h.counts), h.sum, h.count
+            cumulative = 0
+            for bound, n in zip(h.buckets, counts):
+                cumulative += n
+                le = _format_labels(labels, 'le="%g"' % bound)
+                lines.append(f"{METRIC_PREFIX}{name}_bucket{le} {cumulative}")
+            le = _format_labels(labels, 'le="+Inf"')
+            lines.append(f"{METRIC_PREFIX}{name}_bucket{le} {count}")
+            lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(labels)} {total:g}")
+            lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry the hooks in every module report to
+REGISTRY = MetricsRegistry()
+
+
+# ----------- Sampling Profiler ------------
+class SamplingProfiler:
+    """Samples every thread's stack at a fixed interval while running.
+
+    Stacks are counted in collapsed form ("file:func;file:func"), which
+    flamegraph tools read directly. Nothing is sampled while stopped.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL, max_stacks: int = PROFILE_MAX_STACKS):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.samples = 0
+        self._stacks: collections.Counter = collections.Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+
+    def clear(self):
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            with self._lock:
+                self.samples += 1
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    stack = self._collapse(frame, names.get(ident, str(ident)))
+                    if stack not in self._stacks and len(self._stacks) >= self.max_stacks:
+                        stack = 'other'
+                    self._stacks[stack] += 1
+
+    @staticmethod
+    def _collapse(frame, thread_name: str) -> str:
+        parts = []
+        while frame is not None and len(parts) < PROFILE_MAX_DEPTH:
+            code = frame.f_code
+            parts.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+            frame = frame.f_back
+        parts.append(thread_name)
+        return ';'.join(reversed(parts))
+
+    def collapsed(self) -> str:
+        with self._lock:
+            return "\n".join(f"{stack} {n}" for stack, n in self._stacks.most_common()) + "\n"
+
+    def top(self, n: int = 15) -> List[Tuple[str, int]]:
+        """Functions that were on top of a stack most often"""
+        leaves: collections.Counter = collections.Counter()
+        with self._lock:
+            for stack, count in self._stacks.items():
+                leaves[stack.rsplit(';', 1)[-1]] += count
+        return leaves.most_common(n)
+
+
+# ----------- Metrics Endpoint ------------
+class MetricsServer:
+    """Serves /metrics (Prometheus text) and /profile (collapsed stacks) on a local port"""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, profiler: Optional[SamplingProfiler] = None,
+                 host: str = '127.0.0.1', port: int = DEFAULT_PORT):
+        self.registry = registry
+        self.profiler = profiler
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/metrics':
+                    body, content_type = server.registry.render(), 'text/plain; version=0.0.4'
+                elif path == '/profile' and server.profiler is not None:
+                    body, content_type = server.profiler.collapsed(), 'text/plain'
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    @property
+    def serving(self) -> bool:
+        return self._server is not None
+
+    def start(self):
+        if self._server is not None:
+            return
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
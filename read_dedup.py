@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+# ----------- Dedup Configuration ------------
+DEFAULT_COOLDOWN = 5.0       # seconds of silence before a tag counts as a new pass
+DEFAULT_MAX_TAGS = 100_000   # hard cap on tracked tags (LRU eviction beyond it)
+
+
+class TagPresence:
+    """Aggregated reads of one EPC while it stays in the reader field"""
+    __slots__ = ('epc', 'first_seen', 'last_seen', 'read_count', 'rssi_sum', 'rssi_max', 'rssi_reads')
+
+    def __init__(self, epc: str, now: float):
+        self.epc = epc
+        self.first_seen = now
+        self.last_seen = now
+        self.read_count = 0
+        self.rssi_sum = 0.0
+        self.rssi_max: Optional[float] = None
+        self.rssi_reads = 0
+
+    def add_read(self, now: float, rssi: Optional[float]):
+        self.last_seen = now
+        self.read_count += 1
+        if rssi is not None:
+            self.rssi_sum += rssi
+            self.rssi_reads += 1
+            if self.rssi_max is None or rssi > self.rssi_max:
+                self.rssi_max = rssi
+
+    @property
+    def rssi_avg(self) -> Optional[float]:
+        return self.rssi_sum / self.rssi_reads if self.rssi_reads else None
+
+    def as_dict(self) -> dict:
+        return {
+            'epc': self.epc,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'dwell': self.last_seen - self.first_seen,
+            'read_count': self.read_count,
+            'rssi_avg': self.rssi_avg,
+            'rssi_max': self.rssi_max,
+        }
+
+
+# ----------- Read Deduplicator ------------
+class ReadDeduplicator:
+    """Collapses repeated reads of the same EPC into one event per pass.
+
+    A read starts a new pass when the tag has not been seen for ``cooldown``
+    seconds; every other read only updates that pass's read count and RSSI.
+    Tags are kept in an LRU ordered by last read, so expired passes are
+    evicted from the front in amortized O(1) and memory stays bounded by
+    the number of tags seen within one cooldown window (and ``max_tags``).
+    """
+
+    def __init__(self, cooldown: float = DEFAULT_COOLDOWN, max_tags: int = DEFAULT_MAX_TAGS,
+                 on_pass_end: Optional[Callable[[TagPresence], None]] = None):
+        self.cooldown = cooldown
+        self.max_tags = max_tags
+        self.on_pass_end = on_pass_end
+        self._tags: 'OrderedDict[str, TagPresence]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.reads_seen = 0
+        self.events_forwarded = 0
+
+    def offer(self, epc: str, rssi: Optional[float] = None, now: Optional[float] = None) -> bool:
+        """Record a read; True if it starts a new pass and should be forwarded"""
+        now = time.monotonic() if now is None else now
+        ended = []
+        with self._lock:
+            self.reads_seen += 1
+            presence = self._tags.get(epc)
+            is_new = presence is None or now - presence.last_seen > self.cooldown
+            if is_new:
+                if presence is not None:
+                    ended.append(presence)
+                    del self._tags[epc]
+                presence = TagPresence(epc, now)
+                self._tags[epc] = presence
+                self.events_forwarded += 1
+            else:
+                self._tags.move_to_end(epc)
+            presence.add_read(now, rssi)
+            self._evict(now, ended)
+
+        if self.on_pass_end is not None:
+            for presence in ended:
+                self.on_pass_end(presence)
+        return is_new
+
+    def _evict(self, now: float, ended: list):
+        tags = self._tags
+        while tags:
+            epc, oldest = next(iter(tags.items()))
+            if now - oldest.last_seen <= self.cooldown and len(tags) <= self.max_tags:
+                break
+            tags.popitem(last=False)
+            ended.append(oldest)
+
+    def presence(self, epc: str) -> Optional[dict]:
+        """Aggregates for a tag's current pass, if it is still being tracked"""
+        with self._lock:
+            presence = self._tags.get(epc)
+            return presence.as_dict() if presence is not None else None
+
+    def stats(self) -> dict:
+        return {
+            'reads_seen': self.reads_seen,
+            'events_forwarded': self.events_forwarded,
+            'reads_suppressed': self.reads_seen - self.events_forwarded,
+            'tags_tracked': len(self._tags),
+        }
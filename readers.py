@@ -0,0 +1,187 @@
+import asyncio
+import random
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from checkpoint import simulate_rfid_scan
+from direction import DirectionInferrer
+from event_pipeline import ScanEvent, make_scan_event
+from read_dedup import DEFAULT_COOLDOWN, ReadDeduplicator
+from reference_registry import normalize_epc
+from runtime import RUNTIME, BoundedBuffer, Runtime, Worker
+
+# ----------- Reader Configuration ------------
+DEFAULT_READER_ID = 'default'
+DEFAULT_QUEUE_SIZE = 10_000   # scans buffered per reader before reads are dropped
+ENQUEUE_TIMEOUT = 0.5         # seconds a feed waits on a full queue before dropping
+READER_INTERVAL = 1.0         # simulated reader poll interval (seconds)
+READ_PROBABILITY = 0.3        # chance the simulated reader sees a tag per poll
+SIMULATED_READS_PER_SIDE = 3  # reads per antenna when simulating a walk-through
+
+
+class ReaderConfig(NamedTuple):
+    """One physical reader and the door its antennas cover"""
+    reader_id: str
+    door: Optional[str] = None        # ZoneGraph door id; None keeps ENTRY/EXIT toggling
+    antennas: Tuple[int, ...] = (1,)
+    queue_size: int = DEFAULT_QUEUE_SIZE
+    outer_antenna: Optional[int] = None  # with inner_antenna set, direction comes from read order
+    inner_antenna: Optional[int] = None
+
+    @property
+    def infers_direction(self) -> bool:
+        return self.outer_antenna is not None and self.inner_antenna is not None
+
+
+# ----------- Reader Channel ------------
+class ReaderChannel:
+    """A reader's bounded scan queue and the stage that turns raw reads into scans.
+
+    Readers with a paired outer/inner antenna queue one scan per inferred
+    crossing; other readers queue the first read of each pass. EPCs are
+    normalized (normalize_epc) on the way in, so deduplication, direction
+    inference and everything downstream key a badge one way.
+    """
+
+    def __init__(self, config: ReaderConfig, cooldown: float = DEFAULT_COOLDOWN, runtime: Runtime = RUNTIME):
+        self.config = config
+        self.queue = BoundedBuffer(config.queue_size, runtime)
+        self.dedup = ReadDeduplicator(cooldown=cooldown)
+        self.direction: Optional[DirectionInferrer] = None
+        if config.infers_direction:
+            self.direction = DirectionInferrer(config.outer_antenna, config.inner_antenna)
+        self.dropped = 0
+
+    @property
+    def reader_id(self) -> str:
+        return self.config.reader_id
+
+    def put(self, event: ScanEvent) -> bool:
+        """Queue a scan; a queue that stays full drops it rather than stall the feed"""
+        if self.queue.put(event, timeout=ENQUEUE_TIMEOUT):
+            return True
+        self.dropped += 1
+        return False
+
+    async def put_async(self, event: ScanEvent) -> bool:
+        """put() for feeds on the runtime loop: waits for room without blocking the loop"""
+        if await self.queue.put_async(event, timeout=ENQUEUE_TIMEOUT):
+            return True
+        self.dropped += 1
+        return False
+
+    def _scan_event(self, card_id: str, antenna: Optional[int], direction: Optional[str] = None) -> ScanEvent:
+        if antenna is None:
+            antenna = self.config.antennas[0]
+        return make_scan_event(card_id, self.config.reader_id, antenna, self.config.door, direction)
+
+    def _accept(self, epc: str, rssi: Optional[float], antenna: Optional[int]) -> Optional[ScanEvent]:
+        """The scan a raw report turns into, if it starts a pass or completes a crossing"""
+        epc = normalize_epc(epc)
+        if antenna is None:
+            antenna = self.config.antennas[0]
+        if self.direction is not None:
+            crossing = self.direction.observe(epc, antenna)
+            if crossing is None:
+                return None
+            return self._scan_event(epc, antenna, crossing.direction)
+        if not self.dedup.offer(epc, rssi):
+            return None
+        return self._scan_event(epc, antenna)
+
+    def submit(self, card_id: str, antenna: Optional[int] = None, direction: Optional[str] = None) -> bool:
+        """Queue a scan from this reader, bypassing deduplication"""
+        return self.put(self._scan_event(normalize_epc(card_id), antenna, direction))
+
+    def offer(self, epc: str, rssi: Optional[float] = None, antenna: Optional[int] = None) -> bool:
+        """Feed a raw reader report; queues a scan only when it starts a pass or completes a crossing"""
+        event = self._accept(epc, rssi, antenna)
+        return event is not None and self.put(event)
+
+    async def offer_async(self, epc: str, rssi: Optional[float] = None, antenna: Optional[int] = None) -> bool:
+        """offer() for feeds on the runtime loop"""
+        event = self._accept(epc, rssi, antenna)
+        return event is not None and await self.put_async(event)
+
+    def clear(self):
+        self.queue.clear()
+
+    def stats(self) -> dict:
+        stats = self.direction.stats() if self.direction is not None else self.dedup.stats()
+        stats.update({'queue_depth': self.queue.qsize(), 'dropped': self.dropped})
+        return stats
+
+
+async def simulated_feed(channel: ReaderChannel):
+    """Stand-in for reader hardware: an occasional random tag from the registry"""
+    config = channel.config
+    while True:
+        await asyncio.sleep(READER_INTERVAL)
+        if random.random() < READ_PROBABILITY:
+            epc = simulate_rfid_scan()
+            if config.infers_direction:
+                # Walk the tag past both antennas in a random direction
+                sides = [config.outer_antenna, config.inner_antenna]
+                random.shuffle(sides)
+                for antenna in sides:
+                    for _ in range(SIMULATED_READS_PER_SIDE):
+                        await channel.offer_async(epc, antenna=antenna)
+            else:
+                await channel.offer_async(epc, antenna=random.choice(config.antennas))
+
+
+# ----------- Reader Manager ------------
+Feed = Callable[[ReaderChannel], Awaitable[None]]
+
+
+class ReaderManager:
+    """Runs one feed per reader on the runtime loop, each filling that reader's own queue.
+
+    ``feed(channel)`` is a coroutine that pushes reads with
+    channel.offer_async() until it is cancelled. ``feeds`` gives individual
+    readers a different source (e.g. file_tail.tail_feed).
+    """
+
+    def __init__(self, configs: Iterable[ReaderConfig], cooldown: float = DEFAULT_COOLDOWN,
+                 feed: Feed = simulated_feed, feeds: Optional[Dict[str, Feed]] = None,
+                 runtime: Runtime = RUNTIME):
+        self.runtime = runtime
+        self.channels: Dict[str, ReaderChannel] = OrderedDict(
+            (config.reader_id, ReaderChannel(config, cooldown, runtime)) for config in configs)
+        if not self.channels:
+            raise ValueError("ReaderManager needs at least one reader")
+        self.feed = feed
+        self.feeds = dict(feeds or {})
+        self._workers: List[Worker] = []
+
+    def channel(self, reader_id: Optional[str] = None) -> ReaderChannel:
+        """The named reader, or the first configured one"""
+        if reader_id is None:
+            return next(iter(self.channels.values()))
+        return self.channels[reader_id]
+
+    # ----- lifecycle -----
+    def start(self):
+        if self.running:
+            return
+        self._workers = [
+            self.runtime.spawn(f"rfid-reader-{reader_id}",
+                               lambda feed=self.feeds.get(reader_id, self.feed), channel=channel: feed(channel))
+            for reader_id, channel in self.channels.items()
+        ]
+
+    def stop(self):
+        """Cancel the feeds and wait for them to finish"""
+        self.runtime.stop_workers(self._workers)
+        self._workers = []
+
+    @property
+    def running(self) -> bool:
+        return any(worker.running for worker in self._workers)
+
+    def clear(self):
+        for channel in self.channels.values():
+            channel.clear()
+
+    def stats(self) -> Dict[str, dict]:
+        return {reader_id: channel.stats() for reader_id, channel in self.channels.items()}
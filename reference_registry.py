@@ -0,0 +1,269 @@
+import csv
+import hashlib
+import io
+import os
+import threading
+from typing import TYPE_CHECKING, List, Mapping, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd  # imported lazily: headless startup and lookups do not need it
+
+# ----------- Registry Configuration ------------
+EPC_COLUMN = "EPC"
+NAME_COLUMN = "Name"
+PREFIX_CHECK_BYTES = 4096  # bytes re-read to confirm a file was only appended to
+DIGEST_CHUNK_BYTES = 1 << 20  # read size when re-hashing the loaded bytes
+
+
+def normalize_epc(raw: str) -> str:
+    """Canonical EPC text: upper-case, without separators or a 0x prefix ('' if blank).
+
+    Stored and queried EPCs both go through this, in the CSV index, the
+    snapshot and the vectorized match, so all of them agree on a match.
+    """
+    epc = raw.strip().upper()
+    if epc.startswith("0X"):
+        epc = epc[2:]
+    return epc.replace(" ", "").replace("-", "").replace(":", "")
+
+
+def file_signature(path: str) -> Optional[Tuple[float, int]]:
+    """Return (mtime, size) for a file, or None if it is missing"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime, st.st_size)
+
+
+# ----------- Reference Registry ------------
+class ReferenceRegistry:
+    """In-memory EPC -> Name hash index over the reference CSV.
+
+    The file is only re-read when its mtime or size changes. When the file
+    has grown and the previously loaded bytes are untouched (same digest),
+    only the appended rows are parsed. Any other change is parsed in full
+    into a new index that replaces the old one in a single swap, so
+    lookups during a reload see the old rows or the new ones, never a
+    partial index. EPCs are keyed and looked up in normalize_epc form.
+
+    With ``snapshot_path`` (see registry_snapshot.py) the index is served
+    from the memory-mapped snapshot instead, as long as the snapshot was
+    taken from the CSV as it is now; otherwise the CSV is parsed as before.
+    """
+
+    def __init__(self, path: str, snapshot_path: Optional[str] = None):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.version = 0
+        self.source = "csv"           # "snapshot" while the index is memory-mapped
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[float, int]] = None
+        self._snapshot_signature: Optional[Tuple[float, int]] = None
+        self._snapshot = None
+        self._columns: List[str] = [EPC_COLUMN, NAME_COLUMN]
+        self._epc_col = 0
+        self._name_col = 1
+        self._rows: List[List[str]] = []
+        self._index: Mapping[str, str] = {}
+        self._offset = 0              # bytes consumed so far
+        self._ends_with_newline = True
+        self._digest = hashlib.blake2b()  # of the bytes consumed so far
+        self._df: Optional['pd.DataFrame'] = None
+        self._df_version = -1
+        self._lookup: Optional['pd.Series'] = None
+        self._lookup_version = -1
+
+    # ----- loading -----
+    def refresh(self) -> bool:
+        """Reload the file if it changed. Returns True if the index changed"""
+        signature = file_signature(self.path)
+        snapshot_signature = file_signature(self.snapshot_path) if self.snapshot_path else None
+        if signature == self._signature and snapshot_signature == self._snapshot_signature:
+            return False
+
+        with self._lock:
+            if signature == self._signature and snapshot_signature == self._snapshot_signature:
+                return False
+            self._snapshot_signature = snapshot_signature
+            if snapshot_signature is not None and self._load_snapshot():
+                self._signature = signature
+                self.version += 1
+                return True
+            if self._snapshot is not None:
+                # Stale or unreadable snapshot: start over from the CSV (the snapshot serves until then)
+                self._snapshot = None
+                self._signature = None
+            if signature is None:
+                self._reset()
+                self._signature = None
+                self.version += 1
+                return True
+
+            with open(self.path, "rb") as f:
+                if self._can_append(f, signature[1]):
+                    f.seek(self._offset)
+                    self._append(f.read())
+                else:
+                    f.seek(0)
+                    self._load(f.read())
+            self._signature = signature
+            self.version += 1
+            return True
+
+    def _load_snapshot(self) -> bool:
+        """Serve the index from the snapshot if it matches the CSV on disk"""
+        from registry_snapshot import SnapshotError, SnapshotIndex
+        try:
+            snapshot = SnapshotIndex(self.snapshot_path)
+        except (OSError, SnapshotError) as e:
+            print(f"Registry snapshot unusable, reading {self.path}: {e}")
+            return False
+        if not snapshot.matches_source(self.path):
+            print(f"Registry snapshot is older than {self.path}; rebuild it with registry_snapshot.py")
+            return False
+        self._index = snapshot
+        self._snapshot = snapshot
+        self._columns = list(snapshot.columns)
+        self._rows = []
+        self._offset, self._digest = 0, hashlib.blake2b()
+        self.source = "snapshot"
+        return True
+
+    def _can_append(self, f, new_size: int) -> bool:
+        """True if the file on disk is the loaded file plus appended bytes"""
+        if self._signature is None or self._snapshot is not None or not self._ends_with_newline:
+            return False
+        if new_size <= self._offset:
+            return False
+        # Every loaded byte is checked: an in-place edit anywhere forces a full reload
+        digest, remaining = hashlib.blake2b(), self._offset
+        while remaining:
+            chunk = f.read(min(remaining, DIGEST_CHUNK_BYTES))
+            if not chunk:
+                return False
+            digest.update(chunk)
+            remaining -= len(chunk)
+        return digest.digest() == self._digest.digest()
+
+    def _reset(self):
+        self.source = "csv"
+        self._columns = [EPC_COLUMN, NAME_COLUMN]
+        self._epc_col, self._name_col = 0, 1
+        self._rows = []
+        self._index = {}
+        self._offset = 0
+        self._ends_with_newline = True
+        self._digest = hashlib.blake2b()
+
+    def _load(self, data: bytes):
+        """Parse the whole file into a new index, then swap it in"""
+        text = data.decode("utf-8-sig", errors="replace")
+        reader = csv.reader(io.StringIO(text, newline=""))
+        header = next(reader, None)
+        columns = [h.strip() for h in header] if header else [EPC_COLUMN, NAME_COLUMN]
+        epc_col = columns.index(EPC_COLUMN) if EPC_COLUMN in columns else 0
+        name_col = columns.index(NAME_COLUMN) if NAME_COLUMN in columns else 1
+        rows, index = [], {}
+        self._parse_rows(reader, len(columns), epc_col, name_col, rows, index)
+        digest = hashlib.blake2b(data)
+
+        self.source = "csv"
+        self._columns, self._epc_col, self._name_col = columns, epc_col, name_col
+        self._rows, self._index = rows, index
+        self._offset, self._ends_with_newline, self._digest = len(data), data.endswith(b"\n"), digest
+
+    def _append(self, data: bytes):
+        """Add appended rows to the live index (new keys only, so lookups stay consistent)"""
+        if not data:
+            return
+        reader = csv.reader(io.StringIO(data.decode("utf-8", errors="replace"), newline=""))
+        self._parse_rows(reader, len(self._columns), self._epc_col, self._name_col, self._rows, self._index)
+        self._digest.update(data)
+        self._offset += len(data)
+        self._ends_with_newline = data.endswith(b"\n")
+
+    @staticmethod
+    def _parse_rows(reader, width: int, epc_col: int, name_col: int, rows: List[List[str]], index: dict):
+        for row in reader:
+            if not row:
+                continue
+            if len(row) < width:
+                row = row + [""] * (width - len(row))
+            rows.append(row)
+            epc = normalize_epc(row[epc_col])
+            if epc and epc not in index:
+                index[epc] = row[name_col].strip()
+
+    # ----- queries -----
+    def lookup(self, epc: str) -> Optional[str]:
+        """Return the registered name for an EPC, or None if unknown"""
+        name = self._index.get(epc)
+        if name is None and epc:
+            name = self._index.get(normalize_epc(epc))
+        return name
+
+    def __contains__(self, epc: str) -> bool:
+        return epc in self._index or (bool(epc) and normalize_epc(epc) in self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def index(self) -> Mapping[str, str]:
+        """EPC -> Name mapping, keyed by normalize_epc (first occurrence wins on duplicates)"""
+        return self._index
+
+    def to_dataframe(self) -> 'pd.DataFrame':
+        """DataFrame view of the raw rows, rebuilt only when the file changed"""
+        import pandas as pd
+        with self._lock:
+            if self._df is None or self._df_version != self.version:
+                if self._snapshot is not None:
+                    snapshot = self._snapshot
+                    df = pd.DataFrame({name: snapshot.column(i) for i, name in enumerate(self._columns)},
+                                      columns=self._columns, dtype=object)
+                else:
+                    df = pd.DataFrame(self._rows, columns=self._columns, dtype=object)
+                self._df = df.replace("", None)
+                self._df_version = self.version
+            return self._df
+
+    def lookup_series(self) -> 'pd.Series':
+        """EPC-indexed Series of names for vectorized joins, cached per version"""
+        import pandas as pd
+        with self._lock:
+            if self._lookup is None or self._lookup_version != self.version:
+                if self._snapshot is not None:
+                    epcs, names = self._snapshot.epcs(), self._snapshot.names()
+                else:
+                    epcs, names = list(self._index.keys()), list(self._index.values())
+                self._lookup = pd.Series(names, index=pd.Index(epcs, dtype=object), dtype=object)
+                self._lookup_version = self.version
+            return self._lookup
+
+
+# ----------- Cached CSV Loader ------------
+class CachedCsvFile:
+    """Keeps the last parsed DataFrame of a CSV and reparses it only when the file changes"""
+
+    def __init__(self, path: str, default_columns: List[str]):
+        self.path = path
+        self.default_columns = default_columns
+        self.version = 0
+        self._signature: Optional[Tuple[float, int]] = None
+        self._df: Optional['pd.DataFrame'] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> 'pd.DataFrame':
+        import pandas as pd
+        signature = file_signature(self.path)
+        with self._lock:
+            if signature != self._signature or self._df is None:
+                if signature is None:
+                    self._df = pd.DataFrame(columns=self.default_columns)
+                else:
+                    self._df = pd.read_csv(self.path, encoding="utf-8-sig", dtype=str)
+                self._signature = signature
+                self.version += 1
+            return self._df
@@ -0,0 +1,407 @@
+"""Bulk import of the reference registry into a compact, memory-mapped snapshot.
+
+    python registry_snapshot.py ref22.csv ref22.rsnap      # validate, normalize, write
+    python registry_snapshot.py ref22.csv ref22.rsnap --report-only
+
+The snapshot holds every column as an offsets array plus a byte blob and a
+prebuilt open-addressing hash table over the EPC column. Opening one maps
+the file and reads a small JSON header, so startup does not grow with the
+registry and needs neither csv parsing nor pandas. ReferenceRegistry uses
+a snapshot when it is newer than its CSV and falls back to the CSV
+otherwise.
+"""
+import argparse
+import csv
+import io
+import json
+import mmap
+import os
+import re
+import sys
+import zlib
+from array import array
+from collections.abc import Mapping
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from reference_registry import EPC_COLUMN, NAME_COLUMN, normalize_epc
+
+# ----------- Snapshot Configuration ------------
+MAGIC = b"RFIDSNP1"
+FORMAT_VERSION = 1
+ALIGN = 8
+MAX_LOAD_FACTOR = 0.5        # hash table slots are at least twice the row count
+REPORT_SAMPLES = 20          # rejected/conflicting rows quoted in the report
+
+_HEX_EPC = re.compile(r"[0-9A-F]+")
+
+
+class SnapshotError(Exception):
+    """The snapshot is missing, truncated or written by an incompatible version"""
+
+
+def validate_epc(raw: str) -> Optional[str]:
+    """normalize_epc(raw), or None if that is not a valid EPC.
+
+    A valid EPC is hex and a whole number of 16-bit words.
+    """
+    epc = normalize_epc(raw)
+    if not epc or len(epc) % 4 or not _HEX_EPC.fullmatch(epc):
+        return None
+    return epc
+
+
+# ----------- Import ------------
+class ImportReport(NamedTuple):
+    rows_read: int
+    rows_kept: int
+    blank: int                               # rows without an EPC
+    invalid: List[Tuple[int, str]]           # (line, raw EPC) samples
+    invalid_count: int
+    duplicates: int                          # repeated EPCs (first occurrence kept)
+    conflicts: List[Tuple[int, str, str, str]]   # (line, EPC, kept name, dropped name) samples
+    conflict_count: int
+    normalized: int                          # EPCs whose text changed when normalized
+
+
+def read_registry_csv(path: str) -> Tuple[List[str], List[List[str]], ImportReport]:
+    """Parse, validate and normalize a reference CSV without pandas"""
+    with open(path, "rb") as f:
+        text = f.read().decode("utf-8-sig", errors="replace")
+    reader = csv.reader(io.StringIO(text, newline=""))
+    header = [h.strip() for h in next(reader, None) or [EPC_COLUMN, NAME_COLUMN]]
+    epc_col = header.index(EPC_COLUMN) if EPC_COLUMN in header else 0
+    name_col = header.index(NAME_COLUMN) if NAME_COLUMN in header else min(1, len(header) - 1)
+    width = len(header)
+
+    rows: List[List[str]] = []
+    seen = {}
+    rows_read = blank = invalid_count = duplicates = conflict_count = normalized = 0
+    invalid: List[Tuple[int, str]] = []
+    conflicts: List[Tuple[int, str, str, str]] = []
+    for row in reader:
+        if not row:
+            continue
+        line = reader.line_num
+        rows_read += 1
+        row = [cell.strip() for cell in (row + [""] * width)[:width]]
+        raw = row[epc_col]
+        if not raw:
+            blank += 1
+            continue
+        epc = validate_epc(raw)
+        if epc is None:
+            invalid_count += 1
+            if len(invalid) < REPORT_SAMPLES:
+                invalid.append((line, raw))
+            continue
+        if epc != raw:
+            normalized += 1
+        kept = seen.get(epc)
+        if kept is not None:
+            duplicates += 1
+            if rows[kept][name_col] != row[name_col]:
+                conflict_count += 1
+                if len(conflicts) < REPORT_SAMPLES:
+                    conflicts.append((line, epc, rows[kept][name_col], row[name_col]))
+            continue
+        row[epc_col] = epc
+        seen[epc] = len(rows)
+        rows.append(row)
+
+    report = ImportReport(rows_read, len(rows), blank, invalid, invalid_count, duplicates,
+                          conflicts, conflict_count, normalized)
+    return header, rows, report
+
+
+# ----------- Writing ------------
+def _table_slots(rows: int) -> int:
+    slots = 8
+    while slots * MAX_LOAD_FACTOR < rows:
+        slots <<= 1
+    return slots
+
+
+def _u32(values: List[int]) -> bytes:
+    return array("I", values).tobytes()
+
+
+def _encode_column(values: List[bytes], encoding: str) -> dict:
+    """Fixed-width blob when every value has the same length, else end offsets + blob"""
+    widths = {len(v) for v in values}
+    blob = b"".join(values)
+    if len(blob) >= 1 << 32:
+        raise SnapshotError("column exceeds 4 GiB")
+    if len(widths) == 1:
+        return {'encoding': encoding, 'width': widths.pop(), 'offsets': None, 'blob': blob}
+    offsets = [0] * (len(values) + 1)
+    total = 0
+    for i, value in enumerate(values):
+        total += len(value)
+        offsets[i + 1] = total
+    return {'encoding': encoding, 'width': None, 'offsets': _u32(offsets), 'blob': blob}
+
+
+def write_snapshot(path: str, header: List[str], rows: List[List[str]],
+                   source: Optional[str] = None, epc_column: str = EPC_COLUMN,
+                   name_column: str = NAME_COLUMN):
+    """Write normalized rows (see read_registry_csv) as a snapshot.
+
+    ``source`` is the CSV the snapshot must stay in sync with; a registry
+    ignores the snapshot once that file changes.
+    """
+    epc_col = header.index(epc_column) if epc_column in header else 0
+    name_col = header.index(name_column) if name_column in header else min(1, len(header) - 1)
+    count = len(rows)
+
+    # EPCs are stored as packed bytes (12 per 96-bit EPC), other columns as UTF-8
+    try:
+        keys = [bytes.fromhex(row[epc_col]) for row in rows]
+    except ValueError as e:
+        raise SnapshotError(f"EPCs must be normalized hex: {e}")
+    columns = []
+    for c in range(len(header)):
+        if c == epc_col:
+            columns.append(_encode_column(keys, 'hex'))
+        else:
+            values = [row[c].encode("utf-8") for row in rows]
+            encoding = 'ascii' if all(v.isascii() for v in values) else 'utf-8'
+            columns.append(_encode_column(values, encoding))
+
+    # Hash table over the EPC bytes: slot holds row + 1, 0 is empty, linear probing
+    slots = _table_slots(count)
+    mask = slots - 1
+    table = [0] * slots
+    for i, key in enumerate(keys):
+        h = zlib.crc32(key) & mask
+        while table[h]:
+            h = (h + 1) & mask
+        table[h] = i + 1
+
+    source_size = source_mtime_ns = None
+    if source is not None:
+        st = os.stat(source)
+        source_size, source_mtime_ns = st.st_size, st.st_mtime_ns
+
+    # Every section starts on an ALIGN boundary after the header
+    def layout(header_len: int):
+        position = len(MAGIC) + 4 + header_len
+        chunks, sections = [], []
+        for column in columns:
+            section = {'encoding': column['encoding'], 'width': column['width']}
+            for part in ('offsets', 'blob'):
+                data = column[part]
+                if data is None:
+                    section[part] = None
+                    continue
+                position += -position % ALIGN
+                section[part] = position
+                chunks.append((position, data))
+                position += len(data)
+            section['blob_len'] = len(column['blob'])
+            sections.append(section)
+        position += -position % ALIGN
+        chunks.append((position, _u32(table)))
+        return sections, position, chunks
+
+    meta = {
+        'format': FORMAT_VERSION, 'byteorder': sys.byteorder, 'rows': count, 'slots': slots,
+        'columns': header, 'epc_column': epc_col, 'name_column': name_col,
+        'source_size': source_size, 'source_mtime_ns': source_mtime_ns,
+    }
+    header_len = 0
+    while True:
+        meta['sections'], meta['table'], chunks = layout(header_len)
+        encoded_meta = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+        if len(encoded_meta) == header_len:
+            break
+        header_len = len(encoded_meta)
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as out:
+        out.write(MAGIC)
+        out.write(header_len.to_bytes(4, "little"))
+        out.write(encoded_meta)
+        for position, data in chunks:
+            out.write(b"\0" * (position - out.tell()))
+            out.write(data)
+    os.replace(tmp, path)
+
+
+# ----------- Reading ------------
+class _Column(NamedTuple):
+    offsets: Optional[memoryview]   # u32 end offsets, None for fixed-width columns
+    width: Optional[int]
+    blob: memoryview
+    encoding: str                   # 'hex' (packed EPC bytes), 'ascii' or 'utf-8'
+
+    def raw(self, row: int) -> memoryview:
+        if self.width is not None:
+            return self.blob[row * self.width:(row + 1) * self.width]
+        return self.blob[self.offsets[row]:self.offsets[row + 1]]
+
+    def decode(self, raw) -> str:
+        return bytes(raw).hex().upper() if self.encoding == 'hex' else str(raw, 'utf-8')
+
+
+class SnapshotIndex(Mapping):
+    """EPC -> Name mapping served straight from a memory-mapped snapshot.
+
+    Lookups hash the packed EPC with crc32 and probe the prebuilt table, so
+    opening costs one mmap and a JSON header whatever the registry size.
+    Queried EPCs are normalized with normalize_epc, as the stored ones
+    were on import.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                raise SnapshotError(f"{path} is empty")
+        buf = memoryview(self._mmap)
+        if bytes(buf[:len(MAGIC)]) != MAGIC:
+            raise SnapshotError(f"{path} is not a registry snapshot")
+        header_len = int.from_bytes(buf[len(MAGIC):len(MAGIC) + 4], "little")
+        try:
+            meta = json.loads(bytes(buf[len(MAGIC) + 4:len(MAGIC) + 4 + header_len]))
+        except ValueError as e:
+            raise SnapshotError(f"{path} has a corrupt header: {e}")
+        if meta.get('format') != FORMAT_VERSION or meta.get('byteorder') != sys.byteorder:
+            raise SnapshotError(f"{path} was written by an incompatible version or platform")
+
+        self.meta = meta
+        self.columns: List[str] = meta['columns']
+        self.rows: int = meta['rows']
+        slots = meta['slots']
+        if len(buf) < meta['table'] + 4 * slots:
+            raise SnapshotError(f"{path} is truncated")
+        self._mask = slots - 1
+        self._table = buf[meta['table']:meta['table'] + 4 * slots].cast("I")
+        self._columns = []
+        for section in meta['sections']:
+            offsets = None
+            if section['offsets'] is not None:
+                offsets = buf[section['offsets']:section['offsets'] + 4 * (self.rows + 1)].cast("I")
+            blob = buf[section['blob']:section['blob'] + section['blob_len']]
+            self._columns.append(_Column(offsets, section['width'], blob, section['encoding']))
+        self._epcs = self._columns[meta['epc_column']]
+        self._names = self._columns[meta['name_column']]
+
+    def matches_source(self, path: str) -> bool:
+        """True if ``path`` is unchanged since the snapshot was taken from it"""
+        if self.meta['source_size'] is None:
+            return True
+        try:
+            st = os.stat(path)
+        except OSError:
+            return True
+        return st.st_size == self.meta['source_size'] and st.st_mtime_ns == self.meta['source_mtime_ns']
+
+    def _probe(self, key: bytes) -> int:
+        table, mask = self._table, self._mask
+        width, blob = self._epcs.width, self._epcs.blob
+        h = zlib.crc32(key) & mask
+        while True:
+            row = table[h]
+            if not row:
+                return -1
+            row -= 1
+            if width is not None:
+                if blob[row * width:(row + 1) * width] == key:
+                    return row
+            elif self._epcs.raw(row) == key:
+                return row
+            h = (h + 1) & mask
+
+    def _find(self, epc: str) -> int:
+        """Row of ``epc``, or -1"""
+        try:
+            return self._probe(bytes.fromhex(epc))  # accepts either case
+        except ValueError:
+            normalized = validate_epc(epc)
+            return -1 if normalized is None else self._probe(bytes.fromhex(normalized))
+
+    def value(self, row: int, column: int) -> str:
+        col = self._columns[column]
+        return col.decode(col.raw(row))
+
+    # ----- Mapping -----
+    def get(self, epc: str, default=None):
+        row = self._find(epc)
+        return default if row < 0 else self._names.decode(self._names.raw(row))
+
+    def __getitem__(self, epc: str) -> str:
+        row = self._find(epc)
+        if row < 0:
+            raise KeyError(epc)
+        return self._names.decode(self._names.raw(row))
+
+    def __contains__(self, epc) -> bool:
+        return isinstance(epc, str) and self._find(epc) >= 0
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.epcs())
+
+    # ----- bulk access -----
+    def column(self, column: int) -> List[str]:
+        """Every value of one column, in file order"""
+        col = self._columns[column]
+        rows = range(self.rows)
+        if col.encoding == 'hex' and col.width is not None:
+            text, step = bytes(col.blob).hex().upper(), 2 * col.width
+            return [text[i * step:(i + 1) * step] for i in rows]
+        if col.encoding == 'ascii':
+            # Byte offsets are character offsets: decode once, then slice
+            text = str(col.blob, 'ascii')
+            if col.width is not None:
+                return [text[i * col.width:(i + 1) * col.width] for i in rows]
+            offsets = col.offsets
+            return [text[offsets[i]:offsets[i + 1]] for i in rows]
+        return [col.decode(col.raw(i)) for i in rows]
+
+    def epcs(self) -> List[str]:
+        return self.column(self.meta['epc_column'])
+
+    def names(self) -> List[str]:
+        return self.column(self.meta['name_column'])
+
+
+def format_report(report: ImportReport) -> str:
+    lines = [f"{report.rows_read:,} rows read, {report.rows_kept:,} kept",
+             f"  {report.normalized:,} EPCs normalized (case, separators, 0x prefix)",
+             f"  {report.blank:,} rows without an EPC skipped",
+             f"  {report.invalid_count:,} invalid EPCs rejected",
+             f"  {report.duplicates:,} duplicate EPCs dropped (first occurrence kept), "
+             f"{report.conflict_count:,} with a different name"]
+    for line, raw in report.invalid:
+        lines.append(f"    line {line}: invalid EPC {raw!r}")
+    for line, epc, kept, dropped in report.conflicts:
+        lines.append(f"    line {line}: {epc} is {kept!r}, dropped {dropped!r}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('csv', help='reference CSV (EPC,Name,...)')
+    parser.add_argument('snapshot', nargs='?', help='snapshot to write (default: CSV path with .rsnap)')
+    parser.add_argument('--report-only', action='store_true', help='validate without writing')
+    parser.add_argument('--strict', action='store_true', help='exit 1 on invalid or conflicting rows')
+    args = parser.parse_args()
+
+    header, rows, report = read_registry_csv(args.csv)
+    print(format_report(report))
+    if args.strict and (report.invalid_count or report.conflict_count):
+        sys.exit(1)
+    if args.report_only:
+        return
+    target = args.snapshot or os.path.splitext(args.csv)[0] + ".rsnap"
+    write_snapshot(target, header, rows, source=args.csv)
+    print(f"snapshot written to {target} ({os.path.getsize(target):,} bytes)")
+
+
+if __name__ == '__main__':
+    main()
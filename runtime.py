@@ -0,0 +1,314 @@
+import asyncio
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+# ----------- Runtime Configuration ------------
+BLOCKING_WORKERS = 2          # threads for blocking file work (reloads, tail polls, rollups)
+RESTART_BASE = 0.5            # first delay before restarting a crashed worker (seconds)
+RESTART_MAX = 30.0            # restart delay cap
+RESTART_RESET = 60.0          # a worker that ran this long restarts from the base delay again
+STOP_TIMEOUT = 5.0            # seconds to wait for cancelled workers to finish
+START_TIMEOUT = 5.0
+
+
+# ----------- Supervised Workers ------------
+class Worker:
+    """Handle on one supervised coroutine running on the runtime loop"""
+
+    def __init__(self, runtime: 'Runtime', name: str):
+        self.runtime = runtime
+        self.name = name
+        self.restarts = 0
+        self.last_error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def stop(self, timeout: float = STOP_TIMEOUT):
+        """Cancel the worker and wait for it to finish"""
+        self.runtime.stop_workers([self], timeout)
+
+
+class Runtime:
+    """One asyncio event loop, on one thread, hosting every background worker.
+
+    Workers are coroutines started with spawn() and supervised: one that
+    raises is restarted after a capped exponential backoff, one that
+    returns is done, and stop_workers() cancels and awaits them, so a
+    stopped component leaves nothing running. Blocking file work is sent
+    to a small shared thread pool with ``await asyncio.to_thread(...)``.
+    Network clients (heartbeat, server sync) run their requests on
+    executors of their own, so a server that is down or slow cannot hold
+    up file reloads, and the reverse.
+
+    The loop thread starts on first use. spawn(), stop_workers() and
+    call() are for code outside the loop; coroutines on the loop use
+    asyncio directly.
+    """
+
+    def __init__(self, name: str = 'rfid-runtime', blocking_workers: int = BLOCKING_WORKERS):
+        self.name = name
+        self.blocking_workers = blocking_workers
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._workers: Set[Worker] = set()   # running workers
+        self.restarts = 0
+        self.errors: Dict[str, str] = {}      # last error per worker name
+
+    # ----- loop thread -----
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            started = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(started,), name=self.name, daemon=True)
+            self._thread.start()
+        started.wait(START_TIMEOUT)
+
+    def _run(self, started: threading.Event):
+        loop = asyncio.new_event_loop()
+        loop.set_default_executor(ThreadPoolExecutor(self.blocking_workers, thread_name_prefix=f"{self.name}-io"))
+        asyncio.set_event_loop(loop)
+        self.loop = loop
+        loop.call_soon(started.set)
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
+
+    def shutdown(self, timeout: float = STOP_TIMEOUT):
+        """Stop every worker, then the loop and its thread pool"""
+        if self.loop is None or self._thread is None:
+            return
+        self.stop_workers(self.workers(), timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+        self.loop = None
+
+    def in_loop(self) -> bool:
+        """True when called from the loop thread itself"""
+        return self._thread is not None and threading.get_ident() == self._thread.ident
+
+    def call(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and wait for its result (not from the loop)"""
+        self.start()
+        if self.in_loop():
+            raise RuntimeError("Runtime.call() would deadlock on the loop thread; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def call_soon(self, fn: Callable, *args):
+        """Schedule ``fn(*args)`` on the loop from any thread"""
+        if self.in_loop():
+            self.loop.call_soon(fn, *args)
+        elif self.loop is not None:
+            self.loop.call_soon_threadsafe(fn, *args)
+
+    # ----- workers -----
+    def spawn(self, name: str, factory: Callable[[], Awaitable], restart: bool = True) -> Worker:
+        """Start ``factory()`` as a supervised worker named ``name``"""
+        worker = Worker(self, name)
+
+        async def start():
+            worker.task = asyncio.get_running_loop().create_task(self._supervise(worker, factory, restart),
+                                                                 name=name)
+            worker.task.add_done_callback(lambda _: self._forget(worker))
+
+        with self._lock:
+            self._workers.add(worker)
+        self.call(start())
+        return worker
+
+    def _forget(self, worker: Worker):
+        with self._lock:
+            self._workers.discard(worker)
+
+    def workers(self) -> List[Worker]:
+        with self._lock:
+            return list(self._workers)
+
+    async def _supervise(self, worker: Worker, factory: Callable[[], Awaitable], restart: bool):
+        delay = RESTART_BASE
+        while True:
+            started = time.monotonic()
+            try:
+                await factory()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                worker.last_error = self.errors[worker.name] = f"{type(e).__name__}: {e}"
+                if not restart:
+                    print(f"Worker {worker.name} failed: {worker.last_error}")
+                    return
+                if time.monotonic() - started > RESTART_RESET:
+                    delay = RESTART_BASE
+                print(f"Worker {worker.name} crashed ({worker.last_error}); restarting in {delay:.1f}s")
+                worker.restarts += 1
+                self.restarts += 1
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RESTART_MAX)
+
+    def stop_workers(self, workers: List[Worker], timeout: float = STOP_TIMEOUT):
+        """Cancel workers and wait (up to ``timeout``) until each has finished"""
+        tasks = [w.task for w in workers if w.task is not None and not w.task.done()]
+        if not tasks or self.loop is None:
+            return
+
+        async def cancel():
+            for task in tasks:
+                task.cancel()
+            await asyncio.wait(tasks, timeout=timeout)
+
+        self.call(cancel())
+
+    def stats(self) -> dict:
+        workers = self.workers()
+        return {
+            'workers': sorted(w.name for w in workers if w.running),
+            'restarts': self.restarts,
+            'errors': dict(self.errors),
+            'threads': threading.active_count(),
+        }
+
+
+# Process-wide runtime every component schedules its workers on
+RUNTIME = Runtime()
+
+
+# ----------- Bounded Buffer ------------
+class BoundedBuffer:
+    """FIFO with a size bound, filled from any thread and drained on the runtime loop.
+
+    A thread calling put() while the buffer is full waits up to
+    ``timeout`` for room; coroutines use put_async(), which waits without
+    blocking the loop, or check writable() first. get() suspends the
+    consumer until an item arrives, so an idle consumer costs nothing.
+    """
+
+    def __init__(self, maxsize: int, runtime: Runtime = RUNTIME):
+        self.maxsize = maxsize
+        self.runtime = runtime
+        self._items: Deque[Any] = collections.deque()
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._ready: Optional[asyncio.Event] = None      # set when an item arrives for a waiting consumer
+        self._consumer_waiting = False
+        self._space: Optional[asyncio.Event] = None      # set when room frees up for waiting coroutines
+
+    # ----- producers -----
+    def put(self, item, timeout: Optional[float] = 0.0, force: bool = False) -> bool:
+        """Append ``item``; False if the buffer stayed full.
+
+        A thread waits up to ``timeout`` seconds for room (None: as long as
+        it takes); the loop thread never waits. ``force`` appends even when
+        full, for producers that already waited in wait_writable().
+        """
+        with self._not_full:
+            if len(self._items) >= self.maxsize and not force:
+                if timeout == 0 or self.runtime.in_loop():
+                    return False
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while len(self._items) >= self.maxsize:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._not_full.wait(remaining)
+            self._items.append(item)
+            wake = self._consumer_waiting
+            self._consumer_waiting = False
+        if wake:
+            self.runtime.call_soon(self._ready.set)
+        return True
+
+    async def put_async(self, item, timeout: Optional[float] = None) -> bool:
+        """put() for coroutines on the loop: waits for room without blocking other workers"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.put(item):
+            if self._space is None:
+                self._space = asyncio.Event()
+            self._space.clear()
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._space.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    def writable(self) -> bool:
+        return len(self._items) < self.maxsize
+
+    async def wait_writable(self):
+        """Wait until there is room (backpressure for a stage that feeds this buffer)"""
+        while len(self._items) >= self.maxsize:
+            if self._space is None:
+                self._space = asyncio.Event()
+            self._space.clear()
+            await self._space.wait()
+
+    # ----- consumer -----
+    def _freed(self, count: int = 1):
+        self._not_full.notify(count)
+        if self._space is not None:
+            self.runtime.call_soon(self._space.set)
+
+    def get_nowait(self):
+        with self._lock:
+            if not self._items:
+                raise queue.Empty
+            item = self._items.popleft()
+            self._freed()
+            return item
+
+    def get_batch(self, limit: int) -> List[Any]:
+        """Up to ``limit`` items, oldest first, without waiting"""
+        with self._lock:
+            count = min(limit, len(self._items))
+            batch = [self._items.popleft() for _ in range(count)]
+            if count:
+                self._freed(count)
+            return batch
+
+    async def wait_ready(self):
+        """Suspend until at least one item is buffered"""
+        while True:
+            with self._lock:
+                if self._items:
+                    return
+                if self._ready is None:
+                    self._ready = asyncio.Event()
+                self._ready.clear()
+                self._consumer_waiting = True
+            await self._ready.wait()
+
+    async def get(self):
+        while True:
+            await self.wait_ready()
+            try:
+                return self.get_nowait()
+            except queue.Empty:
+                continue
+
+    # ----- inspection -----
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def head(self):
+        """Oldest item, or None when empty"""
+        with self._lock:
+            return self._items[0] if self._items else None
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._freed(self.maxsize)
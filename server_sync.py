@@ -0,0 +1,180 @@
+import asyncio
+import gzip
+import json
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from event_store import EventStore, SYNC_CURSOR_KEY
+from runtime import RUNTIME, Runtime, Worker
+
+# ----------- Sync Configuration ------------
+DEFAULT_BATCH_SIZE = 500              # events per upload request
+DEFAULT_MAX_EVENTS_PER_SECOND = 2000  # catch-up rate limit after an outage
+DEFAULT_TIMEOUT = 10.0                # seconds per upload request
+IDLE_INTERVAL = 1.0                   # seconds between polls when nothing is pending
+RETRY_BASE = 2.0                      # first retry delay after a failed upload
+RETRY_MAX = 120.0                     # retry delay cap
+SOURCE_ID_KEY = 'sync_source_id'
+
+
+# ----------- Rate Limiter ------------
+class TokenBucket:
+    """Allows ``rate`` units per second with bursts up to ``capacity``"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def delay_for(self, amount: float) -> float:
+        """Take ``amount`` tokens, returning how long to wait before using them"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= amount
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+# ----------- Server Sync ------------
+class ServerSync:
+    """Uploads persisted checkpoint events to the central server.
+
+    The EventStore is the outbox: every event is already on disk, and a
+    cursor in the store's meta table records the last id the server has
+    acknowledged. Events are sent oldest first as gzip-compressed JSON
+    batches. Each event carries an idempotency key (source id + row id),
+    so a batch resent after a crash or timeout is safe to apply twice.
+    Catch-up after an outage is throttled by a token bucket so the live
+    path keeps the disk and network. Uploads run on a thread of their own,
+    so a slow server never occupies the runtime's file I/O threads.
+    """
+
+    def __init__(self, store: EventStore, url: str,
+                 is_online: Callable[[], bool] = lambda: True,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_events_per_second: float = DEFAULT_MAX_EVENTS_PER_SECOND,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 session: Optional[requests.Session] = None, runtime: Runtime = RUNTIME):
+        self.runtime = runtime
+        self.store = store
+        self.url = url
+        self.is_online = is_online
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.limiter = TokenBucket(max_events_per_second, capacity=max(max_events_per_second, batch_size))
+
+        self.source_id = store.get_meta(SOURCE_ID_KEY)
+        if self.source_id is None:
+            self.source_id = uuid.uuid4().hex
+            store.set_meta(SOURCE_ID_KEY, self.source_id)
+        self.cursor = int(store.get_meta(SYNC_CURSOR_KEY) or 0)
+
+        self.failures = 0
+        self.events_uploaded = 0
+        self.batches_uploaded = 0
+        self.last_error: Optional[str] = None
+        self._worker: Optional[Worker] = None
+        self._network: Optional[ThreadPoolExecutor] = None
+
+    # ----- upload -----
+    def _payload(self, rows: List[Dict]) -> bytes:
+        events = [
+            {
+                'idempotency_key': f"{self.source_id}-{row['id']}",
+                'ts': row['ts'],
+                'kind': row['kind'],
+                'status': row['status'],
+                'action': row['action'],
+                'epc': row['epc'],
+                'name': row['name'],
+                'reason': row['reason'],
+                'duration': row['duration'],
+                'reader': row['reader'],
+                'zone': row['zone'],
+            }
+            for row in rows
+        ]
+        body = json.dumps({'source': self.source_id, 'events': events}, separators=(',', ':'))
+        return gzip.compress(body.encode('utf-8'))
+
+    def upload_once(self) -> int:
+        """Send the next batch; returns events acknowledged (0 if none pending)"""
+        rows = self.store.read_after(self.cursor, self.batch_size)
+        if not rows:
+            return 0
+        first, last = rows[0]['id'], rows[-1]['id']
+        headers = {
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'gzip',
+            'Idempotency-Key': f"{self.source_id}-{first}-{last}",
+        }
+        response = self.session.post(self.url, data=self._payload(rows), headers=headers,
+                                     timeout=self.timeout)
+        # 409 means the server already has this batch
+        if not (200 <= response.status_code < 300 or response.status_code == 409):
+            raise requests.HTTPError(f"upload rejected with HTTP {response.status_code}")
+
+        self.cursor = last
+        self.store.set_meta(SYNC_CURSOR_KEY, str(last))
+        self.events_uploaded += len(rows)
+        self.batches_uploaded += 1
+        return len(rows)
+
+    def _retry_delay(self) -> float:
+        ceiling = min(RETRY_MAX, RETRY_BASE * (2 ** (self.failures - 1)))
+        return random.uniform(RETRY_BASE / 2, max(ceiling, RETRY_BASE / 2))
+
+    async def _loop(self):
+        while True:
+            if not self.is_online():
+                await asyncio.sleep(IDLE_INTERVAL)
+                continue
+            try:
+                sent = await asyncio.get_running_loop().run_in_executor(self._network, self.upload_once)
+                self.failures = 0
+                self.last_error = None
+            except requests.RequestException as e:
+                self.failures += 1
+                self.last_error = str(e)
+                await asyncio.sleep(self._retry_delay())
+                continue
+            if not sent:
+                await asyncio.sleep(IDLE_INTERVAL)
+            else:
+                await asyncio.sleep(self.limiter.delay_for(sent))
+
+    # ----- lifecycle -----
+    def start(self):
+        if self.running:
+            return
+        self._network = ThreadPoolExecutor(1, thread_name_prefix="server-sync")
+        self._worker = self.runtime.spawn("server-sync", self._loop)
+
+    def stop(self):
+        """Stop uploading; a batch already in flight finishes on its own (bounded by the timeout)"""
+        if self._worker is not None:
+            self._worker.stop()
+            self._worker = None
+        if self._network is not None:
+            self._network.shutdown(wait=False)
+            self._network = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and self._worker.running
+
+    def stats(self) -> dict:
+        return {
+            'backlog': max(self.store.max_id() - self.cursor, 0),
+            'events_uploaded': self.events_uploaded,
+            'batches_uploaded': self.batches_uploaded,
+            'failures': self.failures,
+            'last_error': self.last_error,
+        }
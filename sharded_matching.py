@@ -0,0 +1,225 @@
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from epc_matching import build_lookup, compare_active_with_reference, normalize_epcs
+
+# ----------- Sharding Configuration ------------
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+
+class ShardSpec(NamedTuple):
+    """Where a shard lives: sorted EPC hashes (uint64), then their int64 positions in the lookup"""
+    shm_name: str
+    count: int
+
+
+def hash_epcs(epcs: np.ndarray) -> np.ndarray:
+    """64-bit EPC hashes; pandas' hash is stable across processes, unlike hash()"""
+    return pd.util.hash_array(epcs, categorize=False)
+
+
+# ----------- Worker Side ------------
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray, np.ndarray]] = {}
+
+
+def _attach(spec: ShardSpec) -> Tuple[np.ndarray, np.ndarray]:
+    entry = _attached.get(spec.shm_name)
+    if entry is None:
+        # Pool workers share the parent's resource tracker, which unlinks the block once
+        shm = shared_memory.SharedMemory(name=spec.shm_name)
+        hashes = np.ndarray((spec.count,), dtype=np.uint64, buffer=shm.buf)
+        positions = np.ndarray((spec.count,), dtype=np.int64, buffer=shm.buf, offset=8 * spec.count)
+        entry = _attached[spec.shm_name] = (shm, hashes, positions)
+    return entry[1], entry[2]
+
+
+def _release_except(live: set):
+    for name in [n for n in _attached if n not in live]:
+        shm, hashes, positions = _attached.pop(name)
+        del hashes, positions
+        shm.close()
+
+
+def _probe(spec: ShardSpec, queries: np.ndarray) -> np.ndarray:
+    """Lookup position of the entry with each query hash in one shard (-1 if none)"""
+    hashes, positions = _attach(spec)
+    if not spec.count:
+        return np.full(len(queries), -1, dtype=np.int64)
+    # Sorted queries walk the shard in order instead of missing cache on every probe
+    order = np.argsort(queries)
+    ordered = queries[order]
+    idx = np.searchsorted(hashes, ordered)
+    np.minimum(idx, spec.count - 1, out=idx)
+    result = np.empty(len(queries), dtype=np.int64)
+    result[order] = np.where(hashes[idx] == ordered, positions[idx], -1)
+    return result
+
+
+def _match_chunk(specs: Tuple[ShardSpec, ...], raw_epcs: np.ndarray) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Normalize, hash and probe one chunk of distinct raw EPCs.
+
+    Returns the normalized EPCs, the candidate lookup position of each
+    (-1 for blanks and misses) and the seconds spent.
+    """
+    start = time.perf_counter()
+    _release_except({spec.shm_name for spec in specs})
+    epcs = normalize_epcs(pd.Series(raw_epcs, dtype=object)).to_numpy()
+    found = np.full(len(epcs), -1, dtype=np.int64)
+
+    # Blank cells never count as a match
+    candidates = np.flatnonzero(pd.notna(epcs))
+    queries = hash_epcs(epcs[candidates])
+    shard_of = queries % np.uint64(len(specs))
+    for shard, spec in enumerate(specs):
+        members = np.flatnonzero(shard_of == shard)
+        if len(members):
+            found[candidates[members]] = _probe(spec, queries[members])
+    return epcs, found, time.perf_counter() - start
+
+
+# ----------- Sharded Matcher ------------
+class ShardedMatcher:
+    """Hash-join of active EPCs against a large lookup, split across a process pool.
+
+    The lookup (see ReferenceRegistry.lookup_series) is partitioned by a
+    64-bit EPC hash into one shard per worker. Each shard is the sorted
+    hashes plus their lookup positions in its own shared memory block, so
+    workers attach to it instead of receiving a copy, and resolve their
+    share of the distinct active EPCs: each worker normalizes and hashes
+    its chunk, then binary-searches the shards. Every hit is checked
+    against the real EPC here, and the rare hash collision is re-resolved
+    exactly. Shards are rebuilt only when a different lookup object is
+    passed in.
+
+    With ``processes=False`` the same chunk work runs in this process,
+    one chunk per worker; that is the single-process baseline the
+    sharded join is measured against (see benchmarks/bench_sharded).
+
+    match_epcs has the same contract as epc_matching.match_epcs, so
+    compare() returns exactly what compare_active_with_reference does.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, processes: bool = True):
+        self.workers = max(workers, 1)
+        self.processes = processes
+        self._lock = threading.RLock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lookup: Optional[pd.Series] = None
+        self._lookup_epcs: Optional[np.ndarray] = None
+        self._specs: List[ShardSpec] = []
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self.last_stats: dict = {}
+        atexit.register(self.close)
+
+    # ----- shards -----
+    def load(self, lookup: pd.Series):
+        """Partition ``lookup`` into shared memory shards (no-op for the current lookup)"""
+        with self._lock:
+            if lookup is self._lookup:
+                return
+            epcs = lookup.index.to_numpy(dtype=object)
+            hashes = hash_epcs(epcs)
+            shard_of = hashes % np.uint64(self.workers)
+
+            specs, blocks = [], []
+            for shard in range(self.workers):
+                positions = np.flatnonzero(shard_of == shard).astype(np.int64)
+                shard_hashes = hashes[positions]
+                order = np.argsort(shard_hashes, kind='stable')
+                shard_hashes, positions = shard_hashes[order], positions[order]
+
+                count = len(positions)
+                shm = shared_memory.SharedMemory(create=True, size=max(16 * count, 1))
+                np.ndarray((count,), dtype=np.uint64, buffer=shm.buf)[:] = shard_hashes
+                np.ndarray((count,), dtype=np.int64, buffer=shm.buf, offset=8 * count)[:] = positions
+                specs.append(ShardSpec(shm.name, count))
+                blocks.append(shm)
+
+            self._release_blocks()
+            self._specs, self._blocks, self._lookup, self._lookup_epcs = specs, blocks, lookup, epcs
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that runs Streamlit and reader threads is unsafe
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    # ----- matching -----
+    def match_epcs(self, active_epcs: pd.Series, lookup: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """Drop-in for epc_matching.match_epcs, with the join done by the worker pool"""
+        with self._lock:
+            self.load(lookup)
+            return self._match(active_epcs)
+
+    def _match(self, active_epcs: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        start = time.perf_counter()
+        codes, uniques = pd.factorize(active_epcs, use_na_sentinel=True)
+        specs = tuple(self._specs)
+        chunks = [chunk for chunk in np.array_split(np.asarray(uniques, dtype=object), len(specs))
+                  if len(chunk)]
+        if self.processes:
+            pool = self._pool()
+            results = [future.result() for future in
+                       [pool.submit(_match_chunk, specs, chunk) for chunk in chunks]]
+        else:
+            results = [_match_chunk(specs, chunk) for chunk in chunks]
+
+        epcs = np.concatenate([r[0] for r in results]) if results else np.empty(0, dtype=object)
+        found = np.concatenate([r[1] for r in results]) if results else np.empty(0, dtype=np.int64)
+        busy = sum(r[2] for r in results)
+
+        # A hash hit is only a candidate; confirm it, and look collisions up exactly
+        hit = np.flatnonzero(found >= 0)
+        wrong = hit[self._lookup_epcs[found[hit]] != epcs[hit]]
+        if len(wrong):
+            found[wrong] = self._lookup.index.get_indexer(epcs[wrong])
+
+        positions = np.where(codes >= 0, found[codes], -1) if len(found) else np.full(len(codes), -1)
+        matched = positions >= 0
+        wall = time.perf_counter() - start
+        self.last_stats = {
+            'workers': len(specs),
+            'processes': self.processes,
+            'distinct_epcs': len(uniques),
+            'collisions': len(wrong),
+            'wall_seconds': wall,
+            'worker_seconds': busy,
+            # Share of the call's wall time x workers spent in chunk work
+            'pool_busy': busy / (wall * len(specs)) if wall and specs else 0.0,
+        }
+        return matched, positions[matched]
+
+    def compare(self, active_df: pd.DataFrame, reference_df: pd.DataFrame,
+                lookup: Optional[pd.Series] = None):
+        """Same arguments and (result_df, matched_names, matched_epcs) as compare_active_with_reference"""
+        if lookup is None:
+            lookup = build_lookup(reference_df)
+        return compare_active_with_reference(active_df, reference_df, lookup=lookup, match=self.match_epcs)
+
+    # ----- lifecycle -----
+    def _release_blocks(self):
+        for shm in self._blocks:
+            shm.close()
+            shm.unlink()
+        self._blocks = []
+        self._specs = []
+        self._lookup = None
+        self._lookup_epcs = None
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+            if not self.processes:
+                _release_except(set())
+            self._release_blocks()
@@ -0,0 +1,26 @@
+import pytest
+
+from tests.support import make_engine, write_people
+
+
+@pytest.fixture
+def people_csv(tmp_path):
+    path = tmp_path / 'reference.csv'
+    write_people(path)
+    return path
+
+
+@pytest.fixture
+def engine_factory(people_csv):
+    """Builds engines over the test registry and stops them after the test"""
+    built = []
+
+    def build(**kwargs):
+        engine, backend = make_engine(people_csv, **kwargs)
+        built.append(engine)
+        return engine, backend
+
+    yield build
+    for engine in built:
+        engine.stop()
+        engine.announcer.stop()
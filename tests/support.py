@@ -0,0 +1,56 @@
+import time
+
+from announcer import Announcer, StubBackend
+from checkpoint_engine import CheckpointEngine
+from readers import ReaderConfig, ReaderManager
+from reference_registry import ReferenceRegistry
+from zones import OUTSIDE, Door, ZoneGraph, ZoneOccupancy
+
+PEOPLE = {
+    'E2000001': 'Ada',
+    'E2000002': 'Grace',
+    'E2000003': 'Linus',
+}
+DOOR = 'lab-main'
+READER = 'lab-main-reader'
+
+
+def wait_until(condition, timeout=5.0, interval=0.01):
+    """Poll ``condition`` until it is truthy; fails the test on timeout"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        value = condition()
+        if value:
+            return value
+        time.sleep(interval)
+    raise AssertionError("condition not met within %.1f s" % timeout)
+
+
+def write_people(path, people=PEOPLE):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write("EPC,Name\n")
+        f.writelines(f"{epc},{name}\n" for epc, name in people.items())
+
+
+def make_engine(csv_path, store=None, policy=None):
+    """Engine with one door into the lab, a stub announcer and no live reader feeds"""
+    registry = ReferenceRegistry(str(csv_path))
+    registry.refresh()
+    backend = StubBackend()
+    engine = CheckpointEngine(
+        registry,
+        announcer=Announcer(backend),
+        readers=ReaderManager([ReaderConfig(READER, door=DOOR)]),
+        zones=ZoneOccupancy(ZoneGraph([Door(DOOR, OUTSIDE, 'lab')])),
+        store=store,
+        policy=policy,
+    )
+    engine.start()
+    return engine, backend
+
+
+def scan(engine, epc):
+    """Submit one scan and wait for its decision"""
+    previous = engine.snapshot().last_scan
+    engine.submit(epc, READER)
+    return wait_until(lambda: engine.snapshot().last_scan is not previous and engine.snapshot().last_scan)
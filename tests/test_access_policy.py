@@ -0,0 +1,18 @@
+import time
+
+import pytest
+
+from access_policy import EXPIRED, AccessPolicy
+
+
+@pytest.mark.parametrize('listed, scanned', [('e2000002', 'E2000002'), ('E2000002', 'e2000002'),
+                                             ('E2-00-00-02', 'e2:00:00:02')])
+def test_expired_badge_is_refused_whatever_its_case(listed, scanned):
+    policy = AccessPolicy()
+    policy.load({
+        'default_role': 'staff',
+        'roles': {'staff': {}},
+        'badges': {listed: {'role': 'staff', 'expires': '2000-01-01'}},
+    })
+    assert policy.check(scanned, 'ENTRY', time.time(), False) == EXPIRED
+    assert policy.check('E2000001', 'ENTRY', time.time(), False) is None
@@ -0,0 +1,64 @@
+import random
+from collections import Counter
+
+from access_stats import AccessStats, RollingCounter, SpaceSaving
+
+
+def test_top_k_counts_stay_within_the_error_bound_after_eviction():
+    rng = random.Random(7)
+    # A few heavy users in a long tail of visitors seen once or twice
+    stream = [f"heavy {i}" for i in range(5) for _ in range(200 - 30 * i)]
+    stream += [f"visitor {rng.randrange(3000)}" for _ in range(4000)]
+    rng.shuffle(stream)
+
+    summary = SpaceSaving(capacity=50)
+    for name in stream:
+        summary.add(name)
+    true = Counter(stream)
+
+    assert len(summary._counts) == 50
+    assert max(summary._errors.values()) > 0  # the tail did evict
+    for name, count in summary._counts.items():
+        error = summary._errors[name]
+        assert count - error <= true[name] <= count
+        assert error <= len(stream) // 50
+    assert [name for name, _ in summary.top(5)] == [f"heavy {i}" for i in range(5)]
+
+
+def test_top_k_is_exact_until_full():
+    summary = SpaceSaving(capacity=3)
+    for name in ["Ada", "Grace", "Ada", "Linus", "Ada", "Grace"]:
+        summary.add(name)
+    assert summary.top(3) == [("Ada", 3), ("Grace", 2), ("Linus", 1)]
+    summary.add("Edsger")  # replaces Linus, the only key at the minimum
+    assert summary.top(3) == [("Ada", 3), ("Edsger", 2), ("Grace", 2)]
+    assert summary._errors["Edsger"] == 1
+
+
+def test_window_expires_slot_by_slot_as_the_clock_advances():
+    counter = RollingCounter(bucket_seconds=10, num_buckets=6)  # the last minute
+    for t in (0, 5, 12, 25, 25, 41):
+        counter.add(t)
+    assert counter.total(59) == 6
+    assert counter.total(60) == 4   # the [0, 10) slot left the window
+    assert counter.total(79) == 3   # and [10, 20)
+    assert counter.total(95) == 1   # and [20, 30), [30, 40)
+    assert counter.total(50) == 1   # an earlier clock reading brings nothing back
+    counter.add(100)
+    assert counter.total(100) == 1  # 41 left with the [40, 50) slot
+    assert counter.total(1000) == 0  # many windows later, every slot is cleared once
+    counter.add(1001)
+    assert counter.total(1001) == 1
+
+
+def test_snapshot_windows_use_the_given_clock():
+    stats = AccessStats()
+    stats.record({'status': 'GRANTED', 'name': 'Ada'}, now=1000.0)
+    stats.record({'status': 'DENIED', 'name': None}, now=1030.0)
+
+    windows = stats.snapshot(now=1059.0)['windows']
+    assert windows['minute'] == {'total': 2, 'granted': 1, 'denied': 1}
+    windows = stats.snapshot(now=1080.0)['windows']
+    assert windows['minute'] == {'total': 1, 'granted': 0, 'denied': 1}
+    assert windows['hour'] == {'total': 2, 'granted': 1, 'denied': 1}
+    assert stats.snapshot(now=1000.0 + 25 * 3600)['windows']['day']['total'] == 0
@@ -0,0 +1,159 @@
+import time
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from analytics import Analytics, LocalCalendar
+from event_store import EventStore
+
+
+@pytest.fixture(autouse=True)
+def new_york(monkeypatch):
+    """Local time with DST: 2024-03-10 has 23 hours and 2024-11-03 has 25"""
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(str(tmp_path / 'events.db'), retention_days=100_000)
+    yield store
+    store.close()
+
+
+def local(*args):
+    return time.mktime(datetime(*args).timetuple())
+
+
+def load(store, events):
+    for ts, kind, event in events:
+        store.append(kind, event, ts=ts)
+    assert store.flush(timeout=5)
+
+
+def entry(ts, epc, name):
+    return ts, 'occupancy', {'action': 'ENTRY', 'epc': epc, 'name': name}
+
+
+def exit_(ts, epc, name, duration=None):
+    return ts, 'occupancy', {'action': 'EXIT', 'epc': epc, 'name': name, 'duration': duration}
+
+
+def grant(ts, epc, name):
+    return ts, 'access', {'status': 'GRANTED', 'card_id': epc, 'name': name}
+
+
+def overnight():
+    """Ada stays from 22:00 to 01:00, Grace comes in at 23:30 and is still inside"""
+    return [
+        grant(local(2024, 1, 10, 22), 'E1', 'Ada'),
+        entry(local(2024, 1, 10, 22), 'E1', 'Ada'),
+        grant(local(2024, 1, 10, 23, 30), 'E2', 'Grace'),
+        entry(local(2024, 1, 10, 23, 30), 'E2', 'Grace'),
+        entry(local(2024, 1, 10, 23, 45), 'E2', 'Grace'),  # a repeated entry is not a new visit
+        (local(2024, 1, 11, 0, 30), 'access', {'status': 'DENIED', 'card_id': 'E9'}),
+        exit_(local(2024, 1, 11, 1), 'E1', 'Ada'),
+    ]
+
+
+def test_an_open_stay_across_midnight(store):
+    load(store, overnight())
+    analytics = Analytics(store)
+    assert analytics.update() == len(overnight())
+
+    days = analytics.traffic(local(2024, 1, 10), local(2024, 1, 12), 'day')
+    assert list(days.index) == [pd.Timestamp('2024-01-10'), pd.Timestamp('2024-01-11')]
+    assert days[['granted', 'denied', 'entries', 'exits', 'peak', 'level']].values.tolist() == [
+        [2, 0, 2, 0, 2, 2],
+        [0, 1, 0, 1, 2, 1],
+    ]
+
+    hours = analytics.occupancy(local(2024, 1, 10, 20), local(2024, 1, 11, 3))
+    assert list(hours.index.hour) == [20, 21, 22, 23, 0, 1, 2]
+    assert hours['peak'].tolist() == [0, 0, 1, 2, 2, 2, 1]
+    assert hours['level'].tolist() == [0, 0, 1, 2, 2, 1, 1]
+
+    # The stay counts towards the day of its exit, and Grace's is not over
+    assert analytics.dwell_summary(local(2024, 1, 10), local(2024, 1, 11))['stays'] == 0
+    summary = analytics.dwell_summary(local(2024, 1, 11), local(2024, 1, 12))
+    assert summary == {'stays': 1, 'mean_seconds': 3 * 3600.0,
+                       'p50_seconds': 4 * 3600.0, 'p90_seconds': 4 * 3600.0}
+    assert analytics.dwell_distribution(local(2024, 1, 11), local(2024, 1, 12)).loc['2-4h', 'stays'] == 1
+
+    people = analytics.attendance(local(2024, 1, 10), local(2024, 1, 12)).set_index('name')
+    assert people.loc['Ada', ['days', 'visits', 'hours']].tolist() == [2, 1, 3.0]
+    assert people.loc['Grace', ['days', 'visits', 'hours']].tolist() == [1, 1, 0.0]
+    assert analytics.stats()['present'] == 1
+
+
+def test_folding_in_chunks_and_after_a_restart_matches_one_pass(store, tmp_path):
+    load(store, overnight())
+    whole = Analytics(store)
+    whole.update()
+    expected = whole.traffic(local(2024, 1, 10), local(2024, 1, 12), 'hour')
+
+    other = EventStore(str(tmp_path / 'other.db'), retention_days=100_000)
+    try:
+        load(other, overnight())
+        first = Analytics(other, chunk=2)
+        assert first.update(max_chunks=1) == 2
+        restarted = Analytics(other, chunk=2)  # resumes from the cursor and the people inside
+        assert restarted.cursor == 2 and restarted.stats()['present'] == 1
+        assert restarted.update() == len(overnight()) - 2
+        assert restarted.update() == 0
+        pd.testing.assert_frame_equal(restarted.traffic(local(2024, 1, 10), local(2024, 1, 12), 'hour'),
+                                      expected)
+    finally:
+        other.close()
+
+
+@pytest.mark.parametrize('day, hours', [((2024, 3, 10), 23), ((2024, 11, 3), 25), ((2024, 1, 10), 24)])
+def test_days_start_at_local_midnight_across_dst(day, hours):
+    calendar = LocalCalendar()
+    start = local(*day)
+    days = calendar.starts(start - 86400, start + 2 * 86400, 86400)
+    assert days[1] == start
+    assert days[2] - days[1] == hours * 3600
+    assert len(calendar.starts(start, days[2], 3600)) == hours
+
+    late = days[2] - 60  # 23:59 local, whatever the length of the day
+    assert calendar.buckets(late) == (int(late), days[2] - 3600, start)
+    assert calendar.day(days[2]) == days[2]
+
+
+def test_a_stay_over_the_spring_forward_night(store):
+    load(store, [entry(local(2024, 3, 9, 23), 'E1', 'Ada'),
+                 exit_(local(2024, 3, 10, 4), 'E1', 'Ada')])  # 4 hours: 02:00 never happened
+    analytics = Analytics(store)
+    analytics.update()
+
+    hours = analytics.occupancy(local(2024, 3, 9, 22), local(2024, 3, 10, 5))
+    assert list(hours.index.hour) == [22, 23, 0, 1, 3, 4]
+    assert hours['level'].tolist() == [0, 1, 1, 1, 1, 0]
+    summary = analytics.dwell_summary(local(2024, 3, 10), local(2024, 3, 11))
+    assert summary['stays'] == 1 and summary['mean_seconds'] == 4 * 3600.0
+
+
+def test_empty_and_future_ranges(store):
+    load(store, overnight())
+    analytics = Analytics(store)
+    analytics.update()
+    now = time.time()
+
+    future = analytics.occupancy(now + 86400, now + 2 * 86400)
+    assert future.empty and list(future.columns) == ['peak', 'level']
+    assert analytics.traffic(now + 86400, now + 2 * 86400).empty
+    assert analytics.attendance(now + 86400, now + 2 * 86400).empty
+
+    # Quiet days after the last event still hold Grace, who never left
+    quiet = analytics.occupancy(local(2024, 1, 20), local(2024, 1, 22), 'day')
+    assert quiet.values.tolist() == [[1, 1], [1, 1]]
+
+    empty = analytics.dwell_summary(local(2024, 2, 1), local(2024, 3, 1))
+    assert empty == {'stays': 0, 'mean_seconds': None, 'p50_seconds': None, 'p90_seconds': None}
+    distribution = analytics.dwell_distribution(local(2024, 2, 1), local(2024, 3, 1))
+    assert distribution['stays'].sum() == 0 and distribution['share'].sum() == 0
@@ -0,0 +1,78 @@
+import pytest
+
+from announcer import LOW, NORMAL, URGENT, Announcer, StubBackend
+from tests.support import wait_until
+
+
+@pytest.fixture
+def make_announcer():
+    announcers = []
+
+    def build(**kwargs):
+        backend = StubBackend(kwargs.pop('delay', 0.0))
+        announcer = Announcer(backend, **kwargs)
+        announcers.append(announcer)
+        return announcer, backend
+
+    yield build
+    for announcer in announcers:
+        announcer.stop()
+
+
+def test_grants_close_together_are_one_sentence(make_announcer):
+    announcer, backend = make_announcer()
+    for name in ('Ada', 'Grace', 'Linus'):
+        announcer.announce_grant(name)
+    wait_until(lambda: announcer.counters['spoken'] == 1)
+    assert backend.spoken == ["Access granted to Ada, Grace, and Linus. Welcome to the Lab"]
+    assert announcer.counters['coalesced'] == 2
+
+
+def test_grants_further_apart_are_spoken_separately(make_announcer):
+    announcer, backend = make_announcer(coalesce_window=0.05)
+    announcer.announce_grant('Ada')
+    wait_until(lambda: announcer.counters['spoken'] == 1)
+    announcer.announce_grant('Grace')
+    wait_until(lambda: announcer.counters['spoken'] == 2)
+    assert backend.spoken == ["Access granted to Ada. Welcome to the Lab",
+                              "Access granted to Grace. Welcome to the Lab"]
+
+
+def test_stale_announcements_are_skipped(make_announcer):
+    announcer, backend = make_announcer(delay=0.3, max_age=0.1)
+    announcer.say("first")
+    announcer.say("second")
+    wait_until(lambda: announcer.counters['dropped_stale'] == 1)
+    assert announcer.wait_idle()
+    wait_until(lambda: announcer.counters['spoken'] == 1)
+    assert backend.spoken == ["first"]
+
+
+def test_full_queue_evicts_the_oldest_least_urgent(make_announcer):
+    announcer, backend = make_announcer(delay=0.2, max_pending=3)
+    announcer.say("busy")
+    wait_until(lambda: announcer.stats()['pending'] == 0)  # the worker is speaking
+
+    announcer.say("low 1", LOW)
+    announcer.say("low 2", LOW)
+    announcer.say("normal", NORMAL)
+    announcer.say("urgent", URGENT)  # evicts low 1
+    announcer.say("low 3", LOW)      # a tie: evicts low 2, the older one
+    assert announcer.counters['dropped_full'] == 2
+
+    wait_until(lambda: announcer.counters['spoken'] == 4)
+    assert backend.spoken == ["busy", "urgent", "normal", "low 3"]
+
+
+def test_full_queue_drops_an_item_less_urgent_than_everything(make_announcer):
+    announcer, backend = make_announcer(delay=0.2, max_pending=2)
+    announcer.say("busy")
+    wait_until(lambda: announcer.stats()['pending'] == 0)
+
+    announcer.say("normal 1", NORMAL)
+    announcer.say("normal 2", NORMAL)
+    announcer.say("low", LOW)
+    assert announcer.counters['dropped_full'] == 1
+
+    wait_until(lambda: announcer.counters['spoken'] == 3)
+    assert backend.spoken == ["busy", "normal 1", "normal 2"]
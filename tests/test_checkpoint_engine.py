@@ -0,0 +1,115 @@
+from access_policy import EXPIRED, AccessPolicy
+from event_store import EventStore
+from tests.support import PEOPLE, READER, scan, wait_until
+
+
+def test_bulk_grant_places_badges_in_the_lab(engine_factory):
+    engine, _ = engine_factory()
+    engine.log_bulk_access(['Ada'], ['E2000001'])
+    assert engine.snapshot().zone_counts == {'lab': 1}
+
+    # The next read at the same door is the way out, not a second entry
+    result = scan(engine, 'E2000001')
+    assert result['action'] == 'EXIT'
+    assert [entry['action'] for entry in engine.tracker.entry_exit_log] == ['ENTRY', 'EXIT']
+    assert engine.snapshot().zone_counts == {'lab': 0}
+
+
+def test_bulk_grant_applies_the_access_policy(engine_factory):
+    policy = AccessPolicy()
+    policy.load({
+        'default_role': 'staff',
+        'roles': {'staff': {}},
+        'badges': {'E2000002': {'role': 'staff', 'expires': '2000-01-01'}},
+    })
+    engine, _ = engine_factory(policy=policy)
+
+    granted = engine.log_bulk_access(['Ada', 'Grace'], ['E2000001', 'E2000002'])
+
+    assert granted == ['Ada']
+    logs = {entry['card_id']: entry for entry in engine.snapshot().access_logs}
+    assert logs['E2000001']['status'] == 'GRANTED'
+    assert logs['E2000002']['status'] == 'DENIED'
+    assert logs['E2000002']['reason'] == EXPIRED
+    assert not engine.tracker.is_present('E2000002')
+    assert engine.snapshot().zone_counts == {'lab': 1}
+
+
+def test_scan_enters_then_exits_and_is_announced(engine_factory):
+    engine, backend = engine_factory()
+
+    entry = scan(engine, 'E2000001')
+    assert (entry['status'], entry['action'], entry['name']) == ('GRANTED', 'ENTRY', 'Ada')
+    assert [o.epc for o in engine.snapshot().occupants] == ['E2000001']
+    assert engine.snapshot().zone_counts == {'lab': 1}
+    wait_until(lambda: backend.spoken)
+    assert backend.spoken == ["Access granted to Ada. Welcome to the Lab"]
+
+    exit_ = scan(engine, 'E2000001')
+    assert (exit_['status'], exit_['action']) == ('GRANTED', 'EXIT')
+    assert engine.snapshot().occupants == ()
+
+    unknown = scan(engine, 'E2FFFFFF')
+    assert (unknown['status'], unknown['reason']) == ('DENIED', 'User not found')
+    assert [entry['status'] for entry in engine.snapshot().access_logs] == ['GRANTED', 'GRANTED', 'DENIED']
+
+
+def test_bulk_log_then_force_exit_empties_the_lab(engine_factory):
+    engine, _ = engine_factory()
+    granted = engine.log_bulk_access(list(PEOPLE.values()), list(PEOPLE))
+    assert granted == list(PEOPLE.values())
+    assert {o.epc for o in engine.snapshot().occupants} == set(PEOPLE)
+    assert engine.snapshot().zone_counts == {'lab': 3}
+
+    engine.force_exit_all()
+    assert engine.snapshot().occupants == ()
+    assert engine.snapshot().zone_counts == {'lab': 0}
+    assert [entry['action'] for entry in engine.tracker.entry_exit_log].count('EXIT') == 3
+
+    # Everyone was forced out, so the next read is an entry again
+    assert scan(engine, 'E2000002')['action'] == 'ENTRY'
+
+
+def test_restart_restores_occupancy_from_the_event_store(tmp_path, engine_factory):
+    store = EventStore(str(tmp_path / 'events.db'))
+    try:
+        engine, _ = engine_factory(store=store)
+        scan(engine, 'E2000001')
+        scan(engine, 'E2000002')
+        scan(engine, 'E2000002')  # Grace leaves again
+        engine.log_bulk_access(['Linus'], ['E2000003'])
+        engine.stop()
+        assert store.flush(timeout=5)
+
+        restarted, _ = engine_factory(store=store)
+        assert [o.epc for o in restarted.snapshot().occupants] == ['E2000001', 'E2000003']
+        assert restarted.snapshot().zone_counts == {'lab': 2}
+        assert scan(restarted, 'E2000001')['action'] == 'EXIT'
+        assert scan(restarted, 'E2000002')['action'] == 'ENTRY'
+
+        restarted.force_exit_all()
+        restarted.stop()
+        assert store.flush(timeout=5)
+        assert engine_factory(store=store)[0].snapshot().occupants == ()
+    finally:
+        store.close()
+
+
+def test_spellings_of_one_badge_are_one_occupant(engine_factory):
+    engine, _ = engine_factory()
+    assert scan(engine, 'e2000001')['action'] == 'ENTRY'
+    assert [o.epc for o in engine.snapshot().occupants] == ['E2000001']
+
+    exit_ = scan(engine, 'E2-00-00-01')
+    assert (exit_['action'], exit_['card_id']) == ('EXIT', 'E2000001')
+    assert engine.snapshot().occupants == ()
+    assert engine.snapshot().zone_counts == {'lab': 0}
+
+    engine.log_bulk_access(['Ada'], ['e2000001'])
+    assert scan(engine, 'E2000001')['action'] == 'EXIT'
+
+
+def test_raw_reads_are_deduplicated_across_spellings(engine_factory):
+    engine, _ = engine_factory()
+    assert engine.submit_read('e2000001', reader_id=READER)
+    assert not engine.submit_read('E2000001', reader_id=READER)
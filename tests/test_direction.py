@@ -0,0 +1,61 @@
+import pytest
+
+from direction import Crossing, DirectionInferrer
+from zones import IN, OUT
+
+OUTER, INNER = 1, 2
+
+
+@pytest.fixture
+def inferrer():
+    return DirectionInferrer(OUTER, INNER, window=3.0, refractory=2.0, confirm_reads=2)
+
+
+def feed(inferrer, reads, epc='E1'):
+    """Crossings completed by (time, antenna) reads"""
+    return [c for c in (inferrer.observe(epc, antenna, now=t) for t, antenna in reads) if c is not None]
+
+
+def test_outer_then_inner_is_in(inferrer):
+    assert feed(inferrer, [(0.0, OUTER), (0.1, OUTER), (1.0, INNER), (1.1, INNER)]) == [
+        Crossing('E1', IN, 0.1, 1.1)]
+
+
+def test_inner_then_outer_is_out(inferrer):
+    assert feed(inferrer, [(0.0, INNER), (0.1, INNER), (1.0, OUTER), (1.1, OUTER)]) == [
+        Crossing('E1', OUT, 0.1, 1.1)]
+
+
+def test_a_gap_longer_than_the_window_is_a_fresh_approach(inferrer):
+    # Seen outside, then inside 5 s later: not a crossing, but inside is now the tag's side
+    assert feed(inferrer, [(0.0, OUTER), (0.1, OUTER), (5.0, INNER), (5.1, INNER)]) == []
+    assert feed(inferrer, [(6.0, OUTER), (6.1, OUTER)]) == [Crossing('E1', OUT, 5.1, 6.1)]
+    assert inferrer.crossings == 1
+
+
+def test_a_stray_read_on_the_other_antenna_is_not_a_crossing(inferrer):
+    reads = [(0.0, OUTER), (0.1, OUTER), (0.5, INNER), (0.6, OUTER), (1.0, INNER), (1.2, OUTER)]
+    assert feed(inferrer, reads) == []
+
+
+def test_crossing_back_within_the_refractory_period_is_a_flap(inferrer):
+    assert len(feed(inferrer, [(0.0, OUTER), (0.1, OUTER), (1.0, INNER), (1.1, INNER)])) == 1
+    assert feed(inferrer, [(1.5, OUTER), (1.6, OUTER)]) == []
+    assert inferrer.suppressed_flaps == 1
+    assert feed(inferrer, [(3.5, INNER), (4.0, OUTER), (4.1, OUTER)]) == [Crossing('E1', OUT, 3.5, 4.1)]
+
+
+def test_tags_and_unpaired_antennas_are_kept_apart(inferrer):
+    inferrer.observe('E1', OUTER, now=0.0)
+    inferrer.observe('E2', INNER, now=0.05)
+    inferrer.observe('E1', OUTER, now=0.1)
+    inferrer.observe('E2', INNER, now=0.15)
+    assert inferrer.observe('E1', 3, now=0.5) is None
+    assert feed(inferrer, [(1.0, INNER), (1.1, INNER)], epc='E1') == [Crossing('E1', IN, 0.1, 1.1)]
+    assert feed(inferrer, [(1.0, OUTER), (1.1, OUTER)], epc='E2') == [Crossing('E2', OUT, 0.15, 1.1)]
+    assert inferrer.reads_ignored == 1
+
+
+def test_paired_antennas_must_differ():
+    with pytest.raises(ValueError):
+        DirectionInferrer(OUTER, OUTER)
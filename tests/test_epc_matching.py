@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_matching import legacy_compare, make_active, make_reference
+from epc_matching import MATCHED_LABEL, NOT_FOUND_LABEL, build_lookup, compare_active_with_reference
+
+REFERENCE = pd.DataFrame({'EPC': ['E2000001', 'E2000002', 'E2000001', None, np.nan],
+                          'Name': ['Ada', 'Grace', 'Duplicate', None, None]}, dtype=object)
+
+
+def statuses(result_df):
+    return result_df['status'].astype(str).tolist()
+
+
+def test_canonical_input_matches_the_row_by_row_version():
+    reference_df = make_reference(500)
+    active_df = make_active(2_000, 500)  # repeated reads and unknown tags
+    result_df, names, epcs = compare_active_with_reference(active_df, reference_df)
+    legacy_df, legacy_names, legacy_epcs = legacy_compare(active_df, reference_df)
+
+    assert statuses(result_df) == legacy_df['status'].tolist()
+    assert names == legacy_names
+    assert epcs == legacy_epcs
+    assert list(result_df.columns) == ['EPC', 'status']
+
+
+def test_duplicate_active_rows_are_each_labelled_and_listed():
+    active_df = pd.DataFrame({'EPC': ['E2000002', 'E2000001', 'E2000002', 'E2000002']})
+    result_df, names, epcs = compare_active_with_reference(active_df, REFERENCE)
+    assert statuses(result_df) == [MATCHED_LABEL] * 4
+    assert names == ['Grace', 'Ada', 'Grace', 'Grace']  # the first registry row for E2000001 wins
+    assert epcs == ['E2000002', 'E2000001', 'E2000002', 'E2000002']
+    assert (names, epcs) == legacy_compare(active_df, REFERENCE)[1:]
+
+
+@pytest.mark.parametrize('blank', [None, np.nan, '', '   '])
+def test_blank_epcs_never_match_even_against_blank_registry_rows(blank):
+    active_df = pd.DataFrame({'EPC': [blank, 'E2000001', blank]}, dtype=object)
+    result_df, names, epcs = compare_active_with_reference(active_df, REFERENCE)
+    assert statuses(result_df) == [NOT_FOUND_LABEL, MATCHED_LABEL, NOT_FOUND_LABEL]
+    assert names == ['Ada'] and epcs == ['E2000001']
+
+
+@pytest.mark.parametrize('raw', [' E2000002 ', 'e2000002', 'e2-00:0002', '0xE2 000002'])
+def test_whitespace_case_and_separators_are_normalized(raw):
+    active_df = pd.DataFrame({'EPC': [raw]})
+    result_df, names, epcs = compare_active_with_reference(active_df, REFERENCE)
+    assert statuses(result_df) == [MATCHED_LABEL]
+    assert names == ['Grace'] and epcs == ['E2000002']  # the registry's spelling
+    assert result_df['EPC'].tolist() == [raw]  # the active rows are left as read
+
+
+@pytest.mark.parametrize('reference_df', [
+    pd.DataFrame(),
+    pd.DataFrame({'EPC': [], 'Name': []}, dtype=object),
+    pd.DataFrame({'EPC': [None, ''], 'Name': [None, None]}, dtype=object),
+    pd.DataFrame({'Tag': ['E2000001'], 'Name': ['Ada']}),
+], ids=['no columns', 'no rows', 'blank rows', 'no EPC column'])
+def test_an_empty_reference_matches_nothing(reference_df):
+    active_df = pd.DataFrame({'EPC': ['E2000001', None]}, dtype=object)
+    assert build_lookup(reference_df).empty
+    result_df, names, epcs = compare_active_with_reference(active_df, reference_df)
+    assert statuses(result_df) == [NOT_FOUND_LABEL] * 2
+    assert names == [] and epcs == []
+
+
+def test_an_empty_active_table_gets_a_status_column():
+    result_df, names, epcs = compare_active_with_reference(pd.DataFrame({'EPC': []}, dtype=object), REFERENCE)
+    assert result_df.empty and 'status' in result_df.columns
+    assert names == [] and epcs == []
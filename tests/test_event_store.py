@@ -0,0 +1,118 @@
+import sqlite3
+import threading
+
+import pytest
+
+import event_store
+from event_store import EventStore
+from tests.support import PEOPLE
+
+
+class FlakyConnection:
+    """Wraps the writer connection; executemany fails while ``failing`` is set"""
+
+    def __init__(self, conn, failures=0):
+        self._conn = conn
+        self.failures = failures
+        self.failing = threading.Event()
+
+    def executemany(self, sql, rows):
+        if self.failing.is_set():
+            raise sqlite3.OperationalError("database is locked")
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return self._conn.executemany(sql, rows)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(event_store, 'COMMIT_RETRY_BASE', 0.01)
+    monkeypatch.setattr(event_store, 'COMMIT_RETRY_MAX', 0.05)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(str(tmp_path / 'events.db'))
+    yield store
+    store._writer_conn = getattr(store._writer_conn, '_conn', store._writer_conn)
+    store.close(timeout=5)
+
+
+def test_failed_commits_are_retried_not_dropped(store):
+    store._writer_conn = FlakyConnection(store._writer_conn, failures=2)
+    for i in range(10):
+        store.append('access', {'status': 'GRANTED', 'card_id': f"E{i}"})
+    assert store.flush(timeout=5)
+    assert store.count() == 10
+    assert store.stats()['commit_errors'] == 2
+    assert store.stats()['last_error'] is None
+
+
+def test_flush_reports_rows_not_yet_on_disk(store):
+    flaky = store._writer_conn = FlakyConnection(store._writer_conn)
+    flaky.failing.set()
+    store.append('access', {'status': 'GRANTED', 'card_id': 'E1'})
+    assert not store.flush(timeout=0.3)
+    assert store.count() == 0
+    assert store.stats()['last_error'] == "database is locked"
+
+    flaky.failing.clear()
+    assert store.flush(timeout=5)
+    assert store.count() == 1
+
+
+def test_engine_commands_do_not_wait_on_a_full_buffer(tmp_path, monkeypatch, engine_factory):
+    monkeypatch.setattr(event_store, 'MAX_PENDING', 2)
+    store = EventStore(str(tmp_path / 'events.db'))
+    flaky = store._writer_conn = FlakyConnection(store._writer_conn)
+    flaky.failing.set()
+    engine, _ = engine_factory(store=store)
+
+    # Three grants and three entries: past the bound while nothing drains
+    done = threading.Thread(target=engine.log_bulk_access, args=(list(PEOPLE.values()), list(PEOPLE)),
+                            daemon=True)
+    done.start()
+    done.join(timeout=2)
+    assert not done.is_alive()
+
+    flaky.failing.clear()
+    assert store.flush(timeout=5)
+    assert store.count() == 6
+    engine.stop()
+    store._writer_conn = flaky._conn
+    store.close()
+
+
+@pytest.mark.parametrize('bad', [
+    {'kind': None},                                         # NOT NULL: IntegrityError
+    {'event': {'status': 'GRANTED', 'name': {'first': 'Ada'}}},  # unbindable value
+])
+def test_a_bad_event_is_set_aside_and_the_rest_written(store, bad):
+    for i in range(5):
+        store.append('access', {'status': 'GRANTED', 'card_id': f"E{i}"})
+    store.append(bad.get('kind', 'access'), bad.get('event', {'status': 'GRANTED'}))
+    for i in range(5, 10):
+        store.append('access', {'status': 'GRANTED', 'card_id': f"E{i}"})
+    assert store.flush(timeout=5)
+
+    assert store.count() == 10
+    assert store.stats()['events_rejected'] == 1
+    assert store.stats()['events_written'] == 10
+    assert store.stats()['last_error'] is None
+    dead = store.connect().execute("SELECT error, row FROM dead_letters").fetchall()
+    assert len(dead) == 1
+
+    # The writer carries on
+    store.append('access', {'status': 'GRANTED', 'card_id': 'E10'})
+    assert store.flush(timeout=5)
+    assert store.count() == 11
@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+from file_tail import CsvTail, tail_feed
+from runtime import RUNTIME
+from tests.support import wait_until
+
+
+def append(path, text):
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+@pytest.fixture
+def active_file(tmp_path):
+    path = tmp_path / 'active.csv'
+    path.write_text("EPC\nE2000001\n", encoding='utf-8')
+    return path
+
+
+def follow(path, **kwargs):
+    tail = CsvTail(str(path), **kwargs)
+    received = []
+    tail.subscribe(lambda rows: received.extend(tail.epcs(rows)))
+    return tail, received
+
+
+def test_unterminated_line_waits_for_its_newline(active_file):
+    tail, received = follow(active_file)
+    append(active_file, "E2000")
+    tail.poll()
+    tail.poll()  # quiet, but not for long
+    assert received == []
+    assert list(tail.to_dataframe()['EPC']) == ['E2000001', 'E2000']
+
+    append(active_file, "002\n")
+    tail.poll()
+    assert received == ['E2000002']
+    assert [row[0] for row in tail.rows()] == ['E2000001', 'E2000002']
+
+
+def test_quiet_unterminated_line_is_replaced_when_it_grows(active_file):
+    tail, received = follow(active_file, partial_timeout=0)
+    append(active_file, "E2000")
+    tail.poll()
+    tail.poll()  # quiet: the writer may be done
+    assert received == ['E2000']
+
+    append(active_file, "002\n")
+    tail.poll()
+    assert received == ['E2000', 'E2000002']  # the whole line, not "002"
+    assert [row[0] for row in tail.rows()] == ['E2000001', 'E2000002']
+    assert list(tail.to_dataframe()['EPC']) == ['E2000001', 'E2000002']
+
+
+class RecordingTail(CsvTail):
+    """Notes the thread every poll runs on"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.poll_threads = set()
+
+    def poll(self):
+        self.poll_threads.add(threading.get_ident())
+        return super().poll()
+
+
+class RecordingChannel:
+    def __init__(self):
+        self.offers = []
+
+    def offer(self, epc, rssi=None, antenna=None):
+        raise AssertionError("the feed must not block a polling thread on the channel")
+
+    async def offer_async(self, epc, rssi=None, antenna=None):
+        self.offers.append((epc, threading.get_ident()))
+        return True
+
+
+def test_feed_polls_off_the_loop_and_offers_on_it(active_file):
+    tail = RecordingTail(str(active_file))
+    channel = RecordingChannel()
+    worker = RUNTIME.spawn("test-tail-feed", lambda: tail_feed(tail, interval=0.02)(channel))
+    try:
+        wait_until(lambda: tail._listeners)  # subscribed: the catch-up poll is done
+        append(active_file, "E2000002\n")
+        tail.poll()  # e.g. the dashboard reloading the file on its own thread
+        append(active_file, "E2000003\n")
+        wait_until(lambda: len(channel.offers) == 2)
+    finally:
+        worker.stop()
+
+    loop_thread = RUNTIME._thread.ident
+    assert [epc for epc, _ in channel.offers] == ['E2000002', 'E2000003']
+    assert {thread for _, thread in channel.offers} == {loop_thread}
+    assert loop_thread not in tail.poll_threads
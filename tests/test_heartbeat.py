@@ -0,0 +1,143 @@
+import asyncio
+import queue
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import heartbeat
+from heartbeat import BACKOFF_BASE, BACKOFF_MAX, EndpointState, HeartbeatMonitor
+from runtime import RUNTIME
+
+
+class StubServer:
+    """Local HTTP/1.1 server answering every GET with ``status`` after ``delay`` s; records client ports"""
+
+    def __init__(self, status=200, delay=0.0):
+        self.status = status
+        self.delay = delay
+        self.client_ports = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive
+
+            def do_GET(self):
+                stub.client_ports.append(self.client_address[1])
+                time.sleep(stub.delay)
+                body = b'ok'
+                self.send_response(stub.status)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/heartbeat"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def hits(self):
+        return len(self.client_ports)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    yield server
+    server.close()
+
+
+def dead_url():
+    """A local port nothing listens on"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/heartbeat"
+
+
+def test_checks_reuse_one_connection(stub):
+    monitor = HeartbeatMonitor({'primary': stub.url}, timeout=2)
+    state = monitor.endpoints['primary']
+    for _ in range(5):
+        monitor.check(state)
+    assert stub.hits == 5
+    assert len(set(stub.client_ports)) == 1
+    assert state.connected and state.histogram.count == 5
+
+
+def test_dead_endpoint_reports_one_disconnect(stub):
+    updates = queue.Queue()
+    monitor = HeartbeatMonitor({'primary': dead_url()}, status_queue=updates,
+                               timeout=1, warning_threshold=0)
+    state = monitor.endpoints['primary']
+    for _ in range(5):
+        monitor.check(state)
+    assert updates.qsize() == 1
+    change = updates.get_nowait()
+    assert change['status'] == 'disconnected' and change['consecutive_failures'] == 1
+    assert state.failures == 5 and not monitor.connected
+
+    # Coming back is one more transition
+    state.url = stub.url
+    monitor.check(state)
+    monitor.check(state)
+    assert updates.qsize() == 1
+    assert updates.get_nowait()['status'] == 'connected'
+
+
+def test_backoff_grows_with_failures_and_is_capped():
+    random.seed(0)
+    state = EndpointState('primary', 'http://unused', interval=10.0, warning_threshold=60.0)
+    assert state.next_delay() == 10.0
+    for failures in range(1, 12):
+        state.failures = failures
+        ceiling = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (failures - 1))
+        delays = [state.next_delay() for _ in range(200)]
+        assert all(BACKOFF_BASE / 2 <= d <= max(ceiling, BACKOFF_BASE / 2) for d in delays)
+    assert max(delays) > BACKOFF_MAX / 2  # the cap is reached, not just the base
+
+
+def test_failing_endpoint_is_polled_on_the_backoff_schedule(monkeypatch):
+    monkeypatch.setattr(heartbeat, 'BACKOFF_BASE', 2.0)
+    failing, healthy = StubServer(status=503), StubServer(status=200)
+    monitor = HeartbeatMonitor({'failing': failing.url, 'healthy': healthy.url}, interval=0.02, timeout=1)
+    try:
+        monitor.start()
+        time.sleep(0.5)
+    finally:
+        monitor.stop()
+        failing.close()
+        healthy.close()
+    # After the first failure the next try is at least BACKOFF_BASE / 2 away
+    assert failing.hits == 1
+    assert healthy.hits >= 5
+
+
+def test_a_hanging_endpoint_does_not_delay_the_others():
+    hanging, healthy = StubServer(delay=3.0), StubServer()
+    monitor = HeartbeatMonitor({'hanging': hanging.url, 'healthy': healthy.url}, interval=0.02, timeout=2)
+    # A long file reload holds one of the runtime's I/O threads meanwhile
+    RUNTIME.start()
+    reload = asyncio.run_coroutine_threadsafe(asyncio.to_thread(time.sleep, 1.0), RUNTIME.loop)
+    try:
+        monitor.start()
+        time.sleep(0.5)
+        assert hanging.hits == 1
+        assert healthy.hits >= 5
+    finally:
+        monitor.stop()
+        reload.result(timeout=5)
+        hanging.close()
+        healthy.close()
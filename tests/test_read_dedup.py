@@ -0,0 +1,49 @@
+from read_dedup import ReadDeduplicator
+
+
+def test_a_duplicate_inside_the_window_is_suppressed():
+    ended = []
+    dedup = ReadDeduplicator(cooldown=5.0, on_pass_end=ended.append)
+    assert dedup.offer('E1', rssi=-60, now=100.0)
+    assert not dedup.offer('E1', rssi=-50, now=102.0)
+    assert not dedup.offer('E1', rssi=-70, now=106.5)  # 4.5 s after the last read, not the first
+
+    presence = dedup.presence('E1')
+    assert presence['read_count'] == 3 and presence['dwell'] == 6.5
+    assert presence['rssi_avg'] == -60 and presence['rssi_max'] == -50
+    assert ended == []
+    assert dedup.stats() == {'reads_seen': 3, 'events_forwarded': 1, 'reads_suppressed': 2, 'tags_tracked': 1}
+
+
+def test_a_read_outside_the_window_starts_a_new_pass():
+    ended = []
+    dedup = ReadDeduplicator(cooldown=5.0, on_pass_end=ended.append)
+    assert dedup.offer('E1', now=100.0)
+    assert not dedup.offer('E1', now=105.0)     # exactly the cooldown still belongs to the pass
+    assert dedup.offer('E1', now=110.5)
+
+    assert [(p.first_seen, p.last_seen, p.read_count) for p in ended] == [(100.0, 105.0, 2)]
+    assert dedup.presence('E1')['first_seen'] == 110.5
+    assert dedup.stats()['events_forwarded'] == 2
+
+
+def test_tags_are_independent_and_expired_passes_are_evicted():
+    ended = []
+    dedup = ReadDeduplicator(cooldown=5.0, on_pass_end=ended.append)
+    assert dedup.offer('E1', now=100.0)
+    assert dedup.offer('E2', now=101.0)
+    assert not dedup.offer('E1', now=103.0)
+    assert dedup.offer('E3', now=107.0)          # E2 has been quiet for 6 s
+
+    assert [p.epc for p in ended] == ['E2']
+    assert dedup.presence('E2') is None
+    assert dedup.stats()['tags_tracked'] == 2
+
+
+def test_the_tag_cap_ends_the_least_recent_pass():
+    ended = []
+    dedup = ReadDeduplicator(cooldown=60.0, max_tags=2, on_pass_end=ended.append)
+    for now, epc in enumerate(['E1', 'E2', 'E1', 'E3']):
+        dedup.offer(epc, now=float(now))
+    assert [p.epc for p in ended] == ['E2']
+    assert dedup.stats()['tags_tracked'] == 2
@@ -0,0 +1,134 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from epc_matching import compare_active_with_reference
+from reference_registry import PREFIX_CHECK_BYTES, ReferenceRegistry
+from registry_snapshot import read_registry_csv, write_snapshot
+
+
+def write_registry(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write("EPC,Name\n")
+        f.writelines(f"{epc},{name}\n" for epc, name in rows)
+
+
+def touch_later(path):
+    """Move mtime forward so a same-size rewrite still looks changed"""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def make_rows(count):
+    return [(f"E{i:08X}", f"Person {i}") for i in range(count)]
+
+
+def test_editing_a_row_reloads_the_whole_file(tmp_path):
+    path = tmp_path / 'ref.csv'
+    rows = make_rows(20_000)
+    write_registry(path, rows)
+    registry = ReferenceRegistry(str(path))
+    assert registry.refresh()
+
+    rows[10] = (rows[10][0], "Person 10 with a longer name")
+    write_registry(path, rows)
+    touch_later(path)
+    assert registry.refresh()
+
+    assert len(registry) == 20_000
+    assert registry.lookup(rows[10][0]) == "Person 10 with a longer name"
+    assert registry.lookup(rows[0][0]) == "Person 0"
+    assert list(registry.to_dataframe().columns) == ['EPC', 'Name']
+
+
+def test_in_place_edit_past_the_prefix_is_not_taken_for_an_append(tmp_path):
+    path = tmp_path / 'ref.csv'
+    rows = make_rows(2_000)
+    write_registry(path, rows)
+    registry = ReferenceRegistry(str(path))
+    registry.refresh()
+
+    edited = 1_500  # well past the first PREFIX_CHECK_BYTES
+    assert len("EPC,Name\n") + edited * 20 > PREFIX_CHECK_BYTES
+    rows[edited] = (rows[edited][0], "Renamed")
+    rows.append(("EFFFFFFFF", "Appended"))
+    write_registry(path, rows)
+    assert registry.refresh()
+
+    assert registry.lookup(rows[edited][0]) == "Renamed"
+    assert registry.lookup("EFFFFFFFF") == "Appended"
+    assert len(registry) == 2_001
+
+
+def test_appended_rows_are_added(tmp_path):
+    path = tmp_path / 'ref.csv'
+    write_registry(path, make_rows(10))
+    registry = ReferenceRegistry(str(path))
+    registry.refresh()
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        f.write("ENEW,Newcomer\n")
+    assert registry.refresh()
+    assert registry.lookup("ENEW") == "Newcomer"
+    assert len(registry) == 11
+
+
+def test_lookups_never_see_a_partial_reload(tmp_path):
+    path = tmp_path / 'ref.csv'
+    rows = make_rows(200_000)
+    write_registry(path, rows)
+    registry = ReferenceRegistry(str(path))
+    registry.refresh()
+    probe = rows[-1][0]
+
+    rows[0] = (rows[0][0], "Renamed")
+    write_registry(path, rows)
+    touch_later(path)
+
+    misses = []
+    done = threading.Event()
+
+    def scan():
+        while not done.is_set():
+            if registry.lookup(probe) is None:
+                misses.append(probe)
+
+    scanner = threading.Thread(target=scan)
+    scanner.start()
+    try:
+        assert registry.refresh()
+    finally:
+        done.set()
+        scanner.join()
+    assert not misses
+    assert registry.lookup(rows[0][0]) == "Renamed"
+
+
+@pytest.mark.parametrize('use_snapshot', [False, True])
+def test_csv_and_snapshot_match_the_same_epcs(tmp_path, use_snapshot):
+    path = tmp_path / 'ref.csv'
+    write_registry(path, [("e2000001", "Ada"), ("0xE2-00-00-02", "Grace"), (" E200 0003 ", "Linus")])
+    snapshot_path = None
+    if use_snapshot:
+        snapshot_path = str(tmp_path / 'ref.rsnap')
+        header, rows, _ = read_registry_csv(str(path))
+        write_snapshot(snapshot_path, header, rows, source=str(path))
+    registry = ReferenceRegistry(str(path), snapshot_path=snapshot_path)
+    registry.refresh()
+    assert registry.source == ('snapshot' if use_snapshot else 'csv')
+
+    for query in ("E2000001", "e2000001", "E2:00:00:01", "0xe2000001"):
+        assert registry.lookup(query) == "Ada"
+        assert query in registry
+    assert registry.lookup("E2000002") == "Grace"
+    assert registry.lookup("E2000003") == "Linus"
+    assert registry.lookup("E2000004") is None
+
+    active = pd.DataFrame({'EPC': ["E2000001", "e2-00-00-02", " E2000003", "E2000004", None]})
+    result, names, epcs = compare_active_with_reference(active, registry.to_dataframe(),
+                                                        lookup=registry.lookup_series())
+    assert names == ["Ada", "Grace", "Linus"]
+    assert epcs == ["E2000001", "E2000002", "E2000003"]
+    # Without the cached lookup the DataFrame path agrees
+    assert compare_active_with_reference(active, registry.to_dataframe())[1] == names
@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+import pytest
+
+import runtime
+from runtime import Runtime
+from tests.support import wait_until
+
+
+@pytest.fixture
+def loop_runtime(monkeypatch):
+    monkeypatch.setattr(runtime, 'RESTART_BASE', 0.05)
+    rt = Runtime(name='test-runtime')
+    yield rt
+    rt.shutdown()
+
+
+def test_a_crashing_worker_is_restarted_with_backoff(loop_runtime):
+    attempts = []
+
+    async def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) <= 2:
+            raise ConnectionError(f"attempt {len(attempts)}")
+
+    worker = loop_runtime.spawn("flaky", flaky)
+    wait_until(lambda: not worker.running)
+
+    assert len(attempts) == 3
+    assert worker.restarts == loop_runtime.restarts == 2
+    # RESTART_BASE, then twice that
+    assert attempts[1] - attempts[0] >= 0.05
+    assert attempts[2] - attempts[1] >= 0.1
+    assert worker.last_error == "ConnectionError: attempt 2"
+    assert loop_runtime.stats()['errors'] == {'flaky': "ConnectionError: attempt 2"}
+    wait_until(lambda: loop_runtime.workers() == [])  # forgotten once done
+
+
+def test_a_worker_spawned_without_restart_fails_once(loop_runtime):
+    attempts = []
+
+    async def broken():
+        attempts.append(1)
+        raise ValueError("bad config")
+
+    worker = loop_runtime.spawn("broken", broken, restart=False)
+    wait_until(lambda: not worker.running)
+    assert attempts == [1] and worker.restarts == 0
+    assert worker.last_error == "ValueError: bad config"
+
+
+def test_stopping_a_worker_cancels_it(loop_runtime):
+    cancelled = []
+
+    async def forever():
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    worker = loop_runtime.spawn("forever", forever)
+    assert worker.running
+    worker.stop()
+    assert cancelled == [True] and not worker.running
+    assert worker.restarts == 0
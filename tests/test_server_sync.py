@@ -0,0 +1,171 @@
+import asyncio
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import server_sync
+from event_store import SYNC_CURSOR_KEY, EventStore
+from runtime import RUNTIME
+from server_sync import ServerSync
+from tests.support import wait_until
+
+
+class MockServer:
+    """Local upload endpoint: answers with the scripted statuses, then 200; keeps accepted events"""
+
+    def __init__(self, statuses=(), delay=0.0):
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.requests = 0
+        self.accepted = []
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                mock.requests += 1
+                time.sleep(mock.delay)
+                status = mock.statuses.pop(0) if mock.statuses else 200
+                if status == 200:
+                    mock.accepted.extend(json.loads(gzip.decompress(body))['events'])
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/events"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def keys(self):
+        return [event['idempotency_key'] for event in self.accepted]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(str(tmp_path / 'events.db'))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def mock():
+    server = MockServer()
+    yield server
+    server.close()
+
+
+def add_events(store, count, ts=None):
+    for i in range(count):
+        store.append('access', {'status': 'GRANTED', 'card_id': f"E{i}", 'name': f"Person {i}"}, ts=ts)
+    assert store.flush(timeout=5)
+
+
+def test_unavailable_then_ok_uploads_once(store, mock):
+    add_events(store, 5)
+    mock.statuses = [503]
+    sync = ServerSync(store, mock.url, timeout=2)
+
+    with pytest.raises(requests.HTTPError):
+        sync.upload_once()
+    assert sync.cursor == 0 and store.get_meta(SYNC_CURSOR_KEY) is None
+
+    assert sync.upload_once() == 5
+    assert sync.cursor == store.max_id()
+    assert store.get_meta(SYNC_CURSOR_KEY) == str(store.max_id())
+    assert len(mock.accepted) == 5
+    assert sync.upload_once() == 0
+
+
+def test_conflict_means_already_applied(store, mock):
+    add_events(store, 3)
+    mock.statuses = [409]
+    sync = ServerSync(store, mock.url, timeout=2)
+    assert sync.upload_once() == 3
+    assert sync.cursor == store.max_id()
+    assert sync.stats()['backlog'] == 0
+
+
+def test_worker_retries_until_the_server_recovers(store, mock, monkeypatch):
+    monkeypatch.setattr(server_sync, 'RETRY_BASE', 0.05)
+    add_events(store, 1200)
+    mock.statuses = [503, 503]
+    sync = ServerSync(store, mock.url, batch_size=500, max_events_per_second=100_000, timeout=2)
+    sync.start()
+    try:
+        wait_until(lambda: sync.stats()['backlog'] == 0)
+    finally:
+        sync.stop()
+    assert sync.failures == 0
+    assert len(mock.accepted) == 1200
+    assert len(set(mock.keys())) == 1200
+
+
+def test_restart_resumes_without_duplicates(store, mock):
+    add_events(store, 10)
+    first = ServerSync(store, mock.url, batch_size=4, timeout=2)
+    assert first.upload_once() == 4
+    assert first.upload_once() == 4
+
+    add_events(store, 3)
+    second = ServerSync(store, mock.url, batch_size=4, timeout=2)
+    assert second.source_id == first.source_id
+    assert second.cursor == first.cursor
+    while second.upload_once():
+        pass
+    keys = mock.keys()
+    assert len(keys) == len(set(keys)) == 13
+    assert [int(key.rsplit('-', 1)[1]) for key in keys] == list(range(1, 14))
+
+
+def test_compaction_keeps_unsynced_events(store, mock):
+    old = time.time() - 1000 * 86400
+    add_events(store, 10, ts=old)
+    sync = ServerSync(store, mock.url, batch_size=4, timeout=2)
+    sync.upload_once()
+
+    assert store.compact() == 4
+    assert [row['id'] for row in store.read_after(0, 100)] == list(range(5, 11))
+
+    while sync.upload_once():
+        pass
+    assert store.compact() == 6
+    assert store.count() == 0
+    assert len(mock.accepted) == 10
+
+
+def test_slow_uploads_leave_the_file_threads_free(tmp_path):
+    slow = MockServer(delay=1.0)
+    stores = [EventStore(str(tmp_path / f"events{i}.db")) for i in range(2)]
+    syncs = []
+    try:
+        for store in stores:
+            add_events(store, 1)
+            sync = ServerSync(store, slow.url, timeout=5)
+            sync.start()
+            syncs.append(sync)
+        wait_until(lambda: slow.requests == 2)  # both uploads are in flight
+
+        start = time.monotonic()
+        RUNTIME.call(asyncio.to_thread(lambda: None), timeout=5)  # as a registry reload would
+        assert time.monotonic() - start < 0.5
+    finally:
+        for sync in syncs:
+            sync.stop()
+        for store in stores:
+            store.close()
+        slow.close()
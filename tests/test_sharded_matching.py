@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest
+
+from epc_matching import build_lookup, compare_active_with_reference
+from sharded_matching import ShardedMatcher
+
+REFERENCE = pd.DataFrame({'EPC': ['E2000001', 'E2000002', 'e2-00:0003', 'E2000001', None],
+                          'Name': ['Ada', 'Grace', 'Linus', 'Duplicate', None]}, dtype=object)
+ACTIVE = pd.DataFrame({'EPC': [' e2000002 ', 'E2000001', None, '', 'UNKNOWN', 'E2000003', 'E2000001']},
+                      dtype=object)
+
+
+@pytest.mark.parametrize('processes', [False, True])
+def test_chunked_join_returns_what_the_vectorized_match_does(processes):
+    lookup = build_lookup(REFERENCE)
+    matcher = ShardedMatcher(2, processes=processes)
+    try:
+        result_df, names, epcs = matcher.compare(ACTIVE, REFERENCE, lookup=lookup)
+        assert matcher.last_stats['distinct_epcs'] == 5
+        assert matcher.last_stats['worker_seconds'] > 0
+    finally:
+        matcher.close()
+
+    expected_df, expected_names, expected_epcs = compare_active_with_reference(ACTIVE, REFERENCE, lookup=lookup)
+    assert names == expected_names == ['Grace', 'Ada', 'Linus', 'Ada']
+    assert epcs == expected_epcs
+    pd.testing.assert_frame_equal(result_df, expected_df)
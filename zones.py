@@ -0,0 +1,85 @@
+import threading
+from typing import Dict, Iterable, NamedTuple, Optional, Set, Tuple
+
+# ----------- Zone Configuration ------------
+OUTSIDE = 'outside'  # everywhere beyond the checkpoint perimeter
+
+IN = 'in'    # crossing towards a door's inner zone
+OUT = 'out'  # crossing towards a door's outer zone
+
+
+class Door(NamedTuple):
+    """A checkpoint between two zones; readers at the door report crossings"""
+    door_id: str
+    outer_zone: str
+    inner_zone: str
+
+
+# ----------- Zone Graph ------------
+class ZoneGraph:
+    """Doors connecting zones; resolves a door read into a (from, to) zone move"""
+
+    def __init__(self, doors: Iterable[Door]):
+        self.doors: Dict[str, Door] = {door.door_id: door for door in doors}
+        self.zones: Set[str] = {OUTSIDE}
+        for door in self.doors.values():
+            self.zones.update((door.outer_zone, door.inner_zone))
+
+    def entry_zone(self) -> Optional[str]:
+        """Zone reached by entering from OUTSIDE through the first perimeter door, if any"""
+        for door in self.doors.values():
+            if door.outer_zone == OUTSIDE:
+                return door.inner_zone
+        return None
+
+    def resolve(self, door_id: str, current_zone: str, direction: Optional[str] = None) -> Tuple[str, str]:
+        """Zone move for a crossing at ``door_id`` by a tag now in ``current_zone``.
+
+        With a known direction (IN/OUT) it is used as-is. Otherwise a tag
+        on the inner side is leaving and anything else is taken as entering.
+        """
+        door = self.doors[door_id]
+        if direction is None:
+            direction = OUT if current_zone == door.inner_zone else IN
+        to_zone = door.inner_zone if direction == IN else door.outer_zone
+        return current_zone, to_zone
+
+
+# ----------- Per-Zone Occupancy ------------
+class ZoneOccupancy:
+    """Which zone every tag is in, with O(1) per-zone counts"""
+
+    def __init__(self, graph: ZoneGraph):
+        self.graph = graph
+        self._zone_of: Dict[str, str] = {}
+        self._members: Dict[str, Set[str]] = {zone: set() for zone in graph.zones if zone != OUTSIDE}
+        self._lock = threading.Lock()
+
+    def zone_of(self, epc: str) -> str:
+        return self._zone_of.get(epc, OUTSIDE)
+
+    def preview(self, epc: str, door_id: str, direction: Optional[str] = None) -> Tuple[str, str]:
+        """Move a crossing would make, without applying it"""
+        return self.graph.resolve(door_id, self.zone_of(epc), direction)
+
+    def move(self, epc: str, to_zone: str):
+        with self._lock:
+            from_zone = self._zone_of.pop(epc, OUTSIDE)
+            if from_zone != OUTSIDE:
+                self._members[from_zone].discard(epc)
+            if to_zone != OUTSIDE:
+                self._zone_of[epc] = to_zone
+                self._members.setdefault(to_zone, set()).add(epc)
+
+    def clear(self):
+        with self._lock:
+            self._zone_of.clear()
+            for members in self._members.values():
+                members.clear()
+
+    def count(self, zone: str) -> int:
+        return len(self._members.get(zone, ()))
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {zone: len(members) for zone, members in self._members.items()}